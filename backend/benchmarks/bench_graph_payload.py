@@ -0,0 +1,91 @@
+"""
+Compares /api/v2/graph response sizes across field selections.
+
+    python benchmarks/bench_graph_payload.py [--nodes 10000] [--content-bytes 2000]
+
+Variants:
+  full          include_content=true: every attribute plus hydrated content
+  default       every attribute, no content
+  render        profile=render (what the canvas draws)
+  minimal       fields=id,title,type,position,thumbnail
+Runs against a throwaway data directory through the FastAPI app.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.graph_logic as graph_logic
+
+
+def use_data_dir(path: str):
+    graph_logic.DATA_DIR = path
+    graph_logic.CANVASES_DIR = os.path.join(path, "canvases")
+    graph_logic.CANVAS_INDEX_FILE = os.path.join(path, "canvases.json")
+    graph_logic.SETTINGS_FILE = os.path.join(path, "nexus_settings.json")
+    graph_logic.BLOBS_DIR = os.path.join(path, "blobs")
+
+
+def synthetic_ops(num_nodes: int, content_bytes: int, seed: int = 7):
+    """Documents with bodies, summaries, positions and tags, plus about two reference edges per node."""
+    rng = random.Random(seed)
+    words = ["graph", "node", "context", "canvas", "weaver", "edge", "summary", "module"]
+    ops = []
+    for i in range(num_nodes):
+        body = " ".join(rng.choice(words) for _ in range(content_bytes // 6))
+        ops.append({"op": "add_node", "id": f"DOC-{i:07d}", "attrs": {
+            "type": "document",
+            "title": f"Document {i}",
+            "summary": "Synthetic summary " * 3,
+            "content": body,
+            "tags": ["synthetic", rng.choice(words)],
+            "position": {"x": rng.uniform(0, 5000), "y": rng.uniform(0, 5000)},
+            "status": "committed",
+            "created_at": "2025-01-01T00:00:00",
+        }})
+    for _ in range(num_nodes * 2):
+        u, v = rng.sample(range(num_nodes), 2)
+        ops.append({"op": "add_edge", "source": f"DOC-{u:07d}", "target": f"DOC-{v:07d}",
+                    "attrs": {"type": "reference", "confidence": round(rng.random(), 2)}})
+    return ops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--content-bytes", type=int, default=2000)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp()
+    use_data_dir(data_dir)
+    os.chdir(data_dir)
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    client = TestClient(app_module.app)
+    response = client.post("/api/v2/batch", json={"operations": synthetic_ops(args.nodes, args.content_bytes)})
+    response.raise_for_status()
+
+    variants = [
+        ("full", "?include_content=true"),
+        ("default", ""),
+        ("render", "?profile=render"),
+        ("minimal", "?fields=id,title,type,position,thumbnail"),
+    ]
+    baseline = None
+    print(f"{'variant':<12} {'bytes':>12} {'vs full':>8} {'ms':>8}")
+    for name, query in variants:
+        start = time.perf_counter()
+        response = client.get(f"/api/v2/graph{query}")
+        elapsed = (time.perf_counter() - start) * 1000
+        size = len(response.content)
+        baseline = baseline or size
+        print(f"{name:<12} {size:>12,} {size / baseline:>8.1%} {elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
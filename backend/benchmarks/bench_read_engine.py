@@ -0,0 +1,126 @@
+"""
+Compares the CSR read engine with NetworkX: memory, build time and query latency.
+
+    python benchmarks/bench_read_engine.py [--edges 10000 100000 1000000]
+
+Queries:
+  k-hop        2-hop neighborhood (both directions) of a few random seeds
+  k-hop/ref    the same, following only 'reference' edges
+  centrality   degree centrality of every node
+  components   weakly connected components
+Memory is what tracemalloc sees each structure retain once built (node
+attributes are left out of both, so only the topology is compared).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import networkx as nx
+
+from core.csr_graph import CSRGraph, NUMPY_AVAILABLE
+
+
+def synthetic_edges(num_edges: int, seed: int = 7):
+    """A canvas-shaped topology: a 'contains' tree plus random 'reference' edges, about 4 edges per node."""
+    rng = random.Random(seed)
+    num_nodes = max(num_edges // 4, 2)
+    folders = max(num_nodes // 50, 1)
+    edges = []
+    for i in range(folders, num_nodes):
+        edges.append((f"N{rng.randrange(folders)}", f"N{i}", {"type": "contains"}))
+    while len(edges) < num_edges:
+        u, v = rng.randrange(num_nodes), rng.randrange(num_nodes)
+        if u != v:
+            edges.append((f"N{u}", f"N{v}", {"type": "reference", "confidence": round(rng.random(), 2)}))
+    return num_nodes, edges
+
+
+def build_networkx(num_nodes: int, edges) -> nx.DiGraph:
+    graph = nx.DiGraph()
+    graph.add_nodes_from(f"N{i}" for i in range(num_nodes))
+    graph.add_edges_from(edges)
+    return graph
+
+
+def resident(fn):
+    """Returns fn() and the bytes it still holds once built."""
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def nx_k_hop(graph: nx.DiGraph, seeds, depth: int, edge_types=None):
+    visited = set(seeds)
+    frontier = set(seeds)
+    for _ in range(depth):
+        reached = set()
+        for node in frontier:
+            for _, v, d in graph.out_edges(node, data=True):
+                if edge_types is None or d.get("type") in edge_types:
+                    reached.add(v)
+            for u, _, d in graph.in_edges(node, data=True):
+                if edge_types is None or d.get("type") in edge_types:
+                    reached.add(u)
+        frontier = reached - visited
+        visited |= frontier
+    return visited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edges", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if not NUMPY_AVAILABLE:
+        sys.exit("NumPy is required for the CSR engine")
+
+    print(f"{'edges':>8} {'engine':<9} {'build ms':>9} {'MB':>8} {'k-hop ms':>9} {'k-hop/ref':>10} "
+          f"{'centrality':>11} {'components':>11}")
+    for num_edges in args.edges:
+        num_nodes, edges = synthetic_edges(num_edges)
+        graph, nx_bytes = resident(lambda: build_networkx(num_nodes, edges))
+        csr, csr_bytes = resident(lambda: CSRGraph.from_graph(graph))
+        nx_build_ms = timed(lambda: build_networkx(num_nodes, edges), 1)
+        csr_build_ms = timed(lambda: CSRGraph.from_graph(graph), 1)
+        seeds = [f"N{i}" for i in random.Random(1).sample(range(num_nodes), 5)]
+
+        # Same answers from both engines
+        assert nx_k_hop(graph, seeds, 2) == csr.k_hop(seeds, 2)
+        assert len(list(nx.weakly_connected_components(graph))) == len(csr.components())
+
+        rows = [
+            ("networkx", nx_build_ms, nx_bytes,
+             timed(lambda: nx_k_hop(graph, seeds, 2), args.repeat),
+             timed(lambda: nx_k_hop(graph, seeds, 2, {"reference"}), args.repeat),
+             timed(lambda: nx.degree_centrality(graph), args.repeat),
+             timed(lambda: list(nx.weakly_connected_components(graph)), args.repeat)),
+            ("csr", csr_build_ms, csr_bytes,
+             timed(lambda: csr.k_hop(seeds, 2), args.repeat),
+             timed(lambda: csr.k_hop(seeds, 2, ["reference"]), args.repeat),
+             timed(csr.degree_centrality, args.repeat),
+             timed(csr.component_labels, args.repeat)),
+        ]
+        for name, build_ms, nbytes, khop, khop_ref, centrality, components in rows:
+            print(f"{num_edges:>8} {name:<9} {build_ms:>9.1f} {nbytes / 2**20:>8.1f} {khop:>9.2f} {khop_ref:>10.2f} "
+                  f"{centrality:>11.1f} {components:>11.1f}")
+        del graph, csr
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Compares graph snapshot formats: load time, save time and file size.
+
+    python benchmarks/bench_snapshot.py [--sizes 1000 10000 100000]
+
+Formats:
+  json-indent  node-link graph.json as written by the JSON store (indent=2)
+  json-compact node-link JSON without indentation
+  binary       graph.snap (interned keys; msgpack if installed, else orjson/json)
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import networkx as nx
+
+from core.graph_store import node_link_data, node_link_graph
+from core.snapshot_codec import encode_graph, decode_graph, MSGPACK_AVAILABLE, ORJSON_AVAILABLE
+
+
+def synthetic_graph(num_nodes: int, edges_per_node: int = 2, seed: int = 7) -> nx.DiGraph:
+    """A canvas-shaped graph: folders, documents with blob references, positions and typed edges."""
+    rng = random.Random(seed)
+    graph = nx.DiGraph()
+    folders = [f"FOLDER_{i:06d}" for i in range(max(num_nodes // 50, 1))]
+    for folder_id in folders:
+        graph.add_node(folder_id, type="folder", label=folder_id.title(),
+                       created_at="2025-01-01T00:00:00", status="committed")
+    for i in range(num_nodes - len(folders)):
+        node_id = f"DOC-{i:07d}"
+        graph.add_node(node_id, **{
+            "type": "document",
+            "title": f"Document {i}",
+            "summary": "Synthetic summary " * 3,
+            "tags": [f"tag{rng.randint(0, 50)}" for _ in range(3)],
+            "module": "General",
+            "main_topic": "Uncategorized",
+            "node_type": "child",
+            "status": "committed",
+            "created_at": "2025-01-01T00:00:00",
+            "content_digest": f"{rng.getrandbits(256):064x}",
+            "content_length": rng.randint(100, 5000),
+            "position": {"x": rng.uniform(-5000, 5000), "y": rng.uniform(-5000, 5000)},
+        })
+        graph.add_edge(rng.choice(folders), node_id, type="contains", weight=1.0)
+    docs = [n for n, d in graph.nodes(data=True) if d["type"] == "document"]
+    for source in docs:
+        for _ in range(edges_per_node - 1):
+            target = rng.choice(docs)
+            if target != source:
+                graph.add_edge(source, target, type="reference", confidence=round(rng.random(), 2),
+                               justification="Synthetic relationship")
+    return graph
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def bench(graph: nx.DiGraph, workdir: str, repeat: int):
+    formats = {
+        "json-indent": (
+            lambda: json.dumps(node_link_data(graph), indent=2).encode('utf-8'),
+            lambda payload: node_link_graph(json.loads(payload)),
+        ),
+        "json-compact": (
+            lambda: json.dumps(node_link_data(graph), separators=(",", ":")).encode('utf-8'),
+            lambda payload: node_link_graph(json.loads(payload)),
+        ),
+        "binary": (
+            lambda: encode_graph(graph),
+            decode_graph,
+        ),
+    }
+    rows = []
+    for name, (encode, decode) in formats.items():
+        path = os.path.join(workdir, name)
+
+        def save():
+            payload = encode()
+            with open(path, 'wb') as f:
+                f.write(payload)
+            return len(payload)
+
+        def load():
+            with open(path, 'rb') as f:
+                return decode(f.read())
+
+        save_ms, size = timed(save, repeat)
+        load_ms, loaded = timed(load, repeat)
+        assert loaded.number_of_nodes() == graph.number_of_nodes()
+        assert loaded.number_of_edges() == graph.number_of_edges()
+        rows.append((name, save_ms, load_ms, size))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    codec = "msgpack" if MSGPACK_AVAILABLE else ("orjson" if ORJSON_AVAILABLE else "json")
+    print(f"binary codec: {codec}")
+    print(f"{'nodes':>8} {'edges':>8} {'format':<13} {'save ms':>9} {'load ms':>9} {'size KB':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            graph = synthetic_graph(size)
+            for name, save_ms, load_ms, nbytes in bench(graph, workdir, args.repeat):
+                print(f"{graph.number_of_nodes():>8} {graph.number_of_edges():>8} {name:<13} "
+                      f"{save_ms:>9.1f} {load_ms:>9.1f} {nbytes / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
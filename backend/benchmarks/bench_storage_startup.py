@@ -0,0 +1,91 @@
+"""
+Compares canvas startup (store.load()) across storage backends.
+
+    python benchmarks/bench_storage_startup.py [--sizes 1000 10000 100000]
+
+Stores:
+  json         graph.json snapshot (the JSON backend after compaction)
+  json-binary  graph.snap snapshot (snapshot_format="binary")
+  sqlite       graph.db, one JSON attrs column per node and per edge
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_snapshot import synthetic_graph, timed
+from core.graph_store import JsonGraphStore
+from core.sqlite_store import SQLiteGraphStore
+
+
+def stores(workdir: str):
+    def canvas_dir(name):
+        path = os.path.join(workdir, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    return {
+        "json": lambda: JsonGraphStore(canvas_dir("json")),
+        "json-binary": lambda: JsonGraphStore(canvas_dir("json-binary"), snapshot_format="binary"),
+        "sqlite": lambda: SQLiteGraphStore(canvas_dir("sqlite")),
+    }
+
+
+def write_stores(graph, workdir: str):
+    for open_store in stores(workdir).values():
+        store = open_store()
+        if store.backend == "sqlite":
+            store.import_graph(graph)
+        store.compact(graph)
+        store.close()
+
+
+def bench(workdir: str, num_nodes: int, num_edges: int, repeat: int):
+    rows = []
+    for name, open_store in stores(workdir).items():
+        def load():
+            # A fresh store each time, as when a canvas is opened after a restart
+            fresh = open_store()
+            try:
+                return fresh.load()
+            finally:
+                fresh.close()
+
+        load_ms, loaded = timed(load, repeat)
+        assert loaded.number_of_nodes() == num_nodes
+        assert loaded.number_of_edges() == num_edges
+        del loaded
+        gc.collect()
+        rows.append((name, load_ms))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} {'edges':>8} {'store':<12} {'load ms':>9} {'vs json':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            graph = synthetic_graph(size)
+            num_nodes, num_edges = graph.number_of_nodes(), graph.number_of_edges()
+            write_stores(graph, workdir)
+            # Time the loads without the source graph on the heap, as at a real startup
+            del graph
+            gc.collect()
+            rows = bench(workdir, num_nodes, num_edges, args.repeat)
+        baseline = rows[0][1]
+        for name, load_ms in rows:
+            print(f"{num_nodes:>8} {num_edges:>8} {name:<12} "
+                  f"{load_ms:>9.1f} {load_ms / baseline:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
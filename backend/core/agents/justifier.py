@@ -1,4 +1,4 @@
-from typing import Dict, Any, List
+from typing import Dict, Any
 import logging
 import json
 from .base import BaseAgent
@@ -38,7 +38,7 @@ class Justifier(BaseAgent):
         system_instruction = self.prompt_registry.get(
             "justifier_validate",
             title=node.get('title'),
-            content=node.get('content')
+            content=self.weaver.get_node_content(node_id)
         ) if self.prompt_registry else "FATAL: No Prompt Registry"
         
         response = await self.generate_llm_response("Validate properties.", system_instruction)
@@ -1,6 +1,5 @@
-from typing import Dict, Any, List
+from typing import Dict, Any
 import logging
-import json
 from .base import BaseAgent
 
 logger = logging.getLogger(__name__)
@@ -34,13 +33,15 @@ class LinkSmith(BaseAgent):
         committed_count = 0
         errors = []
         
-        for node_id in shadow_nodes:
-            # Re-validate with Justifier? Or assume user approval implies validation override.
-            # We assume user clicked "Approve", so we force commit.
-            if self.weaver.commit_shadow_node(node_id):
-                committed_count += 1
-            else:
-                errors.append(f"Failed to commit {node_id}")
+        # One transaction: the whole shadow graph is persisted in a single write
+        with self.weaver.batch():
+            for node_id in shadow_nodes:
+                # Re-validate with Justifier? Or assume user approval implies validation override.
+                # We assume user clicked "Approve", so we force commit.
+                if self.weaver.commit_shadow_node(node_id):
+                    committed_count += 1
+                else:
+                    errors.append(f"Failed to commit {node_id}")
                 
         # 2. Also logic for converting proposed edges (if we stored them in metadata) 
         # For now, we assume Architect creates 'intended' edges via Weaver's add_edge (which we might need to support 'shadow edges')
@@ -0,0 +1,140 @@
+from typing import Optional, Tuple, Iterable, Dict, Any
+from collections import OrderedDict
+import hashlib
+import logging
+import threading
+import os
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """
+    Content-addressed storage for node bodies.
+    Blobs are immutable UTF-8 files named by the SHA-256 of their text and sharded
+    by the first two hex digits, so identical content is stored once for all canvases.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def digest(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def put(self, text: str) -> Tuple[str, int]:
+        """Stores text if it is not already present. Returns (digest, length in characters)."""
+        text = text or ""
+        digest = self.digest(text)
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid4().hex}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        return digest, len(text)
+
+    def get(self, digest: str) -> Optional[str]:
+        try:
+            with open(self._path(digest), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.error(f"Missing content blob {digest}")
+            return None
+
+    def collect_garbage(self, live_digests: Iterable[str]) -> Dict[str, Any]:
+        """Deletes blobs that are not referenced by any canvas."""
+        live = set(live_digests)
+        removed = 0
+        freed = 0
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name in live or name.endswith(".tmp"):
+                    continue
+                path = os.path.join(shard_dir, name)
+                freed += os.path.getsize(path)
+                os.remove(path)
+                removed += 1
+        logger.info(f"Blob GC removed {removed} blobs ({freed} bytes)")
+        return {"removed": removed, "freed_bytes": freed, "live": len(live)}
+
+
+class ContentCache:
+    """
+    Read-through LRU cache in front of a BlobStore, bounded by the total
+    UTF-8 size of the cached bodies rather than by entry count.
+    Since blobs are immutable, entries never need invalidation.
+    """
+    def __init__(self, blobs: BlobStore, max_bytes: int = 64 * 1024 * 1024):
+        self.blobs = blobs
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        text = self.blobs.get(digest)
+        if text is not None:
+            self._admit(digest, text)
+        return text
+
+    def put(self, text: str) -> Tuple[str, int]:
+        """Writes through to the blob store and caches the freshly written body."""
+        digest, length = self.blobs.put(text)
+        self._admit(digest, text or "")
+        return digest, length
+
+    def _admit(self, digest: str, text: str):
+        size = len(text.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                return
+            self._entries[digest] = (text, size)
+            self.resident_bytes += size
+            while self.resident_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.resident_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
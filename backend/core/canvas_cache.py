@@ -0,0 +1,121 @@
+from typing import Dict, Any, Optional, Callable, List
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CanvasCache:
+    """
+    Keeps recently used canvases loaded in memory.
+    Entries are evicted least-recently-used first once the estimated resident
+    size of all entries exceeds max_bytes (or there are more than max_entries).
+    Pinned canvases (the active one) are never evicted.
+    """
+    def __init__(self, max_bytes: int, max_entries: int = 8,
+                 on_evict: Optional[Callable[[str, Any], None]] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max(max_entries, 1)
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pinned = set()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, canvas_id: str) -> Optional[Any]:
+        """Returns the cached value and marks it most recently used."""
+        with self._lock:
+            entry = self._entries.get(canvas_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(canvas_id)
+            self.hits += 1
+            entry["hits"] += 1
+            entry["last_access"] = time.time()
+            return entry["value"]
+
+    def peek(self, canvas_id: str) -> Optional[Any]:
+        """Returns the cached value without touching LRU order or counters."""
+        with self._lock:
+            entry = self._entries.get(canvas_id)
+            return entry["value"] if entry else None
+
+    def put(self, canvas_id: str, value: Any, load_time_ms: float = 0.0):
+        with self._lock:
+            self._entries[canvas_id] = {
+                "value": value,
+                "load_time_ms": round(load_time_ms, 2),
+                "hits": 0,
+                "loaded_at": time.time(),
+                "last_access": time.time(),
+            }
+            self._entries.move_to_end(canvas_id)
+            self._enforce_budget(keep=canvas_id)
+
+    def pin(self, canvas_id: str):
+        with self._lock:
+            self._pinned.add(canvas_id)
+
+    def unpin(self, canvas_id: str):
+        """Makes a canvas evictable again, enforcing the budget it may have been holding over."""
+        with self._lock:
+            self._pinned.discard(canvas_id)
+            self._enforce_budget()
+
+    def discard(self, canvas_id: str) -> Optional[Any]:
+        """Removes an entry without calling on_evict. Returns its value."""
+        with self._lock:
+            self._pinned.discard(canvas_id)
+            entry = self._entries.pop(canvas_id, None)
+            return entry["value"] if entry else None
+
+    def values(self) -> List[Any]:
+        with self._lock:
+            return [entry["value"] for entry in self._entries.values()]
+
+    @staticmethod
+    def _size_of(value: Any) -> int:
+        return value.estimate_size() if hasattr(value, "estimate_size") else 0
+
+    def _enforce_budget(self, keep: Optional[str] = None):
+        total = sum(self._size_of(e["value"]) for e in self._entries.values())
+        for canvas_id in list(self._entries.keys()):
+            if total <= self.max_bytes and len(self._entries) <= self.max_entries:
+                break
+            if canvas_id in self._pinned or canvas_id == keep:
+                continue
+            entry = self._entries.pop(canvas_id)
+            total -= self._size_of(entry["value"])
+            self.evictions += 1
+            logger.info(f"Evicted canvas {canvas_id} from memory")
+            if self.on_evict:
+                self.on_evict(canvas_id, entry["value"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            canvases = {}
+            for canvas_id, entry in self._entries.items():
+                canvases[canvas_id] = {
+                    "resident_bytes": self._size_of(entry["value"]),
+                    "load_time_ms": entry["load_time_ms"],
+                    "hits": entry["hits"],
+                    "pinned": canvas_id in self._pinned,
+                    "last_access": entry["last_access"],
+                }
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": sum(c["resident_bytes"] for c in canvases.values()),
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "canvases": canvases,
+            }
@@ -0,0 +1,83 @@
+import networkx as nx
+from typing import Dict, Any, Optional, Tuple
+from collections import deque
+from uuid import uuid4
+import threading
+
+from .edge_layers import touched_edges
+
+
+def changed_entities(graph: nx.DiGraph, op: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, str], ...]]:
+    """
+    Nodes and edges whose state op changes, as (node ids, (source, target) pairs).
+    Must be called before the op is applied. Edge ops only list their endpoints
+    when they create them; removing a node lists all of its edges.
+    """
+    kind = op.get("op")
+    if kind in ("add_node", "update_node", "remove_node"):
+        return (op["id"],), tuple(touched_edges(graph, op))
+    if kind == "add_edge":
+        created = tuple(n for n in (op["source"], op["target"]) if not graph.has_node(n))
+        return created, ((op["source"], op["target"]),)
+    if kind in ("update_edge", "remove_edge"):
+        return (), ((op["source"], op["target"]),)
+    return (), ()
+
+
+class ChangeLog:
+    """
+    Bounded in-memory record of what each graph version changed on a canvas, so
+    clients can fetch only what changed since the version they last saw.
+    The epoch identifies this record: versions restart after a reload, and a
+    client holding a version from another epoch (or older than the oldest
+    retained one) needs a full snapshot instead.
+    """
+    def __init__(self, max_entries: int = 10000):
+        self.epoch = uuid4().hex[:8]
+        self._entries: deque = deque(maxlen=max(max_entries, 1))
+        # Versions up to and including this one are no longer covered by the log
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def append(self, version: int, kind: str, nodes: Tuple[str, ...], edges: Tuple[Tuple[str, str], ...]):
+        with self._lock:
+            if len(self._entries) == self._entries.maxlen:
+                self._floor = self._entries[0][0]
+            self._entries.append((version, kind, nodes, edges))
+
+    def truncate(self, version: int):
+        """Forgets everything up to version, e.g. after a rollback rewrote the graph outside the log."""
+        with self._lock:
+            self._entries.clear()
+            self._floor = version
+
+    def changes_since(self, version: int, epoch: Optional[str] = None
+                      ) -> Optional[Tuple[Dict[str, str], Dict[Tuple[str, str], str]]]:
+        """
+        Nodes and edges changed after version, each mapped to the kind of the first op
+        that changed it in that span. None when the log cannot answer (other epoch,
+        or version older than what is retained).
+        """
+        with self._lock:
+            if (epoch is not None and epoch != self.epoch) or version < self._floor:
+                return None
+            nodes: Dict[str, str] = {}
+            edges: Dict[Tuple[str, str], str] = {}
+            for entry_version, kind, entry_nodes, entry_edges in reversed(self._entries):
+                if entry_version <= version:
+                    break
+                # Walking backwards, so later assignments are earlier ops
+                for node_id in entry_nodes:
+                    nodes[node_id] = kind
+                for edge in entry_edges:
+                    edges[edge] = kind
+            return nodes, edges
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "epoch": self.epoch,
+                "entries": len(self._entries),
+                "max_entries": self._entries.maxlen,
+                "oldest_version": self._entries[0][0] if self._entries else None,
+            }
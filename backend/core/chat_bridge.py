@@ -38,11 +38,18 @@ class ChatBridge:
             logger.warning("GEMINI_API_KEY not found environment variable. LLM features will be mocked.")
             self.model = None
 
-    def calculate_context(self, selected_nodes: List[str], depth: int) -> Dict[str, Any]:
+    def calculate_context(self, selected_nodes: List[str], depth: int,
+                          edge_types: Optional[List[str]] = None, max_nodes: Optional[int] = None,
+                          max_bytes: Optional[int] = None, min_confidence: Optional[float] = None,
+                          ranking: str = "bfs") -> Dict[str, Any]:
         """
         Calculates the blast radius and prepares context for the UI and LLM.
+        edge_types and min_confidence limit which edges are followed; max_nodes and
+        max_bytes cap the context, keeping the nearest nodes (ranking "bfs") or the
+        most relevant ones by personalized PageRank (ranking "pagerank").
         """
-        subgraph = self.weaver.get_subgraph(selected_nodes, depth)
+        subgraph = self.weaver.get_subgraph(selected_nodes, depth, edge_types=edge_types, max_nodes=max_nodes,
+                                            max_bytes=max_bytes, min_confidence=min_confidence, ranking=ranking)
         
         # Calculate Dominant Module (REQ-LOG-03)
         module_counts = {}
@@ -65,7 +72,12 @@ class ChatBridge:
             "dominant_module": dominant_module,
             "stats": {
                 "node_count": total_nodes,
-                "edge_count": len(subgraph["edges"])
+                "edge_count": len(subgraph["edges"]),
+                "bytes": subgraph["bytes"],
+                "hops": subgraph["hops"],
+                "truncated": subgraph["truncated"],
+                "stop_reason": subgraph["stop_reason"],
+                "ranking": ranking
             }
         }
 
@@ -78,7 +90,9 @@ class ChatBridge:
         lines.append("### CONTEXT NODES ###")
         for node in context_data["context_nodes"]:
             # Strip unnecessary keys (REQ-NFR-03 - simplistic implementation)
-            content = node.get("content", "")
+            # Bodies are fetched from the blob store only when a prompt is built.
+            # Read through the node's own digest: the session may belong to a canvas that is no longer active.
+            content = self.weaver.read_content(node)
             lines.append(f"ID: [{node['id']}] | Type: {node['type']} | Content: {content}")
             
         lines.append("\n### JUSTIFIED EDGES (RELATIONSHIPS) ###")
@@ -452,7 +466,7 @@ class ChatBridge:
         Current Summary: {node.get('summary', '')}
         Topic: {node.get('main_topic', 'Uncategorized')}
         Module: {node.get('module', 'General')}
-        Original Content: {node.get('content', '')[:2000]}...
+        Original Content: {self.weaver.get_node_content(node_id)[:2000]}...
         
         Connected Context (Neighbors):
         {neighbor_text}
@@ -502,12 +516,12 @@ class ChatBridge:
         Source Node:
         Title: {source.get('title', source_id)}
         Summary: {source.get('summary', '')}
-        Content Snippet: {source.get('content', '')[:500]}
+        Content Snippet: {self.weaver.get_node_content(source_id)[:500]}
         
         Target Node:
         Title: {target.get('title', target_id)}
         Summary: {target.get('summary', '')}
-        Content Snippet: {target.get('content', '')[:500]}
+        Content Snippet: {self.weaver.get_node_content(target_id)[:500]}
         
         User Hint (Optional): {user_hint if user_hint else "None"}
         
@@ -549,7 +563,7 @@ class ChatBridge:
         Title: {node.get('title', node_id)}
         Type: {node.get('node_type', 'unknown')}
         Topic: {node.get('main_topic', 'Uncategorized')}
-        Content: {node.get('content', '')[:1000]}...
+        Content: {self.weaver.get_node_content(node_id)[:1000]}...
         
         Instructions:
         1. Determine the optimal number of sub-components to cover the parent concept completely without overlap.
@@ -602,7 +616,7 @@ class ChatBridge:
         Child Node:
         Title: {node.get('title', node_id)}
         Type: {node.get('node_type', 'unknown')}
-        Content: {node.get('content', '')[:1000]}...
+        Content: {self.weaver.get_node_content(node_id)[:1000]}...
         
         Instructions:
         1. Identify the broader category or system this node belongs to.
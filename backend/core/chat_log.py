@@ -0,0 +1,108 @@
+from typing import List, Dict, Any, Optional
+import logging
+import threading
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+LOG_FILENAME = "chat.log.jsonl"
+LEGACY_FILENAME = "chat.json"
+
+
+class ChatLog:
+    """
+    Append-only chat store for one canvas.
+    Each message is one JSON line ({"session_id": ..., "message": {...}}), and an
+    in-memory index maps session ids to the byte offsets of their records, so a
+    turn costs one small append and a session is read back without scanning the file.
+    """
+    def __init__(self, canvas_dir: str):
+        self.log_file = os.path.join(canvas_dir, LOG_FILENAME)
+        self.legacy_file = os.path.join(canvas_dir, LEGACY_FILENAME)
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, List[int]]] = None
+
+    def has_legacy(self) -> bool:
+        return os.path.exists(self.legacy_file)
+
+    @staticmethod
+    def _encode(session_id: str, message: Dict[str, Any]) -> bytes:
+        record = {"session_id": session_id, "message": message}
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode('utf-8')
+
+    def _load_index(self) -> Dict[str, List[int]]:
+        """Builds the session index on first use by scanning the log once."""
+        if self._index is not None:
+            return self._index
+        index: Dict[str, List[int]] = {}
+        if os.path.exists(self.log_file):
+            with open(self.log_file, 'rb') as f:
+                offset = 0
+                for line in f:
+                    try:
+                        session_id = json.loads(line)["session_id"]
+                        index.setdefault(session_id, []).append(offset)
+                    except (json.JSONDecodeError, KeyError):
+                        logger.warning(f"Skipping unreadable chat record at offset {offset} in {self.log_file}")
+                    offset += len(line)
+        self._index = index
+        return index
+
+    def append(self, session_id: str, message: Dict[str, Any]) -> int:
+        """Appends one message. Returns the byte offset of its record."""
+        payload = self._encode(session_id, message)
+        with self._lock:
+            index = self._load_index()
+            with open(self.log_file, 'ab') as f:
+                offset = f.tell()
+                f.write(payload)
+            index.setdefault(session_id, []).append(offset)
+        return offset
+
+    def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            offsets = list(self._load_index().get(session_id, []))
+        messages = []
+        if not offsets:
+            return messages
+        with open(self.log_file, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                messages.append(json.loads(f.readline())["message"])
+        return messages
+
+    def compact_legacy(self) -> Dict[str, Any]:
+        """
+        Rewrites a legacy chat.json, which stored the full message list again on
+        every turn, into one record per message. The original is kept as chat.json.bak.
+        """
+        try:
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to read legacy chat history {self.legacy_file}: {e}")
+            return {"sessions": 0, "messages": 0}
+
+        # Later entries for a session are supersets of earlier ones; keep the longest.
+        sessions: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in history if isinstance(history, list) else []:
+            session_id = entry.get("session_id")
+            messages = entry.get("messages", [])
+            if session_id and len(messages) >= len(sessions.get(session_id, [])):
+                sessions[session_id] = messages
+
+        with self._lock:
+            existing = self._load_index()
+            with open(self.log_file, 'ab') as f:
+                for session_id, messages in sessions.items():
+                    if session_id in existing:
+                        continue
+                    for message in messages:
+                        existing.setdefault(session_id, []).append(f.tell())
+                        f.write(self._encode(session_id, message))
+
+        os.replace(self.legacy_file, self.legacy_file + ".bak")
+        count = sum(len(m) for m in sessions.values())
+        logger.info(f"Compacted {self.legacy_file}: {len(history)} snapshots -> {count} messages in {len(sessions)} sessions")
+        return {"sessions": len(sessions), "messages": count}
@@ -0,0 +1,79 @@
+from typing import Dict, Any, Hashable, Iterable, Optional, Set
+from collections import OrderedDict
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ContextCache:
+    """
+    LRU cache of context expansions for one canvas, keyed by (seeds, depth, filters).
+    Each entry remembers every node its expansion looked at, and a mutation drops
+    only the entries that looked at a node it touched, so a cached neighborhood
+    survives edits elsewhere on the canvas.
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(max_entries, 1)
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._by_node: Dict[Any, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["result"]
+
+    def put(self, key: Hashable, result: Dict[str, Any], depends_on: Iterable[Any]):
+        with self._lock:
+            self._drop(key)
+            deps = set(depends_on)
+            self._entries[key] = {"result": result, "deps": deps}
+            for node_id in deps:
+                self._by_node.setdefault(node_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for node_id in entry["deps"]:
+            keys = self._by_node.get(node_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_node[node_id]
+
+    def invalidate(self, node_ids: Iterable[Any]):
+        """Drops every entry whose expansion looked at one of node_ids."""
+        with self._lock:
+            for node_id in node_ids:
+                for key in list(self._by_node.get(node_id, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_node.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,231 @@
+import networkx as nx
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+import logging
+import sys
+import time
+
+from .edge_layers import edge_confidence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Node attributes kept as columns: one small integer code per node plus a vocabulary
+NODE_COLUMNS = ("type", "status", "module")
+
+
+class CSRGraph:
+    """
+    Read-optimized, immutable copy of a canvas graph.
+    Node ids are interned to integers, in- and out-adjacency are stored in CSR form
+    (indptr/indices NumPy arrays, with edge type codes and confidences alongside),
+    and a few node attributes are stored as columns. Neighborhood expansion and
+    analytics then run as array operations instead of dict-of-dict walks.
+    Built from the NetworkX graph; node attribute updates are patched in place,
+    anything that changes the topology needs a rebuild.
+    """
+    def __init__(self, ids: List[Any], src: "np.ndarray", dst: "np.ndarray",
+                 edge_types: "np.ndarray", confidence: "np.ndarray", type_codes: Dict[Any, int],
+                 columns: Dict[str, Tuple["np.ndarray", List[Any]]]):
+        self.ids = ids
+        self.index: Dict[Any, int] = {node_id: i for i, node_id in enumerate(ids)}
+        self.type_codes = type_codes
+        self.columns = columns
+        n = len(ids)
+
+        out_order = np.argsort(src, kind="stable")
+        self.out_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.out_indptr[1:])
+        self.out_indices = dst[out_order]
+        self.out_types = edge_types[out_order]
+        self.out_confidence = confidence[out_order]
+
+        in_order = np.argsort(dst, kind="stable")
+        self.in_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=n), out=self.in_indptr[1:])
+        self.in_indices = src[in_order]
+        self.in_types = edge_types[in_order]
+        self.in_confidence = confidence[in_order]
+
+    @classmethod
+    def from_graph(cls, graph: nx.DiGraph) -> "CSRGraph":
+        start = time.perf_counter()
+        ids = list(graph.nodes())
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        m = graph.number_of_edges()
+        type_codes: Dict[Any, int] = {}
+
+        # Filling Python lists and converting once is much faster than item-wise array writes
+        src, dst, edge_types, confidence = [], [], [], []
+        for u, v, d in graph.edges(data=True):
+            src.append(index[u])
+            dst.append(index[v])
+            edge_type = d.get("type")
+            code = type_codes.get(edge_type)
+            if code is None:
+                code = type_codes[edge_type] = len(type_codes)
+            edge_types.append(code)
+            confidence.append(edge_confidence(d))
+        src = np.array(src, dtype=np.int32)
+        dst = np.array(dst, dtype=np.int32)
+        edge_types = np.array(edge_types, dtype=np.int16)
+        confidence = np.array(confidence, dtype=np.float64)
+
+        columns = {}
+        for name in NODE_COLUMNS:
+            vocabulary: Dict[Any, int] = {}
+            codes = np.fromiter(
+                (vocabulary.setdefault(data.get(name), len(vocabulary)) for _, data in graph.nodes(data=True)),
+                dtype=np.int32, count=len(ids))
+            columns[name] = (codes, list(vocabulary))
+
+        engine = cls(ids, src, dst, edge_types, confidence, type_codes, columns)
+        logger.debug(f"Built CSR read engine ({len(ids)} nodes, {m} edges) in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return engine
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.out_indices)
+
+    def has_node(self, node_id: Any) -> bool:
+        return node_id in self.index
+
+    def patch_node(self, node_id: Any, data: Dict[str, Any]):
+        """Refreshes the column values of one node after an attribute update."""
+        i = self.index[node_id]
+        for name, (codes, vocabulary) in self.columns.items():
+            value = data.get(name)
+            try:
+                code = vocabulary.index(value)
+            except ValueError:
+                code = len(vocabulary)
+                vocabulary.append(value)
+            codes[i] = code
+
+    def column_value(self, name: str, node_id: Any) -> Any:
+        codes, vocabulary = self.columns[name]
+        return vocabulary[codes[self.index[node_id]]]
+
+    def nbytes(self) -> int:
+        """Approximate resident size: the arrays plus the id table."""
+        arrays = [self.out_indptr, self.out_indices, self.out_types, self.out_confidence,
+                  self.in_indptr, self.in_indices, self.in_types, self.in_confidence]
+        arrays += [codes for codes, _ in self.columns.values()]
+        id_table = sys.getsizeof(self.ids) + sys.getsizeof(self.index) + sum(sys.getsizeof(i) for i in self.ids)
+        return sum(a.nbytes for a in arrays) + id_table
+
+    def _type_filter(self, edge_types: Optional[Iterable[Any]]) -> Optional["np.ndarray"]:
+        if edge_types is None:
+            return None
+        return np.array([self.type_codes[t] for t in edge_types if t in self.type_codes], dtype=np.int16)
+
+    @staticmethod
+    def _gather(frontier: "np.ndarray", indptr: "np.ndarray") -> "np.ndarray":
+        """Positions in the CSR arrays of all edges leaving the frontier nodes."""
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # Concatenated ranges [start, start + count) without a Python loop
+        shifts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return shifts + np.arange(total)
+
+    def _step(self, frontier: "np.ndarray", codes: Optional["np.ndarray"], min_confidence: Optional[float],
+              direction: str) -> "np.ndarray":
+        found = []
+        sides = []
+        if direction in ("out", "both"):
+            sides.append((self.out_indptr, self.out_indices, self.out_types, self.out_confidence))
+        if direction in ("in", "both"):
+            sides.append((self.in_indptr, self.in_indices, self.in_types, self.in_confidence))
+        for indptr, indices, types, confidence in sides:
+            positions = self._gather(frontier, indptr)
+            if codes is not None:
+                positions = positions[np.isin(types[positions], codes)]
+            if min_confidence is not None:
+                positions = positions[confidence[positions] >= min_confidence]
+            found.append(indices[positions])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int32)
+
+    def rings(self, seeds: Iterable[Any], depth: int, edge_types: Optional[Iterable[Any]] = None,
+              min_confidence: Optional[float] = None, direction: str = "both") -> List["np.ndarray"]:
+        """
+        Breadth-first rings around the seeds: rings[0] are the seeds themselves and
+        rings[d] the nodes first reached at hop d, as arrays of node indexes.
+        Stops early when a ring comes back empty.
+        """
+        visited = np.zeros(self.num_nodes, dtype=bool)
+        frontier = np.unique(np.array([self.index[s] for s in seeds if s in self.index], dtype=np.int64))
+        visited[frontier] = True
+        rings = [frontier]
+        codes = self._type_filter(edge_types)
+        for _ in range(depth):
+            if len(frontier) == 0:
+                break
+            reached = self._step(frontier, codes, min_confidence, direction)
+            frontier = np.unique(reached[~visited[reached]]).astype(np.int64)
+            visited[frontier] = True
+            if len(frontier) == 0:
+                break
+            rings.append(frontier)
+        return rings
+
+    def k_hop(self, seeds: Iterable[Any], depth: int, edge_types: Optional[Iterable[Any]] = None,
+              min_confidence: Optional[float] = None) -> Set[Any]:
+        """Ids of the seeds and every node within depth hops, in either direction."""
+        rings = self.rings(seeds, depth, edge_types, min_confidence)
+        ids = self.ids
+        return {ids[i] for ring in rings for i in ring.tolist()}
+
+    def degree_centrality(self) -> "np.ndarray":
+        """(in + out degree) / (n - 1) per node, as nx.degree_centrality computes it."""
+        n = self.num_nodes
+        if n <= 1:
+            return np.ones(n, dtype=np.float64)
+        degree = np.diff(self.out_indptr) + np.diff(self.in_indptr)
+        return degree / (n - 1)
+
+    def component_labels(self) -> "np.ndarray":
+        """
+        Weakly connected component label per node (the smallest node index in it).
+        Min-label propagation over all edges with pointer jumping; each round is a
+        few array passes, and rounds stop once no label changes.
+        """
+        n = self.num_nodes
+        labels = np.arange(n, dtype=np.int64)
+        if self.num_edges == 0:
+            return labels
+        src = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.out_indptr))
+        dst = self.out_indices.astype(np.int64)
+        while True:
+            lowest = np.minimum(labels[src], labels[dst])
+            updated = labels.copy()
+            np.minimum.at(updated, src, lowest)
+            np.minimum.at(updated, dst, lowest)
+            while True:
+                jumped = updated[updated]
+                if np.array_equal(jumped, updated):
+                    break
+                updated = jumped
+            if np.array_equal(updated, labels):
+                return labels
+            labels = updated
+
+    def components(self) -> List[List[Any]]:
+        """Weakly connected components as lists of ids, largest first."""
+        labels = self.component_labels()
+        order = np.argsort(labels, kind="stable")
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        groups = np.split(order, boundaries) if len(order) else []
+        groups.sort(key=len, reverse=True)
+        ids = self.ids
+        return [[ids[i] for i in group.tolist()] for group in groups]
@@ -0,0 +1,110 @@
+import networkx as nx
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Layer for edges that carry no 'type' attribute
+UNTYPED = None
+
+
+def edge_confidence(attrs: Dict[str, Any]) -> float:
+    """An edge's confidence; edges without a usable one (e.g. 'contains') count as certain."""
+    try:
+        return float(attrs.get("confidence", 1.0))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def touched_edges(graph: nx.DiGraph, op: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    Edges whose existence or type may change when op is applied.
+    Must be called before the op is applied: removing a node drops all its edges.
+    """
+    kind = op.get("op")
+    if kind in ("add_edge", "update_edge", "remove_edge"):
+        return [(op["source"], op["target"])]
+    if kind == "remove_node" and graph.has_node(op["id"]):
+        return list(graph.in_edges(op["id"])) + list(graph.out_edges(op["id"]))
+    return []
+
+
+class EdgeLayers:
+    """
+    Separate adjacency per edge type ('contains', 'reference', ...).
+    Hierarchy walks and type-filtered expansion read only the layer they need
+    instead of iterating every edge of a node and checking its type.
+    Kept current through refresh() with the edges a mutation touches.
+    """
+    def __init__(self):
+        self._out: Dict[Any, Dict[str, Set[str]]] = {}
+        self._in: Dict[Any, Dict[str, Set[str]]] = {}
+
+    def rebuild(self, graph: nx.DiGraph):
+        self._out.clear()
+        self._in.clear()
+        for u, v, d in graph.edges(data=True):
+            self._add(u, v, d.get("type", UNTYPED))
+
+    def refresh(self, graph: nx.DiGraph, edges: Iterable[Tuple[str, str]]):
+        for u, v in edges:
+            self._remove(u, v)
+            if graph.has_edge(u, v):
+                self._add(u, v, graph.edges[u, v].get("type", UNTYPED))
+
+    def _add(self, u: str, v: str, edge_type: Any):
+        self._out.setdefault(edge_type, {}).setdefault(u, set()).add(v)
+        self._in.setdefault(edge_type, {}).setdefault(v, set()).add(u)
+
+    def _remove(self, u: str, v: str):
+        # An edge lives in exactly one layer and there are only a handful of layers
+        for edge_type in list(self._out):
+            targets = self._out[edge_type].get(u)
+            if targets is None or v not in targets:
+                continue
+            targets.discard(v)
+            if not targets:
+                del self._out[edge_type][u]
+            sources = self._in[edge_type][v]
+            sources.discard(u)
+            if not sources:
+                del self._in[edge_type][v]
+            if not self._out[edge_type]:
+                del self._out[edge_type]
+                del self._in[edge_type]
+            return
+
+    def types(self) -> List[Any]:
+        return list(self._out)
+
+    def _layers(self, adjacency: Dict[Any, Dict[str, Set[str]]], edge_types: Optional[Iterable[Any]]):
+        if edge_types is None:
+            return adjacency.values()
+        return [adjacency[t] for t in edge_types if t in adjacency]
+
+    def successors(self, node_id: str, edge_types: Optional[Iterable[Any]] = None) -> Set[str]:
+        """Targets of a node's outgoing edges of the given types (all types when None)."""
+        result = set()
+        for layer in self._layers(self._out, edge_types):
+            result.update(layer.get(node_id, ()))
+        return result
+
+    def predecessors(self, node_id: str, edge_types: Optional[Iterable[Any]] = None) -> Set[str]:
+        """Sources of a node's incoming edges of the given types (all types when None)."""
+        result = set()
+        for layer in self._layers(self._in, edge_types):
+            result.update(layer.get(node_id, ()))
+        return result
+
+    def neighbors(self, node_id: str, edge_types: Optional[Iterable[Any]] = None) -> Set[str]:
+        """Nodes linked to node_id in either direction by edges of the given types."""
+        return self.successors(node_id, edge_types) | self.predecessors(node_id, edge_types)
+
+    def edges(self, edge_types: Optional[Iterable[Any]] = None) -> Iterator[Tuple[str, str]]:
+        for layer in self._layers(self._out, edge_types):
+            for u, targets in layer.items():
+                for v in targets:
+                    yield u, v
+
+    def count(self, edge_type: Any) -> int:
+        return sum(len(targets) for targets in self._out.get(edge_type, {}).values())
+
+    def get_stats(self) -> Dict[str, int]:
+        return {str(edge_type): self.count(edge_type) for edge_type in self._out}
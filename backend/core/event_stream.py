@@ -0,0 +1,190 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import deque
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Event types pushed to clients
+NODE_ADDED = "node_added"
+NODE_UPDATED = "node_updated"
+NODE_REMOVED = "node_removed"
+EDGE_ADDED = "edge_added"
+EDGE_UPDATED = "edge_updated"
+EDGE_REMOVED = "edge_removed"
+SHADOW_COMMITTED = "shadow_committed"
+# The stream cannot say what changed (history dropped, client too slow): refetch
+RESYNC = "resync"
+
+_UPDATES = (NODE_UPDATED, EDGE_UPDATED)
+
+Event = Tuple[int, str, Dict[str, Any]]
+
+
+def op_events(graph, op: Dict[str, Any], edges: List[Tuple[str, str]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Typed events for one mutation record. Must be called before the op is applied;
+    edges are the edges it touches (see touched_edges).
+    """
+    kind = op.get("op")
+    if kind == "add_node":
+        return [(NODE_ADDED, {"id": op["id"]})]
+    if kind == "update_node":
+        events = [(NODE_UPDATED, {"id": op["id"], "fields": sorted(op.get("attrs", {}))})]
+        if (op.get("attrs", {}).get("status") == "committed" and graph.has_node(op["id"])
+                and graph.nodes[op["id"]].get("status") == "shadow"):
+            events.append((SHADOW_COMMITTED, {"id": op["id"]}))
+        return events
+    if kind == "remove_node":
+        return [(EDGE_REMOVED, {"source": u, "target": v}) for u, v in edges] + [(NODE_REMOVED, {"id": op["id"]})]
+    if kind == "add_edge":
+        events = [(NODE_ADDED, {"id": n}) for n in (op["source"], op["target"]) if not graph.has_node(n)]
+        event_type = EDGE_UPDATED if graph.has_edge(op["source"], op["target"]) else EDGE_ADDED
+        return events + [(event_type, {"source": op["source"], "target": op["target"]})]
+    if kind == "update_edge":
+        return [(EDGE_UPDATED, {"source": op["source"], "target": op["target"], "fields": sorted(op.get("attrs", {}))})]
+    if kind == "remove_edge":
+        return [(EDGE_REMOVED, {"source": op["source"], "target": op["target"]})]
+    return []
+
+
+def coalesce(events: List[Event]) -> List[Event]:
+    """Keeps only the last update event per node or edge; adds and removes stay in order."""
+    seen = set()
+    kept = []
+    for event in reversed(events):
+        _, event_type, payload = event
+        if event_type in _UPDATES:
+            key = (event_type, payload.get("id"), payload.get("source"), payload.get("target"))
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(event)
+    kept.reverse()
+    return kept
+
+
+class Subscription:
+    """
+    One client's queue of pending events. Publishing never blocks: a client that
+    falls more than max_pending events behind loses its queue and is told to
+    resync from the last version it received instead.
+    """
+    def __init__(self, hub: "EventHub", max_pending: int):
+        self._hub = hub
+        self.max_pending = max_pending
+        self._pending: deque = deque()
+        self._lock = threading.Lock()
+        self.overflowed = False
+        self.closed = False
+        self.delivered_version = 0
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+
+    def _push(self, events: List[Event]):
+        with self._lock:
+            if self.closed:
+                return
+            if self.overflowed or len(self._pending) + len(events) > self.max_pending:
+                self.overflowed = True
+                self._pending.clear()
+            else:
+                self._pending.extend(events)
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The client's event loop is gone
+            pass
+
+    def _close(self):
+        with self._lock:
+            self.closed = True
+        self._wake()
+
+    async def next_batch(self, timeout: float, window: float, max_events: int) -> Optional[List[Event]]:
+        """
+        Waits up to timeout for events, then keeps collecting for window seconds (or
+        until max_events) so bursts go out together. Returns [] on timeout, None once
+        the stream is closed, and [(version, RESYNC, ...)] after an overflow.
+        """
+        if not self._pending and not self.overflowed and not self.closed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        deadline = time.monotonic() + window
+        while len(self._pending) < max_events and not self.overflowed and not self.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        with self._lock:
+            if self.closed:
+                return None
+            if self.overflowed:
+                self.overflowed = False
+                return [(self.delivered_version, RESYNC, {"since": self.delivered_version, "reason": "backpressure"})]
+            batch = [self._pending.popleft() for _ in range(min(max_events, len(self._pending)))]
+        if batch:
+            self.delivered_version = max(self.delivered_version, batch[-1][0])
+        return coalesce(batch)
+
+    def close(self):
+        self._hub.unsubscribe(self)
+
+
+class EventHub:
+    """
+    Fans out typed mutation events of one canvas to its live subscribers
+    (the /events stream). Costs nothing while nobody is subscribed.
+    """
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max(max_pending, 1)
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        """Must be called from the subscriber's event loop."""
+        subscription = Subscription(self, self.max_pending)
+        with self._lock:
+            self._subscribers = self._subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not subscription]
+        subscription._close()
+
+    def publish(self, version: int, events: List[Tuple[str, Dict[str, Any]]]):
+        subscribers = self._subscribers
+        if not subscribers or not events:
+            return
+        stamped = [(version, event_type, payload) for event_type, payload in events]
+        self.published += len(stamped)
+        for subscription in subscribers:
+            subscription._push(stamped)
+
+    def close(self):
+        """Ends every subscription, e.g. when the canvas is unloaded; clients reconnect."""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscription in subscribers:
+            subscription._close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"subscribers": len(self._subscribers), "max_pending": self.max_pending, "published": self.published}
@@ -0,0 +1,125 @@
+import networkx as nx
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import logging
+
+from .edge_layers import EdgeLayers, edge_confidence
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_context_bytes(node_id: str, data: Dict[str, Any]) -> int:
+    """
+    Rough size of a node once hydrated into a prompt: its body (content_length,
+    or inline content in older data) plus id, title and summary.
+    """
+    body = data.get("content_length")
+    if not isinstance(body, int):
+        body = len(str(data.get("content", "")))
+    return body + len(str(node_id)) + len(str(data.get("title", ""))) + len(str(data.get("summary", "")))
+
+
+def _incident(graph: nx.DiGraph, layers: Optional[EdgeLayers], node_id: str,
+              edge_types: Optional[List[str]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(neighbor, edge attributes) for every edge of node_id in either direction."""
+    if edge_types is None or layers is None:
+        for _, v, d in graph.out_edges(node_id, data=True):
+            if edge_types is None or d.get("type") in edge_types:
+                yield v, d
+        for u, _, d in graph.in_edges(node_id, data=True):
+            if edge_types is None or d.get("type") in edge_types:
+                yield u, d
+        return
+    for v in layers.successors(node_id, edge_types):
+        yield v, graph.edges[node_id, v]
+    for u in layers.predecessors(node_id, edge_types):
+        yield u, graph.edges[u, node_id]
+
+
+def expand(graph: nx.DiGraph, seeds: List[str], depth: int,
+           max_nodes: Optional[int] = None, max_bytes: Optional[int] = None,
+           edge_types: Optional[List[str]] = None, min_confidence: Optional[float] = None,
+           include_shadow: bool = False, layers: Optional[EdgeLayers] = None) -> Dict[str, Any]:
+    """
+    Breadth-first context expansion from the seeds, up to depth hops in either direction.
+
+    Only edges of edge_types (all when None) with a confidence of at least
+    min_confidence are followed. Within a hop, each frontier node's neighbors are
+    taken strongest edge first, and expansion stops the moment max_nodes or
+    max_bytes (see estimate_context_bytes) would be exceeded, so a hub node never
+    has its whole ring materialized. Seeds are always included.
+    Shadow nodes are traversed but, unless include_shadow, not returned or counted.
+
+    Returns {"nodes": [ids in expansion order], "hops": [{"hop", "nodes", "bytes"}, ...],
+             "bytes": int, "truncated": bool, "stop_reason": None | "max_nodes" | "max_bytes",
+             "reached": every node looked at, whether kept or not}.
+    """
+    selected: List[str] = []
+    seen = set()
+    considered = set()
+    hops: List[Dict[str, int]] = []
+    used_bytes = 0
+    stop_reason = None
+
+    def listed(node_id: str) -> bool:
+        return include_shadow or graph.nodes[node_id].get("status") != "shadow"
+
+    # Hop 0: the seeds themselves, regardless of budget
+    frontier = []
+    seed_bytes = 0
+    for node_id in seeds:
+        if node_id in seen or not graph.has_node(node_id):
+            continue
+        seen.add(node_id)
+        frontier.append(node_id)
+        if listed(node_id):
+            selected.append(node_id)
+            seed_bytes += estimate_context_bytes(node_id, graph.nodes[node_id])
+    used_bytes += seed_bytes
+    hops.append({"hop": 0, "nodes": len(selected), "bytes": seed_bytes})
+
+    for hop in range(1, depth + 1):
+        if not frontier or stop_reason:
+            break
+        next_frontier = []
+        hop_nodes = 0
+        hop_bytes = 0
+        for node_id in frontier:
+            candidates = {}
+            for neighbor, attrs in _incident(graph, layers, node_id, edge_types):
+                if neighbor in seen:
+                    continue
+                confidence = edge_confidence(attrs)
+                if min_confidence is not None and confidence < min_confidence:
+                    continue
+                if confidence > candidates.get(neighbor, -1.0):
+                    candidates[neighbor] = confidence
+            considered.update(candidates)
+            for neighbor in sorted(candidates, key=lambda n: (-candidates[n], str(n))):
+                if listed(neighbor):
+                    if max_nodes is not None and len(selected) >= max_nodes:
+                        stop_reason = "max_nodes"
+                        break
+                    size = estimate_context_bytes(neighbor, graph.nodes[neighbor])
+                    if max_bytes is not None and used_bytes + size > max_bytes:
+                        stop_reason = "max_bytes"
+                        break
+                    selected.append(neighbor)
+                    used_bytes += size
+                    hop_nodes += 1
+                    hop_bytes += size
+                seen.add(neighbor)
+                next_frontier.append(neighbor)
+            if stop_reason:
+                break
+        if hop_nodes or next_frontier:
+            hops.append({"hop": hop, "nodes": hop_nodes, "bytes": hop_bytes})
+        frontier = next_frontier
+
+    return {
+        "nodes": selected,
+        "hops": hops,
+        "bytes": used_bytes,
+        "truncated": stop_reason is not None,
+        "stop_reason": stop_reason,
+        "reached": seen | considered,
+    }
@@ -1,12 +1,33 @@
 import networkx as nx
-from typing import List, Dict, Set, Any, Optional
+from typing import List, Dict, Set, Any, Iterable, Optional, Tuple
 import logging
 import json
 import os
 import shutil
 import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
-from uuid import uuid4
+
+from .graph_store import STORAGE_BACKENDS, apply_op, capture_undo, create_graph_store, open_graph_store, node_link_data, node_link_graph
+from .write_behind import WriteBehindBuffer
+from .blob_store import BlobStore, ContentCache
+from .chat_log import ChatLog
+from .canvas_cache import CanvasCache
+from .snapshot_codec import SNAPSHOT_FORMATS
+from .hierarchy import ROOT, FolderIndex, TreeIndex, ReachabilityIndex, touched_nodes
+from .edge_layers import EdgeLayers, edge_confidence, touched_edges
+from .expansion import estimate_context_bytes, expand
+from .ranking import personalized_pagerank, select_top
+from .context_cache import ContextCache
+from .change_log import ChangeLog, changed_entities
+from .response_cache import CachedResponse, GraphResponseCache
+from .spatial_index import GridIndex, cluster_points, node_position
+from .position_store import PositionStore
+from .event_stream import EventHub, NODE_REMOVED, NODE_UPDATED, EDGE_REMOVED, EDGE_UPDATED, RESYNC, op_events
+from .csr_graph import CSRGraph, NUMPY_AVAILABLE
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +38,15 @@ DATA_DIR = os.path.join(ROOT_DIR, "data")
 CANVASES_DIR = os.path.join(DATA_DIR, "canvases")
 CANVAS_INDEX_FILE = os.path.join(DATA_DIR, "canvases.json")
 SETTINGS_FILE = os.path.join(DATA_DIR, "nexus_settings.json")
+BLOBS_DIR = os.path.join(DATA_DIR, "blobs")
+
+# Named field sets for node responses. "render" is what the canvas needs to draw
+# a node card; "full" (None) is every attribute plus the hydrated content.
+NODE_FIELD_PROFILES: Dict[str, Optional[Tuple[str, ...]]] = {
+    "render": ("id", "title", "label", "type", "node_type", "status", "position", "thumbnail",
+               "summary", "style", "color", "tags", "parent_id", "video_id"),
+    "full": None,
+}
 
 class SettingsRegistry:
     """
@@ -55,6 +85,45 @@ class SettingsRegistry:
             "content_generation": {
                 "tone": "Technical", # Technical, Concise, Creative
                 "detail_level": "High"
+            },
+            "content_cache": {
+                "max_mb": 64
+            },
+            "canvas_cache": {
+                "max_mb": 512, # memory budget for canvases kept loaded
+                "max_canvases": 8
+            },
+            "context_cache": {
+                "max_entries": 256 # context expansions kept per canvas
+            },
+            "change_log": {
+                "max_entries": 10000 # mutations kept for /graph/changes; older clients get a full snapshot
+            },
+            "graph_response_cache": {
+                "max_entries": 8 # serialized /graph responses (one per field selection) kept per canvas; br needs brotli, else gzip only
+            },
+            "read_engine": {
+                "backend": "networkx" # networkx, or csr (NumPy arrays) for expansion and analytics; csr falls back to networkx without NumPy
+            },
+            "events": {
+                "max_pending": 1000, # events queued per /events client before it is told to resync
+                "batch_ms": 50 # events arriving within this window are sent as one message
+            },
+            "positions": {
+                "flush_interval_ms": 1000 # dragged positions are written to positions.bin at most this often
+            },
+            "viewport": {
+                "cell_size": 512, # spatial index grid cell, in canvas units
+                "cluster_below_zoom": 0.35, # /graph/viewport aggregates nodes into clusters below this zoom
+                "cluster_px": 160, # on-screen size of one cluster cell
+                "max_nodes": 5000 # also cluster when more nodes than this are visible
+            },
+            "persistence": {
+                "default_storage": "json", # json (snapshot + journal) or sqlite
+                "default_snapshot_format": "json", # json (graph.json) or binary (graph.snap: msgpack if installed, else compact JSON)
+                "write_behind": True,
+                "flush_interval_ms": 250,
+                "flush_max_ops": 200
             }
         }
         self._save_settings(default_settings)
@@ -132,11 +201,29 @@ class CanvasRegistry:
             return True
         return False
 
-    def create_canvas(self, name: str) -> str:
+    def get_storage_backend(self, canvas_id: str) -> str:
+        return self.index["canvases"].get(canvas_id, {}).get("storage", "json")
+
+    def set_storage_backend(self, canvas_id: str, backend: str):
+        if canvas_id in self.index["canvases"]:
+            self.index["canvases"][canvas_id]["storage"] = backend
+            self._save_index(self.index)
+
+    def get_snapshot_format(self, canvas_id: str) -> str:
+        return self.index["canvases"].get(canvas_id, {}).get("snapshot_format", "json")
+
+    def set_snapshot_format(self, canvas_id: str, snapshot_format: str):
+        if canvas_id in self.index["canvases"]:
+            self.index["canvases"][canvas_id]["snapshot_format"] = snapshot_format
+            self._save_index(self.index)
+
+    def create_canvas(self, name: str, storage: str = "json", snapshot_format: str = "json") -> str:
         canvas_id = name.lower().replace(" ", "_") + "_" + datetime.now().strftime("%H%M%S")
         self.index["canvases"][canvas_id] = {
             "id": canvas_id,
             "name": name,
+            "storage": storage,
+            "snapshot_format": snapshot_format,
             "created_at": datetime.now().isoformat(),
             "last_modified": datetime.now().isoformat()
         }
@@ -258,37 +345,405 @@ class ContextRegistry:
                 lines.append(f"  - Module: {mod} ({desc})")
         return "\n".join(lines)
 
+class CanvasState:
+    """
+    Everything loaded for one canvas: the graph, its store, the context registry,
+    the chat log and the canvas's write-behind buffer.
+    States are kept in the Weaver's canvas cache, so switching back to a recently
+    used canvas does not touch the disk, and writes buffered for a canvas are
+    flushed to that canvas even after the user has switched away from it.
+    """
+    def __init__(self, canvas_id: str, store, graph: nx.DiGraph, registry: "ContextRegistry",
+                 chat_log: ChatLog, on_persist=None, context_cache_entries: int = 256,
+                 change_log_entries: int = 10000, graph_response_entries: int = 8,
+                 spatial_cell_size: float = 512.0, positions_flush_ms: int = 1000,
+                 events_max_pending: int = 1000):
+        self.canvas_id = canvas_id
+        self.canvas_dir = os.path.join(CANVASES_DIR, canvas_id)
+        self.graph_file = os.path.join(self.canvas_dir, "graph.json")
+        self.store = store
+        self.graph = graph
+        self.registry = registry
+        self.chat_log = chat_log
+        self.write_buffer: Optional[WriteBehindBuffer] = None
+        self.mutations = 0
+        self._on_persist = on_persist
+        self._size = 0
+        self._size_at = -1
+        # Serializes mutations of this canvas, and readers that must see one consistent
+        # version (snapshots, change lists), across request threads and the flusher
+        self.lock = threading.RLock()
+        # Each thread's open Weaver.batch() transaction on this canvas, see open_batch()
+        self.batches = threading.local()
+        # Bumped for every applied op; node_versions holds the version that last touched each node
+        self.version = 0
+        self.node_versions: Dict[str, int] = {}
+        # Version of the last full rebuild, for nodes untouched since
+        self._rebuilt_at = 0
+        self.context_cache = ContextCache(context_cache_entries)
+        self.change_log = ChangeLog(change_log_entries)
+        self.graph_responses = GraphResponseCache(graph_response_entries)
+        self.events = EventHub(events_max_pending)
+        # Dragged positions, persisted apart from the graph; they override the 'position' attribute
+        self.positions = PositionStore(os.path.join(self.canvas_dir, "positions.bin"), positions_flush_ms)
+        self.positions.load(known_ids=graph)
+        
+        # Derived indexes, kept current by apply() and rebuilt from the graph at load
+        self.edge_layers = EdgeLayers()
+        self.folder_index = FolderIndex()
+        self.tree_index = TreeIndex()
+        self.reachability = ReachabilityIndex()
+        self.spatial_index = GridIndex(spatial_cell_size)
+        self.indexes = [self.folder_index, self.tree_index, self.reachability, self.spatial_index]
+        # Optional read-optimized copy of the graph; built on first use, see read_engine()
+        self._read_engine: Optional[CSRGraph] = None
+        self.rebuild_indexes()
+
+    def rebuild_indexes(self, undone_since: Optional[int] = None):
+        # Used after rollbacks that bypass apply(): nothing derived can be trusted.
+        # With undone_since, the change log re-reports whatever the undone versions
+        # touched rather than forcing every client back to a full snapshot.
+        with self.lock:
+            undone = self.change_log.changes_since(undone_since) if undone_since is not None else None
+            self.version += 1
+            self.context_cache.clear()
+            if undone is None:
+                self.change_log.truncate(self.version)
+                self.node_versions.clear()
+                self._rebuilt_at = self.version
+                self.events.publish(self.version, [(RESYNC, {"since": None, "reason": "rebuild"})])
+            else:
+                self.change_log.append(self.version, "rollback", tuple(undone[0]), tuple(undone[1]))
+                for node_id in undone[0]:
+                    self.node_versions[node_id] = self.version
+                for edge in undone[1]:
+                    for node_id in edge:
+                        self.node_versions[node_id] = self.version
+                if self.events.active:
+                    # Undone entities are reported in their restored state
+                    self.events.publish(self.version, [
+                        (EDGE_UPDATED, {"source": u, "target": v}) if self.graph.has_edge(u, v)
+                        else (EDGE_REMOVED, {"source": u, "target": v}) for u, v in undone[1]
+                    ] + [
+                        (NODE_UPDATED, {"id": n}) if self.graph.has_node(n) else (NODE_REMOVED, {"id": n})
+                        for n in undone[0]
+                    ])
+            self._read_engine = None
+            self.edge_layers.rebuild(self.graph)
+            # Rebuilding clears the grid, so positions discarded by a rollback leave no cells behind
+            for index in self.indexes:
+                index.rebuild(self.graph)
+            for node_id, x, y in self.positions.items():
+                if self.graph.has_node(node_id):
+                    self.spatial_index.move(node_id, x, y)
+                else:
+                    # Left over from an op that was rolled back
+                    self.positions.discard(node_id)
+
+    @staticmethod
+    def _replaces_position(op: Dict[str, Any]) -> bool:
+        """Whether op sets or drops a node's position, superseding the stored one."""
+        kind = op.get("op")
+        return kind == "remove_node" or (kind in ("add_node", "update_node") and "position" in op.get("attrs", {}))
+
+    def capture_position_undo(self, op: Dict[str, Any]):
+        """Like capture_undo(), for the stored position op is about to discard."""
+        if not self._replaces_position(op):
+            return lambda: None
+        node_id = op["id"]
+        stored = self.positions.get(node_id)
+        return lambda: self.positions.restore(node_id, stored)
+
+    def move_nodes(self, positions: Dict[str, Tuple[float, float]]):
+        """
+        Records new positions in the position store only: no graph op, no journal
+        record, no snapshot. Readers still see the move as a new graph version.
+        """
+        with self.lock:
+            self.positions.set_many(positions)
+            for node_id, (x, y) in positions.items():
+                self.spatial_index.move(node_id, x, y)
+            self.version += 1
+            self.change_log.append(self.version, "update_node", tuple(positions), ())
+            for node_id in positions:
+                self.node_versions[node_id] = self.version
+            self.events.publish(self.version, [(NODE_UPDATED, {"id": n, "fields": ["position"]}) for n in positions])
+
+    def node_position(self, node_id: str) -> Optional[Dict[str, float]]:
+        """The stored position of node_id as {"x", "y"}, if it has one."""
+        stored = self.positions.get(node_id)
+        return {"x": stored[0], "y": stored[1]} if stored is not None else None
+
+    def open_batch(self) -> Optional[Dict[str, Any]]:
+        """The calling thread's open Weaver.batch() transaction: {"ops", "undo", "version"}."""
+        return getattr(self.batches, "current", None)
+
+    def node_version(self, node_id: str) -> int:
+        """The graph version that last changed node_id or its edges."""
+        return self.node_versions.get(node_id, self._rebuilt_at)
+
+    def apply(self, op: Dict[str, Any]):
+        """Applies one mutation record to the graph and updates the derived indexes."""
+        with self.lock:
+            if op.get("op") == "batch":
+                for sub_op in op["ops"]:
+                    self.apply(sub_op)
+                return
+            touched = touched_nodes(self.graph, op)
+            edges = touched_edges(self.graph, op)
+            changed_nodes, changed_edges = changed_entities(self.graph, op)
+            events = op_events(self.graph, op, edges) if self.events.active else None
+            if self._replaces_position(op):
+                self.positions.discard(op["id"])
+            apply_op(self.graph, op)
+            self.version += 1
+            self.change_log.append(self.version, op["op"], changed_nodes, changed_edges)
+            if events:
+                self.events.publish(self.version, events)
+            # Nodes whose attributes or incident edges changed
+            changed = touched.union(*edges)
+            for node_id in changed:
+                self.node_versions[node_id] = self.version
+            self.context_cache.invalidate(changed)
+            self.edge_layers.refresh(self.graph, edges)
+            for index in self.indexes:
+                index.refresh(self.graph, touched)
+            for node_id in touched:
+                stored = self.positions.get(node_id)
+                if stored is not None:
+                    self.spatial_index.move(node_id, *stored)
+            if self._read_engine is not None:
+                # Attribute updates (positions, status, ...) are patched; topology changes drop the engine
+                if op.get("op") == "update_node" and self._read_engine.has_node(op["id"]):
+                    self._read_engine.patch_node(op["id"], self.graph.nodes[op["id"]])
+                else:
+                    self._read_engine = None
+
+    def read_engine(self) -> Optional[CSRGraph]:
+        """The CSR copy of the graph, rebuilt lazily after topology changes. None without NumPy."""
+        if not NUMPY_AVAILABLE:
+            return None
+        with self.lock:
+            if self._read_engine is None:
+                self._read_engine = CSRGraph.from_graph(self.graph)
+            return self._read_engine
+
+    def enable_write_behind(self, interval_ms: int, max_ops: int):
+        self.write_buffer = WriteBehindBuffer(self.persist, interval_ms=interval_ms, max_ops=max_ops)
+
+    def record(self, ops: List[Dict[str, Any]]):
+        if not ops:
+            return
+        self.mutations += 1
+        if self.write_buffer:
+            self.write_buffer.submit(ops)
+            return
+        try:
+            self.persist(ops)
+        except Exception as e:
+            logger.error(f"Failed to journal graph mutation: {e}")
+
+    def persist(self, ops: List[Dict[str, Any]]) -> int:
+        """Appends records to the journal, compacting when due. Returns bytes written."""
+        written = self.store.append(ops)
+        # Compact only under the canvas lock, so the snapshot never catches a mutation or
+        # batch half-applied. Don't wait for it: its holder may be waiting on this flush;
+        # a skipped compaction is retried on the next one. A thread flushing from inside
+        # its own batch holds the lock already, but must not snapshot the batch either.
+        if (self.store.needs_compaction() and self.open_batch() is None
+                and self.lock.acquire(blocking=False)):
+            try:
+                written += self.store.compact(self.graph)
+                logger.info(f"Compacted graph journal into {self.graph_file}")
+            except RuntimeError as e:
+                # The graph changed underneath the snapshot; the journal is intact, retry on the next flush.
+                logger.warning(f"Deferred journal compaction: {e}")
+            finally:
+                self.lock.release()
+        if self._on_persist:
+            self._on_persist(self.canvas_id)
+        return written
+
+    def flush(self) -> int:
+        """Synchronously persists any buffered mutations and positions. Returns bytes written."""
+        written = self.positions.flush()
+        if self.write_buffer:
+            written += self.write_buffer.flush()
+        return written
+
+    def close(self):
+        """Flushes pending writes, stops the flusher and closes the store."""
+        self.events.close()
+        self.positions.close()
+        if self.write_buffer:
+            self.write_buffer.close()
+            # Anything recorded after close (e.g. by a late request) is persisted synchronously
+            self.write_buffer = None
+        self.store.close()
+
+    def estimate_size(self) -> int:
+        """
+        Rough resident size of the canvas in bytes, used for the cache's memory budget.
+        Recomputed only after the graph has changed.
+        """
+        if self._size_at != self.mutations:
+            attrs_bytes = sum(len(json.dumps(d, default=str)) for _, d in self.graph.nodes(data=True))
+            attrs_bytes += sum(len(json.dumps(d, default=str)) for _, _, d in self.graph.edges(data=True))
+            # networkx keeps several dicts per node and edge; ~400/~250 bytes covers that overhead
+            self._size = attrs_bytes + 400 * self.graph.number_of_nodes() + 250 * self.graph.number_of_edges()
+            self._size_at = self.mutations
+        return self._size
+
+    def get_persistence_stats(self) -> Dict[str, Any]:
+        stats = {
+            "canvas_id": self.canvas_id,
+            "write_behind": self.write_buffer is not None,
+            **self.store.get_stats()
+        }
+        if self.write_buffer:
+            stats.update(self.write_buffer.get_stats())
+        stats["positions"] = self.positions.get_stats()
+        return stats
+
 class Weaver:
     """
     The Weaver (Logic Engine)
     Manages Graph, Context, and Chat History for the Active Canvas.
     Enforces Strict Hierarchy: Topic > Module > Parent > Child.
     """
-    def __init__(self):
+    def __init__(self, canvas_id: Optional[str] = None, shared: Optional["Weaver"] = None):
+        # A canvas-scoped Weaver stays on canvas_id regardless of the active canvas
+        self.pinned_canvas_id = canvas_id
+        self.canvas: Optional[CanvasState] = None
+        if shared is not None:
+            # Scoped Weavers share settings, caches and loaded canvases with the main one
+            self.settings = shared.settings
+            self.canvas_registry = shared.canvas_registry
+            self.hierarchy_levels = shared.hierarchy_levels
+            self.blobs = shared.blobs
+            self.content_cache = shared.content_cache
+            self.canvas_cache = shared.canvas_cache
+            self._load_lock = shared._load_lock
+            self.load_active_canvas()
+            return
+
         self.settings = SettingsRegistry()
         self.canvas_registry = CanvasRegistry()
-        self.active_canvas_id = self.canvas_registry.get_active_id()
         
         self.hierarchy_levels = {
             "topic": 0, "module": 1, "parent": 2, "child": 3
         }
         
+        # Node bodies live in a content-addressed store shared by all canvases;
+        # the graph only keeps content_digest and content_length.
+        # Bodies are loaded on demand through a byte-bounded LRU cache.
+        self.blobs = BlobStore(BLOBS_DIR)
+        cache_mb = self.settings.get("content_cache", {}).get("max_mb", 64)
+        self.content_cache = ContentCache(self.blobs, max_bytes=int(cache_mb * 1024 * 1024))
+        
+        # Recently used canvases stay loaded; the least recently used are
+        # flushed and dropped once the memory budget is exceeded.
+        canvas_cache = self.settings.get("canvas_cache", {})
+        self.canvas_cache = CanvasCache(
+            max_bytes=int(canvas_cache.get("max_mb", 512) * 1024 * 1024),
+            max_entries=canvas_cache.get("max_canvases", 8),
+            on_evict=self._on_canvas_evicted
+        )
+        self._load_lock = threading.RLock()
+        
         # Initialize Graph and Context for active canvas
         self.load_active_canvas()
 
+    # Per-canvas state is reached through the bound CanvasState
+    @property
+    def active_canvas_id(self) -> str:
+        return self.canvas.canvas_id
+
+    @property
+    def graph(self) -> nx.DiGraph:
+        return self.canvas.graph
+
+    @property
+    def store(self):
+        return self.canvas.store
+
+    @property
+    def registry(self) -> ContextRegistry:
+        return self.canvas.registry
+
+    @property
+    def chat_log(self) -> ChatLog:
+        return self.canvas.chat_log
+
+    @property
+    def graph_file(self) -> str:
+        return self.canvas.graph_file
+
     def load_active_canvas(self):
-        self.active_canvas_id = self.canvas_registry.get_active_id()
-        self.graph_file = os.path.join(CANVASES_DIR, self.active_canvas_id, "graph.json")
-        self.chat_file = os.path.join(CANVASES_DIR, self.active_canvas_id, "chat.json")
+        if self.pinned_canvas_id:
+            # Scoped Weavers re-resolve their state, which may have been evicted since the last request
+            self.canvas = self._get_canvas_state(self.pinned_canvas_id)
+            return
+        canvas_id = self.canvas_registry.get_active_id()
+        state = self._get_canvas_state(canvas_id)
+        self.canvas_cache.pin(canvas_id)
+        previous, self.canvas = self.canvas, state
+        if previous and previous.canvas_id != canvas_id:
+            self.canvas_cache.unpin(previous.canvas_id)
+        logger.info(f"Weaver loaded canvas: {canvas_id}")
+
+    def _get_canvas_state(self, canvas_id: str) -> CanvasState:
+        """Returns the loaded state of a canvas, loading it into the canvas cache on a miss."""
+        state = self.canvas_cache.get(canvas_id)
+        if state is not None:
+            return state
+        with self._load_lock:
+            # Another request may have loaded it while we waited
+            state = self.canvas_cache.peek(canvas_id)
+            if state is None:
+                start = time.perf_counter()
+                state = self._load_canvas_state(canvas_id)
+                load_ms = (time.perf_counter() - start) * 1000
+                self.canvas_cache.put(canvas_id, state, load_time_ms=load_ms)
+                logger.info(f"Loaded canvas {canvas_id} in {load_ms:.1f} ms")
+        return state
+
+    def _load_canvas_state(self, canvas_id: str) -> CanvasState:
+        canvas_dir = os.path.join(CANVASES_DIR, canvas_id)
+        os.makedirs(canvas_dir, exist_ok=True)
         
-        # Ensure dir
-        os.makedirs(os.path.dirname(self.graph_file), exist_ok=True)
+        store = self._open_store(canvas_id)
+        graph = self._load_graph_file(canvas_id, store)
+        self._migrate_inline_content(graph, store)
+        chat_log = ChatLog(canvas_dir)
+        if chat_log.has_legacy():
+            chat_log.compact_legacy()
         
-        self.graph = self._load_graph_file()
-        self.registry = ContextRegistry(self.active_canvas_id)
-        self.chat_history = self._load_chat_history()
+        state = CanvasState(canvas_id, store, graph, ContextRegistry(canvas_id), chat_log,
+                            on_persist=self._touch_canvas,
+                            context_cache_entries=self.settings.get("context_cache", {}).get("max_entries", 256),
+                            change_log_entries=self.settings.get("change_log", {}).get("max_entries", 10000),
+                            graph_response_entries=self.settings.get("graph_response_cache", {}).get("max_entries", 8),
+                            spatial_cell_size=self.settings.get("viewport", {}).get("cell_size", 512),
+                            positions_flush_ms=self.settings.get("positions", {}).get("flush_interval_ms", 1000),
+                            events_max_pending=self.settings.get("events", {}).get("max_pending", 1000))
         
-        logger.info(f"Weaver loaded canvas: {self.active_canvas_id}")
+        # Write-behind persistence: mutations are buffered and flushed in coalesced batches
+        persistence = self.settings.get("persistence", {})
+        if persistence.get("write_behind", True):
+            state.enable_write_behind(
+                interval_ms=persistence.get("flush_interval_ms", 250),
+                max_ops=persistence.get("flush_max_ops", 200)
+            )
+        return state
+
+    def _open_store(self, canvas_id: str):
+        return open_graph_store(os.path.join(CANVASES_DIR, canvas_id),
+                                self.canvas_registry.get_storage_backend(canvas_id),
+                                self.canvas_registry.get_snapshot_format(canvas_id))
+
+    def _on_canvas_evicted(self, canvas_id: str, state: CanvasState):
+        state.close()
 
     def switch_canvas(self, canvas_id: str):
         if self.canvas_registry.set_active_id(canvas_id):
@@ -297,53 +752,451 @@ class Weaver:
         return False
 
     def create_canvas(self, name: str):
-        new_id = self.canvas_registry.create_canvas(name)
+        persistence = self.settings.get("persistence", {})
+        storage = persistence.get("default_storage", "json")
+        snapshot_format = persistence.get("default_snapshot_format", "json")
+        new_id = self.canvas_registry.create_canvas(
+            name,
+            storage=storage if storage in STORAGE_BACKENDS else "json",
+            snapshot_format=snapshot_format if snapshot_format in SNAPSHOT_FORMATS else "json"
+        )
         self.switch_canvas(new_id)
         return new_id
-        
+
+    def import_canvas(self, name: str, graph_data: Dict[str, Any], files: Optional[Dict[str, bytes]] = None) -> str:
+        """
+        Creates a canvas from an export: node-link graph data plus canvas files
+        (context.json, chat.log.jsonl, or a legacy chat.json, which is converted
+        to the chat log). Inline node bodies move to the blob store on load.
+        Makes the new canvas active and returns its id.
+        """
+        persistence = self.settings.get("persistence", {})
+        storage = persistence.get("default_storage", "json")
+        snapshot_format = persistence.get("default_snapshot_format", "json")
+        new_id = self.canvas_registry.create_canvas(
+            name,
+            storage=storage if storage in STORAGE_BACKENDS else "json",
+            snapshot_format=snapshot_format if snapshot_format in SNAPSHOT_FORMATS else "json"
+        )
+        canvas_dir = os.path.join(CANVASES_DIR, new_id)
+        os.makedirs(canvas_dir, exist_ok=True)
+        for filename, payload in (files or {}).items():
+            with open(os.path.join(canvas_dir, filename), 'wb') as f:
+                f.write(payload)
+        chat_log = ChatLog(canvas_dir)
+        if chat_log.has_legacy():
+            chat_log.compact_legacy()
+
+        store = self._open_store(new_id)
+        store.import_graph(node_link_graph(graph_data))
+        store.close()
+        self.switch_canvas(new_id)
+        logger.info(f"Imported canvas {new_id} ({name})")
+        return new_id
+
     def delete_canvas(self, canvas_id: str):
-        return self.canvas_registry.delete_canvas(canvas_id)
+        if canvas_id == "default":
+            return False
+        state = self.canvas_cache.discard(canvas_id)
+        if state:
+            state.close()
+        deleted = self.canvas_registry.delete_canvas(canvas_id)
+        if canvas_id == self.active_canvas_id:
+            # Fall back to the canvas the registry made active
+            self.load_active_canvas()
+        return deleted
+
+    def get_canvas_cache_stats(self) -> Dict[str, Any]:
+        return self.canvas_cache.get_stats()
+
+    def set_storage_backend(self, canvas_id: str, backend: str) -> bool:
+        """
+        Migrates a canvas to another storage backend ('json' or 'sqlite').
+        The old backend's files are left in place as a backup.
+        """
+        if backend not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend: {backend}")
+        if canvas_id not in self.canvas_registry.index["canvases"]:
+            return False
+
+        current = self.canvas_registry.get_storage_backend(canvas_id)
+        if current == backend:
+            return True
+
+        canvas_dir = os.path.join(CANVASES_DIR, canvas_id)
+        snapshot_format = self.canvas_registry.get_snapshot_format(canvas_id)
+        state = self.canvas_cache.peek(canvas_id)
+        if state:
+            # Writers wait from the flush until the swap, so none lands in the old store
+            with state.lock:
+                state.flush()
+                new_store = create_graph_store(canvas_dir, backend, snapshot_format)
+                new_store.import_graph(state.graph)
+                self.canvas_registry.set_storage_backend(canvas_id, backend)
+                state.store.close()
+                state.store = new_store
+        else:
+            old_store = self._open_store(canvas_id)
+            graph = old_store.load() if old_store.exists() else nx.DiGraph()
+            old_store.close()
+            new_store = create_graph_store(canvas_dir, backend, snapshot_format)
+            new_store.import_graph(graph)
+            self.canvas_registry.set_storage_backend(canvas_id, backend)
+            new_store.close()
+        logger.info(f"Migrated canvas {canvas_id} from {current} to {backend} storage")
+        return True
+
+    def set_snapshot_format(self, canvas_id: str, snapshot_format: str) -> bool:
+        """
+        Switches a JSON-backed canvas between the node-link graph.json snapshot and
+        the compact binary graph.snap. The snapshot is rewritten right away.
+        For SQLite canvases the choice is recorded and applies if they move back to JSON.
+        """
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+        if canvas_id not in self.canvas_registry.index["canvases"]:
+            return False
 
-    def _load_graph_file(self):
-        if os.path.exists(self.graph_file):
+        self.canvas_registry.set_snapshot_format(canvas_id, snapshot_format)
+        if self.canvas_registry.get_storage_backend(canvas_id) != "json":
+            return True
+
+        state = self.canvas_cache.peek(canvas_id)
+        if state:
+            with state.lock:
+                state.flush()
+                state.store.snapshot_format = snapshot_format
+                state.store.compact(state.graph)
+        else:
+            store = self._open_store(canvas_id)
+            if store.exists():
+                store.compact(store.load())
+            store.close()
+        logger.info(f"Canvas {canvas_id} now uses {snapshot_format} snapshots")
+        return True
+
+    def _load_graph_file(self, canvas_id: str, store):
+        if store.exists():
             try:
-                with open(self.graph_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                return nx.node_link_graph(data)
+                return store.load()
             except Exception as e:
                 logger.error(f"Failed to load graph: {e}")
                 return nx.DiGraph()
         
         # Migration: Check root
         legacy_path = os.path.join(DATA_DIR, "nexus_graph.json")
-        if self.active_canvas_id == "default" and os.path.exists(legacy_path):
+        if canvas_id == "default" and os.path.exists(legacy_path):
              logger.info("Migrating legacy graph to default canvas...")
              try:
                  with open(legacy_path, 'r', encoding='utf-8') as f:
                      data = json.load(f)
-                 g = nx.node_link_graph(data)
-                 data_export = nx.node_link_data(g)
-                 with open(self.graph_file, 'w', encoding='utf-8') as f:
-                     json.dump(data_export, f, indent=2)
+                 g = node_link_graph(data)
+                 store.import_graph(g)
                  return g
              except Exception as e:
                  logger.error(f"Migration failed: {e}")
 
         return nx.DiGraph()
 
+    def _migrate_inline_content(self, graph: nx.DiGraph, store):
+        """Moves node content still stored inline (pre blob store data) into the blob store."""
+        migrated = 0
+        for node_id, data in graph.nodes(data=True):
+            if "content" in data:
+                data.update(self._externalize_content({"content": data.pop("content")}))
+                migrated += 1
+        if migrated:
+            store.import_graph(graph)
+            logger.info(f"Moved content of {migrated} nodes into the blob store")
+
+    def _externalize_content(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        """Replaces a 'content' attribute with the digest and length of its blob."""
+        if "content" not in attrs:
+            return attrs
+        attrs = dict(attrs)
+        content = attrs.pop("content")
+        digest, length = self.content_cache.put(content if isinstance(content, str) else str(content or ""))
+        attrs["content_digest"] = digest
+        attrs["content_length"] = length
+        return attrs
+
+    def read_content(self, node_data: Dict[str, Any]) -> str:
+        """Returns the body referenced by a node's attributes, whichever canvas it came from."""
+        digest = node_data.get("content_digest")
+        if digest:
+            return self.content_cache.get(digest) or ""
+        return node_data.get("content", "")
+
+    def get_node_content(self, node_id: str) -> str:
+        """Returns a node's body, loading it through the content cache."""
+        if not self.graph.has_node(node_id):
+            return ""
+        return self.read_content(self.graph.nodes[node_id])
+
+    def get_node_data(self, node_id: str, include_content: bool = True,
+                      fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Returns a copy of a node's attributes, with its body hydrated on request.
+        With fields, only those attributes are copied and the body is hydrated
+        only if "content" is among them.
+        """
+        position = self.canvas.node_position(node_id)
+        if fields is None:
+            node_data = dict(self.graph.nodes[node_id])
+            if include_content:
+                node_data["content"] = self.get_node_content(node_id)
+            if position is not None:
+                node_data["position"] = position
+            return node_data
+        attrs = self.graph.nodes[node_id]
+        node_data = {field: attrs[field] for field in fields if field in attrs}
+        if "content" in fields:
+            node_data["content"] = self.get_node_content(node_id)
+        if position is not None and "position" in fields:
+            node_data["position"] = position
+        return node_data
+
+    def get_node_etag(self, node_id: str, fields: Optional[Iterable[str]] = None) -> str:
+        """
+        Changes whenever the node or its edges change; used for conditional requests.
+        Each field selection is a different representation and gets its own tag.
+        """
+        etag = f"{self.canvas.change_log.epoch}-{self.canvas.node_version(node_id)}"
+        if fields is not None:
+            etag += f"-{zlib.crc32(','.join(sorted(fields)).encode()):08x}"
+        return f'"{etag}"'
+
+    def collect_blob_garbage(self) -> Dict[str, Any]:
+        """Removes content blobs no longer referenced by any canvas."""
+        self.flush_all()
+        live = set()
+        for canvas_id in self.canvas_registry.index["canvases"]:
+            state = self.canvas_cache.peek(canvas_id)
+            if state:
+                graph = state.graph
+            else:
+                store = self._open_store(canvas_id)
+                graph = store.load() if store.exists() else nx.DiGraph()
+                store.close()
+            live.update(d["content_digest"] for _, d in graph.nodes(data=True) if d.get("content_digest"))
+        return self.blobs.collect_garbage(live)
+
+    def get_content_cache_stats(self) -> Dict[str, Any]:
+        return self.content_cache.get_stats()
+
     def save_graph(self):
-        """Persists the current graph state to disk."""
-        data = nx.node_link_data(self.graph)
+        """
+        Persists the current graph state to disk.
+        Flushes buffered writes and compacts the store (a fresh snapshot for
+        the JSON backend, a WAL checkpoint for SQLite).
+        """
         try:
-            with open(self.graph_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"Graph saved to {self.graph_file}")
-            # Update canvas last_modified timestamp
-            if self.active_canvas_id in self.canvas_registry.index["canvases"]:
-                self.canvas_registry.index["canvases"][self.active_canvas_id]["last_modified"] = datetime.now().isoformat()
-                self.canvas_registry._save_index(self.canvas_registry.index)
+            self.flush()
+            canvas = self.canvas
+            with canvas.lock:
+                if canvas.open_batch() is not None:
+                    # The snapshot would hold the batch's uncommitted ops; the journal has the rest
+                    logger.info("Skipped compaction inside an open batch")
+                else:
+                    self.store.compact(self.graph)
+                    logger.info(f"Graph saved to {self.graph_file}")
+            self._touch_canvas(self.active_canvas_id)
         except Exception as e:
             logger.error(f"Failed to save graph: {e}")
+
+    def _touch_canvas(self, canvas_id: str):
+        """Updates the canvas last_modified timestamp."""
+        if canvas_id in self.canvas_registry.index["canvases"]:
+            self.canvas_registry.index["canvases"][canvas_id]["last_modified"] = datetime.now().isoformat()
+            self.canvas_registry._save_index(self.canvas_registry.index)
+
+    def _apply(self, *ops: Dict[str, Any]):
+        """
+        Applies mutation records to the in-memory graph and journals them.
+        All graph mutations go through here so that persistence cost scales with
+        the size of the change rather than the size of the graph.
+        """
+        canvas = self.canvas
+        # Held through the journal write too, so records are journaled in the order applied
+        with canvas.lock:
+            batch = canvas.open_batch()
+            for op in ops:
+                if batch is not None:
+                    batch["undo"].append(capture_undo(self.graph, op))
+                    batch["undo"].append(canvas.capture_position_undo(op))
+                canvas.apply(op)
+            if batch is not None:
+                batch["ops"].extend(ops)
+                return
+            self._record(list(ops))
+
+    def _record(self, ops: List[Dict[str, Any]]):
+        self.canvas.record(ops)
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups mutations into one transaction.
+        Mutations made inside the block are applied to the graph immediately (later
+        steps see earlier ones) but persisted once, as a single journal record, when
+        the block exits. If the block raises, every mutation is undone and nothing is
+        persisted. Nested batches (on the same thread) join the enclosing one.
+
+        The canvas lock is held for the whole block: mutations from other threads wait
+        for it instead of joining it, and no snapshot sees it half-done. Don't await
+        inside the block.
+        """
+        canvas = self.canvas
+        if canvas.open_batch() is not None:
+            yield
+            return
+        with canvas.lock:
+            batch = canvas.batches.current = {"ops": [], "undo": [], "version": canvas.version}
+            try:
+                yield
+            except BaseException:
+                canvas.batches.current = None
+                for revert in reversed(batch["undo"]):
+                    revert()
+                canvas.rebuild_indexes(undone_since=batch["version"])
+                logger.warning(f"Rolled back batch of {len(batch['undo'])} graph operations")
+                raise
+            canvas.batches.current = None
+            if batch["ops"]:
+                canvas.record([{"op": "batch", "ops": batch["ops"]}])
+
+    def apply_batch(self, operations: List[Dict[str, Any]]) -> int:
+        """
+        Validates and applies a list of node/edge operations as one transaction.
+        Operations use the mutation record format ({"op": "add_node", "id": ..., "attrs": {...}},
+        {"op": "add_edge", "source": ..., "target": ..., "attrs": {...}}, ...).
+        Raises ValueError, with nothing applied, if any operation is invalid.
+        Returns the number of operations applied.
+        """
+        with self.batch():
+            for i, op in enumerate(operations):
+                try:
+                    self._apply_checked(op)
+                except (KeyError, TypeError, ValueError) as e:
+                    raise ValueError(f"Operation {i} ({op.get('op')}) rejected: {e}")
+        return len(operations)
+
+    def _apply_checked(self, op: Dict[str, Any]):
+        kind = op.get("op")
+        attrs = dict(op.get("attrs") or {})
+        if kind == "add_node":
+            if not op.get("id"):
+                raise ValueError("missing node id")
+            attrs.setdefault("created_at", datetime.now().isoformat())
+            attrs.setdefault("status", "committed")
+            self._apply({"op": "add_node", "id": op["id"], "attrs": self._externalize_content(attrs)})
+        elif kind in ("update_node", "remove_node"):
+            if not self.graph.has_node(op["id"]):
+                raise ValueError(f"node {op['id']} does not exist")
+            if kind == "update_node":
+                self.update_node(op["id"], attrs)
+            else:
+                self.delete_node(op["id"])
+        elif kind == "add_edge":
+            attrs.setdefault("type", "reference")
+            self.validate_connection(op["source"], op["target"], attrs["type"])
+            self._apply({"op": "add_edge", "source": op["source"], "target": op["target"], "attrs": attrs})
+        elif kind in ("update_edge", "remove_edge"):
+            if not self.graph.has_edge(op["source"], op["target"]):
+                raise ValueError(f"edge {op['source']} -> {op['target']} does not exist")
+            if kind == "update_edge":
+                self.update_edge(op["source"], op["target"], attrs)
+            else:
+                self.delete_edge(op["source"], op["target"])
+        else:
+            raise ValueError(f"unknown operation '{kind}'")
+
+    def flush(self) -> int:
+        """Synchronously persists any buffered mutations of the active canvas. Returns bytes written."""
+        return self.canvas.flush()
+
+    def flush_all(self) -> int:
+        """Flushes buffered mutations of every loaded canvas."""
+        return sum(state.flush() for state in self.canvas_cache.values())
+
+    def close(self):
+        """Flushes pending writes and stops the background flushers (process shutdown)."""
+        for state in self.canvas_cache.values():
+            state.close()
+
+    def get_persistence_stats(self) -> Dict[str, Any]:
+        return self.canvas.get_persistence_stats()
+
+    def locked(self):
+        """
+        The canvas's mutation lock, for readers that must see one version throughout
+        (a snapshot and the version it is tagged with): `with weaver.locked(): ...`
+        """
+        return self.canvas.lock
+
+    def get_graph_version(self) -> Dict[str, Any]:
+        """The version clients pass back to get_changes(), with the epoch it belongs to."""
+        canvas = self.canvas
+        with canvas.lock:
+            return {"epoch": canvas.change_log.epoch, "version": canvas.version}
+
+    def get_changes(self, since: int, epoch: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Node and edge ids changed after version since, split by their current state:
+        {"nodes": {"added", "updated", "removed"}, "edges": {...}}. "added" means the
+        first change in the span was an add; clients can treat added and updated alike.
+        None when the change log cannot answer and a full snapshot is needed.
+        """
+        canvas = self.canvas
+        with canvas.lock:
+            if since > canvas.version:
+                return None
+            changes = canvas.change_log.changes_since(since, epoch)
+            if changes is None:
+                return None
+            node_kinds, edge_kinds = changes
+            nodes = {"added": [], "updated": [], "removed": []}
+            for node_id, kind in node_kinds.items():
+                if not self.graph.has_node(node_id):
+                    nodes["removed"].append(node_id)
+                else:
+                    nodes["added" if kind in ("add_node", "add_edge") else "updated"].append(node_id)
+            edges = {"added": [], "updated": [], "removed": []}
+            for edge, kind in edge_kinds.items():
+                if not self.graph.has_edge(*edge):
+                    edges["removed"].append(edge)
+                else:
+                    edges["added" if kind == "add_edge" else "updated"].append(edge)
+        return {"nodes": nodes, "edges": edges}
+
+    def subscribe_events(self):
+        """
+        A Subscription to this canvas's mutation events (see core.event_stream).
+        Call from the event loop that will read it, and close() it when done.
+        """
+        return self.canvas.events.subscribe()
+
+    def get_context_cache_stats(self) -> Dict[str, Any]:
+        return {
+            "canvas_id": self.active_canvas_id,
+            "graph_version": self.canvas.version,
+            **self.canvas.context_cache.get_stats()
+        }
+
+    def get_graph_response(self, variant: Any, build) -> CachedResponse:
+        """
+        The serialized graph response for variant (a hashable description of the
+        field selection) at the current version, built by build() when stale.
+        """
+        canvas = self.canvas
+        return canvas.graph_responses.get(canvas.change_log.epoch, canvas.version, variant, build)
+
+    def get_graph_response_cache_stats(self) -> Dict[str, Any]:
+        return {
+            "canvas_id": self.active_canvas_id,
+            "graph_version": self.canvas.version,
+            **self.canvas.graph_responses.get_stats()
+        }
     
     def save_all(self) -> Dict[str, Any]:
         """
@@ -371,14 +1224,6 @@ class Weaver:
         except Exception as e:
             save_status["errors"].append(f"context: {str(e)}")
         
-        try:
-            # Save chat history (if it exists)
-            if hasattr(self, 'chat_history'):
-                self.save_chat_history(self.chat_history)
-                save_status["saved"].append("chat_history")
-        except Exception as e:
-            save_status["errors"].append(f"chat_history: {str(e)}")
-        
         try:
             # Save settings
             self.settings._save_settings(self.settings.settings)
@@ -389,24 +1234,52 @@ class Weaver:
         logger.info(f"Manual save completed: {save_status}")
         return save_status
 
-    def _load_chat_history(self) -> List[Dict]:
-        """Loads chat history from disk."""
-        if os.path.exists(self.chat_file):
-            try:
-                with open(self.chat_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load chat history: {e}")
-        return []
-
-    def save_chat_history(self, history: List[Dict]):
-        """Saves chat history to disk."""
+    def export_graph_json(self) -> str:
+        """
+        Serializes the graph as node-link JSON (the graph.json interchange format).
+        Node bodies are inlined so the export does not depend on the blob store.
+        """
+        graph = self.graph.copy()
+        for node_id, data in graph.nodes(data=True):
+            position = self.canvas.node_position(node_id)
+            if position is not None:
+                data["position"] = position
+            if data.get("content_digest"):
+                data["content"] = self.get_node_content(node_id)
+                data.pop("content_digest", None)
+                data.pop("content_length", None)
+        return json.dumps(node_link_data(graph), indent=2)
+
+    def _chat_log_for(self, canvas_id: Optional[str]) -> ChatLog:
+        if not canvas_id or canvas_id == self.active_canvas_id:
+            return self.chat_log
+        state = self.canvas_cache.peek(canvas_id)
+        return state.chat_log if state else ChatLog(os.path.join(CANVASES_DIR, canvas_id))
+
+    def append_chat_message(self, session_id: str, message: Dict[str, Any], canvas_id: Optional[str] = None):
+        """
+        Persists one chat message to a canvas's append-only chat log
+        (the canvas the session was started on, defaulting to the active one).
+        """
+        if canvas_id and canvas_id not in self.canvas_registry.index["canvases"]:
+            logger.warning(f"Dropping chat message for deleted canvas {canvas_id}")
+            return
         try:
-            with open(self.chat_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2)
-            # logger.info("Chat history saved.") 
+            self._chat_log_for(canvas_id).append(session_id, message)
         except Exception as e:
-            logger.error(f"Failed to save chat history: {e}")
+            logger.error(f"Failed to save chat message: {e}")
+
+    def get_chat_messages(self, session_id: str, canvas_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self._chat_log_for(canvas_id).get_messages(session_id)
+
+    def compact_chat_logs(self) -> Dict[str, Any]:
+        """Converts any remaining legacy chat.json files, across all canvases, into chat logs."""
+        results = {}
+        for canvas_id in self.canvas_registry.index["canvases"]:
+            log = self._chat_log_for(canvas_id)
+            if log.has_legacy():
+                results[canvas_id] = log.compact_legacy()
+        return results
 
     def get_node_summaries(self, exclude_id: str = None) -> List[Dict[str, Any]]:
         """
@@ -452,15 +1325,16 @@ class Weaver:
         }
         if meta:
             attributes.update(meta)
+        attributes = self._externalize_content(attributes)
             
-        self.graph.add_node(node_id, **attributes)
+        ops = [{"op": "add_node", "id": node_id, "attrs": attributes}]
         
         # Dynamic Hierarchy: Link to Parent Folder if provided
         if parent_id and self.graph.has_node(parent_id):
             # Check if parent is actually a folder ideally, but for now we allow loose structure
-            self.graph.add_edge(parent_id, node_id, type="contains", weight=1.0)
+            ops.append({"op": "add_edge", "source": parent_id, "target": node_id, "attrs": {"type": "contains", "weight": 1.0}})
         
-        self.save_graph()
+        self._apply(*ops)
         return node_id
 
     def create_folder(self, name: str, parent_id: str = None) -> str:
@@ -468,46 +1342,11 @@ class Weaver:
         Creates a Folder node.
         Ensures filesystem-like structure: Folders are unique by (Parent, Name) tuple.
         """
-        # 1. Search for existing folder with same name under this parent
-        # Get all children of parent_id (or roots if parent_id is None)
-        candidate_ids = []
-        if parent_id:
-             if self.graph.has_node(parent_id):
-                 candidate_ids = [n for n in self.graph.neighbors(parent_id) 
-                                  if self.graph.has_edge(parent_id, n) and 
-                                  self.graph.edges[parent_id, n].get("type") == "contains"]
-        else:
-             # Roots: Nodes with no incoming 'contains' edges
-             # This is expensive to check every time, but necessary for correctness with this graph model
-             # Optimization: Check all nodes? No.
-             # Better: Just filter nodes by type='folder' and check checks
-             # For now, let's just create unique IDs and trust the graph structure
-             pass
-
-        # Check existence
-        existing_id = None
-        if parent_id:
-            for cid in candidate_ids:
-                if self.graph.nodes[cid].get("label") == name and self.graph.nodes[cid].get("type") == "folder":
-                    existing_id = cid
-                    break
-        else:
-            # Root search
-            # We iterate all folders and check if they are roots and match name
-            # This is slow, but safe for now.
-            for n, d in self.graph.nodes(data=True):
-                if d.get("type") == "folder" and d.get("label") == name:
-                    # Check if it is a root (no incoming contains edges)
-                    in_edges = self.graph.in_edges(n, data=True)
-                    is_root = True
-                    for u, v, data in in_edges:
-                        if data.get("type") == "contains":
-                            is_root = False
-                            break
-                    if is_root:
-                        existing_id = n
-                        break
-        
+        # 1. Look up an existing folder with the same name under this parent (index, O(1))
+        if parent_id and not self.graph.has_node(parent_id):
+            logger.warning(f"Parent node {parent_id} not found; creating folder '{name}' at root.")
+            parent_id = None
+        existing_id = self.canvas.folder_index.lookup(parent_id, name)
         if existing_id:
             return existing_id
 
@@ -521,12 +1360,12 @@ class Weaver:
             "created_at": datetime.now().isoformat(),
             "status": "committed"
         }
-        self.graph.add_node(folder_id, **attributes)
+        ops = [{"op": "add_node", "id": folder_id, "attrs": attributes}]
 
         if parent_id and self.graph.has_node(parent_id):
-            self.graph.add_edge(parent_id, folder_id, type="contains", weight=1.0)
+            ops.append({"op": "add_edge", "source": parent_id, "target": folder_id, "attrs": {"type": "contains", "weight": 1.0}})
             
-        self.save_graph()
+        self._apply(*ops)
         return folder_id
 
     def ensure_folder_path(self, path_str: str) -> Optional[str]:
@@ -550,75 +1389,29 @@ class Weaver:
     def get_file_tree(self) -> List[Dict[str, Any]]:
         """
         Returns a hierarchical tree representation of the graph based on 'contains' edges.
-        Roots are nodes with type='folder' or 'document' that have no incoming 'contains' edges.
+        Roots are nodes (other than type='system') that have no incoming 'contains' edges.
+        Folders come first, then alphabetical. Served from the canvas's incrementally
+        maintained tree index; the nested structure is only rebuilt when the tree changed.
         """
-        tree = []
-        
-        # 1. Identify all Folder and Document nodes (and Images, Notes, etc)
-        # We want to show EVERYTHING in the file explorer unless it's a hidden system node
-        relevant_nodes = [n for n, d in self.graph.nodes(data=True) if d.get("type") != "system"]
-        
-        # 2. Build adjacency list for 'contains' edges only
-        children_map = {n: [] for n in relevant_nodes}
-        has_parent = set()
-        
-        for u, v, d in self.graph.edges(data=True):
-            if d.get("type") == "contains":
-                if u in children_map and v in self.graph.nodes:
-                    children_map[u].append(v)
-                    has_parent.add(v)
-
-        # 3. Recursive builder with Cycle Detection
-        def build_node(node_id, visited_path=None):
-            if visited_path is None:
-                visited_path = set()
-            
-            # Detect Cycle: if we are seeing a node already in our current path
-            if node_id in visited_path:
-                 logger.warning(f"Cycle detected in file tree at node {node_id}")
-                 return None 
-            
-            # Add current node to path for children
-            current_path = visited_path.copy()
-            current_path.add(node_id)
+        return self.canvas.tree_index.tree()
 
-            data = self.graph.nodes[node_id]
-            # is_folder = data.get("type") == "folder" # Unused
-            
-            item = {
-                "id": node_id,
-                "label": data.get("label", data.get("title", node_id)),
-                "type": data.get("type"),
-                "children": []
-            }
-            
-            # Sort children: Folders first, then alphabetical
-            raw_children = children_map.get(node_id, [])
-            child_objects = []
-            
-            for child_id in raw_children:
-                child_node = build_node(child_id, current_path)
-                if child_node:
-                    child_objects.append(child_node)
-            
-            # Sort logic
-            child_objects.sort(key=lambda x: (x["type"] != "folder", x["label"]))
-            
-            item["children"] = child_objects
-            return item
+    def get_file_subtree(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the tree below one folder (or document), or None if it is not in the tree."""
+        return self.canvas.tree_index.subtree(node_id)
 
-        # 4. Find Roots
-        roots = [n for n in relevant_nodes if n not in has_parent]
-        
-        for root in roots:
-            node = build_node(root, set())
-            if node:
-                tree.append(node)
-            
-        # Sort roots
-        tree.sort(key=lambda x: (x["type"] != "folder", x["label"]))
-            
-        return tree
+    def get_file_tree_children(self, folder_id: str, cursor: Optional[str] = None, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Returns one page of a folder's direct children (folder_id ROOT for top-level nodes),
+        or None if the folder is not in the tree. Raises ValueError for a malformed cursor.
+        """
+        tree = self.canvas.tree_index
+        if folder_id != ROOT and not tree.has_node(folder_id):
+            return None
+        return {"folder_id": folder_id, **tree.page(folder_id, cursor, limit)}
+
+    def get_file_tree_etag(self) -> str:
+        """Changes whenever the file tree changes; used for conditional requests."""
+        return self.canvas.tree_index.etag
 
     def validate_connection(self, source: str, target: str, type: str) -> None:
         """
@@ -648,12 +1441,10 @@ class Weaver:
                  raise ValueError("Documents cannot contain Folders.")
 
             # Rule 2: Cycle Detection
-            # If path target -> source exists, adding source -> target creates a cycle.
-            try:
-                if nx.has_path(self.graph, target, source):
-                    raise ValueError("Cycle detected: Adding this edge would create a loop in the hierarchy.")
-            except nx.NetworkXError:
-                pass # Nodes not in graph? Handled above.
+            # If target already contains source (directly or further up), adding source -> target creates a cycle.
+            # Answered from the canvas's ancestor index instead of a traversal.
+            if self.canvas.reachability.creates_cycle(source, target):
+                raise ValueError("Cycle detected: Adding this edge would create a loop in the hierarchy.")
 
     def add_edge(self, source: str, target: str, justification: str, confidence: float = 1.0, type: str = "reference") -> bool:
         """
@@ -672,8 +1463,10 @@ class Weaver:
                     # If it's a critical hierarchy violation, we MUST fail.
                     return False
             
-            self.graph.add_edge(source, target, justification=justification, confidence=confidence, type=type)
-            self.save_graph()
+            self._apply({
+                "op": "add_edge", "source": source, "target": target,
+                "attrs": {"justification": justification, "confidence": confidence, "type": type}
+            })
             return True
         return False
 
@@ -684,93 +1477,341 @@ class Weaver:
         so they become root nodes instead of being deleted or hidden.
         """
         if self.graph.has_node(node_id):
+            ops = []
             # If folder, explicitly remove outgoing 'contains' edges (which define children)
-            # Actually, we need to find OUTGOING contains edges from this folder (Folder -> Child)
             if self.graph.nodes[node_id].get("type") == "folder":
-                out_edges = list(self.graph.out_edges(node_id, data=True))
-                for u, v, d in out_edges:
-                    if d.get("type") == "contains":
-                        self.graph.remove_edge(u, v)
+                for child in self.canvas.edge_layers.successors(node_id, ["contains"]):
+                    ops.append({"op": "remove_edge", "source": node_id, "target": child})
 
-            self.graph.remove_node(node_id)
-            self.save_graph()
+            ops.append({"op": "remove_node", "id": node_id})
+            self._apply(*ops)
             return True
         return False
 
     def update_node(self, node_id: str, updates: Dict[str, Any]) -> bool:
         """Updates node attributes."""
         if self.graph.has_node(node_id):
-            for key, value in updates.items():
-                self.graph.nodes[node_id][key] = value
-            self.save_graph()
+            self._apply({"op": "update_node", "id": node_id, "attrs": self._externalize_content(dict(updates))})
             return True
         return False
+
+    def set_parent(self, node_id: str, parent_id: Optional[str]) -> bool:
+        """
+        Moves a node under a new parent folder (or to the root when parent_id is empty)
+        by replacing its incoming 'contains' edges.
+        Raises ValueError if the move would put a folder inside itself.
+        """
+        if not self.graph.has_node(node_id):
+            return False
+        if parent_id and self.graph.has_node(parent_id) and self.canvas.reachability.creates_cycle(parent_id, node_id):
+            raise ValueError("Cycle detected: A node cannot be moved inside itself or one of its descendants.")
+
+        ops = [{"op": "remove_edge", "source": parent, "target": node_id}
+               for parent in self.canvas.edge_layers.predecessors(node_id, ["contains"])]
+
+        if parent_id and self.graph.has_node(parent_id):
+            ops.append({"op": "add_edge", "source": parent_id, "target": node_id, "attrs": {"type": "contains", "weight": 1.0}})
+        elif parent_id:
+            logger.warning(f"Parent node {parent_id} not found.")
+
+        self._apply(*ops)
+        return True
     
     def update_node_positions(self, positions: Dict[str, Dict[str, float]]) -> bool:
         """
         Updates positions for multiple nodes at once.
         positions: { node_id: { x: float, y: float }, ... }
+        Positions go to the canvas's position store, not the graph journal,
+        so dragging never rewrites the graph snapshot.
         """
-        updated = False
-        for node_id, pos in positions.items():
-            if self.graph.has_node(node_id):
-                self.graph.nodes[node_id]["position"] = pos
-                updated = True
-        if updated:
-            self.save_graph()
-        return updated
+        canvas = self.canvas
+        with canvas.lock:
+            moves = {}
+            for node_id, pos in positions.items():
+                if not self.graph.has_node(node_id):
+                    continue
+                position = node_position({"position": pos})
+                if position is not None:
+                    moves[node_id] = position
+            if not moves:
+                return False
+            batch = canvas.open_batch()
+            if batch is not None:
+                stored = canvas.positions
+                previous = {node_id: stored.get(node_id) for node_id in moves}
+
+                def undo_moves():
+                    for node_id, position in previous.items():
+                        if position is None:
+                            stored.discard(node_id)
+                        else:
+                            stored.restore(node_id, position)
+                batch["undo"].append(undo_moves)
+            canvas.move_nodes(moves)
+        return True
 
     def delete_edge(self, source: str, target: str) -> bool:
         """Deletes an edge."""
         if self.graph.has_edge(source, target):
-            self.graph.remove_edge(source, target)
-            self.save_graph()
+            self._apply({"op": "remove_edge", "source": source, "target": target})
             return True
         return False
 
     def update_edge(self, source: str, target: str, updates: Dict[str, Any]) -> bool:
         if self.graph.has_edge(source, target):
-            nx.set_edge_attributes(self.graph, {(source, target): updates})
-            self.save_graph()
+            self._apply({"op": "update_edge", "source": source, "target": target, "attrs": dict(updates)})
             return True
         return False
 
-    def get_subgraph(self, selected_node_ids: List[str], depth: int, include_shadow: bool = False) -> Dict[str, Any]:
-        if not selected_node_ids:
-            return {"nodes": [], "edges": []}
-
-        valid_seeds = [n for n in selected_node_ids if self.graph.has_node(n)]
-        context_nodes = set(valid_seeds)
-
-        if depth == 1:
-            for node in valid_seeds:
-                neighbors = set(self.graph.neighbors(node)) | set(self.graph.predecessors(node))
-                context_nodes.update(neighbors)
-        elif depth == 2:
-            f1_nodes = set(valid_seeds)
-            for node in valid_seeds:
-                neighbors = set(self.graph.neighbors(node)) | set(self.graph.predecessors(node))
-                f1_nodes.update(neighbors)
-            context_nodes.update(f1_nodes)
-            for node in list(f1_nodes):
-                if self.graph.has_node(node):
-                    neighbors = set(self.graph.neighbors(node)) | set(self.graph.predecessors(node))
-                    context_nodes.update(neighbors)
-        
-        subgraph = self.graph.subgraph(context_nodes)
-        
-        nodes_list = []
-        for n in subgraph.nodes():
-            node_data = subgraph.nodes[n]
-            if not include_shadow and node_data.get("status") == "shadow":
+    def read_engine(self) -> Optional[CSRGraph]:
+        """The CSR read engine for the canvas, if enabled in settings and NumPy is installed."""
+        if self.settings.get("read_engine", {}).get("backend", "networkx") != "csr":
+            return None
+        return self.canvas.read_engine()
+
+    def get_graph_analytics(self, top_n: int = 10) -> Dict[str, Any]:
+        """Degree centrality leaders and weakly connected components of the canvas graph."""
+        engine = self.read_engine()
+        if engine is not None:
+            centrality = engine.degree_centrality()
+            top = centrality.argsort()[::-1][:top_n]
+            leaders = [(engine.ids[i], float(centrality[i])) for i in top.tolist()]
+            components = [len(c) for c in engine.components()]
+        else:
+            centrality = nx.degree_centrality(self.graph)
+            leaders = sorted(centrality.items(), key=lambda item: item[1], reverse=True)[:top_n]
+            components = sorted((len(c) for c in nx.weakly_connected_components(self.graph)), reverse=True)
+        analytics = {
+            "engine": "csr" if engine is not None else "networkx",
+            "node_count": self.graph.number_of_nodes(),
+            "edge_count": self.graph.number_of_edges(),
+            "component_count": len(components),
+            "largest_component": components[0] if components else 0,
+            "top_central": [{"id": node_id, "degree_centrality": round(score, 6)} for node_id, score in leaders],
+        }
+        if engine is None and self.settings.get("read_engine", {}).get("backend") == "csr":
+            analytics["engine_unavailable"] = "csr needs numpy, which is not installed"
+        return analytics
+
+    def expand_context(self, seeds: List[str], depth: int, max_nodes: Optional[int] = None,
+                       max_bytes: Optional[int] = None, edge_types: Optional[List[str]] = None,
+                       min_confidence: Optional[float] = None, include_shadow: bool = False,
+                       ranking: str = "bfs") -> Dict[str, Any]:
+        """
+        Expansion of depth hops around the seeds, within optional node and byte budgets.
+        ranking "bfs" keeps nodes in breadth-first order (see expansion.expand); without
+        budgets, the CSR read engine computes the rings when it is enabled.
+        ranking "pagerank" keeps the most relevant nodes instead (see _rank_context).
+        Results are cached per canvas until a node they looked at changes; treat them as read-only.
+        """
+        if ranking not in ("bfs", "pagerank"):
+            raise ValueError(f"Unknown context ranking: {ranking}. Use 'bfs' or 'pagerank'.")
+        canvas = self.canvas
+        # The read engine is part of the key: it lists nodes of a hop in a different order
+        key = (tuple(seeds), depth, max_nodes, max_bytes, tuple(edge_types) if edge_types is not None else None,
+               min_confidence, include_shadow, ranking, self.settings.get("read_engine", {}).get("backend", "networkx"))
+        cached = canvas.context_cache.get(key)
+        if cached is not None:
+            return cached
+
+        version = canvas.version
+        if ranking == "pagerank":
+            result = self._rank_context(seeds, depth, max_nodes, max_bytes, edge_types, min_confidence, include_shadow)
+        else:
+            result = self._expand_bfs(seeds, depth, max_nodes, max_bytes, edge_types, min_confidence, include_shadow)
+        # Skip caching if the graph changed while expanding; the result may mix both states
+        if canvas.version == version:
+            # Missing seeds count too: creating one changes the result
+            canvas.context_cache.put(key, result, result["reached"].union(seeds))
+        return result
+
+    def _expand_bfs(self, seeds: List[str], depth: int, max_nodes: Optional[int], max_bytes: Optional[int],
+                    edge_types: Optional[List[str]], min_confidence: Optional[float],
+                    include_shadow: bool) -> Dict[str, Any]:
+        engine = self.read_engine()
+        if engine is None or max_nodes is not None or max_bytes is not None:
+            return expand(self.graph, seeds, depth, max_nodes=max_nodes, max_bytes=max_bytes,
+                          edge_types=edge_types, min_confidence=min_confidence,
+                          include_shadow=include_shadow, layers=self.canvas.edge_layers)
+
+        nodes, hops, reached = [], [], set()
+        for hop, ring in enumerate(engine.rings(seeds, depth, edge_types, min_confidence)):
+            ring_ids = [engine.ids[i] for i in ring.tolist()]
+            reached.update(ring_ids)
+            if not include_shadow:
+                ring_ids = [n for n in ring_ids if self.graph.nodes[n].get("status") != "shadow"]
+            ring_bytes = sum(estimate_context_bytes(n, self.graph.nodes[n]) for n in ring_ids)
+            nodes.extend(ring_ids)
+            hops.append({"hop": hop, "nodes": len(ring_ids), "bytes": ring_bytes})
+        return {
+            "nodes": nodes,
+            "hops": hops,
+            "bytes": sum(h["bytes"] for h in hops),
+            "truncated": False,
+            "stop_reason": None,
+            "reached": reached,
+        }
+
+    def _context_edges(self, nodes: List[str], edge_types: Optional[List[str]] = None,
+                       min_confidence: Optional[float] = None):
+        """Edges between the given nodes that pass the type and confidence filters."""
+        for u, v, d in self.graph.subgraph(nodes).edges(data=True):
+            if edge_types is not None and d.get("type") not in edge_types:
+                continue
+            if min_confidence is not None and edge_confidence(d) < min_confidence:
                 continue
-            nodes_list.append({"id": n, **node_data})
+            yield u, v, d
 
+    def _rank_context(self, seeds: List[str], depth: int, max_nodes: Optional[int], max_bytes: Optional[int],
+                      edge_types: Optional[List[str]], min_confidence: Optional[float],
+                      include_shadow: bool) -> Dict[str, Any]:
+        """
+        Relevance-ranked context: scores the whole depth-hop neighborhood with
+        personalized PageRank from the seeds (edges weighted by confidence) and keeps
+        the best nodes that fit max_nodes and max_bytes. Nodes come back best first.
+        """
+        pool = self.expand_context(seeds, depth, edge_types=edge_types, min_confidence=min_confidence,
+                                   include_shadow=include_shadow)
+        candidates = pool["nodes"]
+        hop_of = {}
+        start = 0
+        for hop in pool["hops"]:
+            for node_id in candidates[start:start + hop["nodes"]]:
+                hop_of[node_id] = hop["hop"]
+            start += hop["nodes"]
+
+        position = {node_id: i for i, node_id in enumerate(candidates)}
+        edges = [(position[u], position[v], edge_confidence(d))
+                 for u, v, d in self._context_edges(candidates, edge_types, min_confidence)]
+        valid_seeds = {n for n in seeds if n in position}
+        scores = personalized_pagerank(len(candidates), edges, [position[n] for n in valid_seeds])
+        sizes = [estimate_context_bytes(n, self.graph.nodes[n]) for n in candidates]
+        selected, stop_reason = select_top(candidates, scores, sizes, valid_seeds, max_nodes, max_bytes)
+
+        hops = [{"hop": hop["hop"], "nodes": 0, "bytes": 0} for hop in pool["hops"]]
+        for node_id in selected:
+            hops[hop_of[node_id]]["nodes"] += 1
+            hops[hop_of[node_id]]["bytes"] += sizes[position[node_id]]
         return {
-            "nodes": nodes_list,
-            "edges": [{"source": u, "target": v, **subgraph.edges[u, v]} for u, v in subgraph.edges()]
+            "nodes": sorted(selected, key=lambda n: (n not in valid_seeds, -scores[position[n]])),
+            "hops": hops,
+            "bytes": sum(hop["bytes"] for hop in hops),
+            "truncated": stop_reason is not None,
+            "stop_reason": stop_reason,
+            "scores": {n: round(scores[position[n]], 6) for n in selected},
+            "reached": pool["reached"],
         }
 
+    def get_viewport(self, x0: float, y0: float, x1: float, y1: float, zoom: float = 1.0,
+                     include_shadow: bool = False) -> Dict[str, Any]:
+        """
+        The part of the canvas inside the rectangle (x0, y0)-(x1, y1), from the spatial index.
+
+        At normal zoom: the positioned nodes inside, every edge with an end inside,
+        and "anchors" (id -> (x, y)) for the off-screen ends of those edges. Edges that
+        merely cross the rectangle with both ends outside are not included.
+
+        Zoomed out (below viewport.cluster_below_zoom, or more than viewport.max_nodes
+        visible): nodes sharing a cluster_px-sized screen cell become one cluster
+        {"id", "x", "y" (centroid), "count", "bounds", "sample" (best connected ids)};
+        lone nodes stay nodes. Edges between clusters are counted in "cluster_edges".
+        """
+        settings = self.settings.get("viewport", {})
+        spatial = self.canvas.spatial_index
+
+        def listed(node_id: str) -> bool:
+            return include_shadow or self.graph.nodes[node_id].get("status") != "shadow"
+
+        visible = [n for n in spatial.query(x0, y0, x1, y1) if listed(n)]
+        result = {
+            "clustered": zoom < settings.get("cluster_below_zoom", 0.35) or len(visible) > settings.get("max_nodes", 5000),
+            "nodes": [],
+            "edges": [],
+            "anchors": {},
+            "clusters": [],
+            "cluster_edges": [],
+            "unpositioned": self.graph.number_of_nodes() - spatial.get_stats()["positioned_nodes"],
+        }
+        if not result["clustered"]:
+            inside = set(visible)
+            result["nodes"] = visible
+            for node_id in visible:
+                for u, v in self.graph.out_edges(node_id):
+                    if v in inside:
+                        result["edges"].append((u, v))
+                    elif spatial.position(v) is not None and listed(v):
+                        result["edges"].append((u, v))
+                        result["anchors"][v] = spatial.position(v)
+                for u, v in self.graph.in_edges(node_id):
+                    if u not in inside and spatial.position(u) is not None and listed(u):
+                        result["edges"].append((u, v))
+                        result["anchors"][u] = spatial.position(u)
+            return result
+
+        cell_size = settings.get("cluster_px", 160) / zoom
+        representative: Dict[str, str] = {}
+        for cell, members in cluster_points({n: spatial.position(n) for n in visible}, cell_size).items():
+            if len(members) == 1:
+                result["nodes"].append(members[0])
+                representative[members[0]] = members[0]
+                continue
+            cluster_id = f"cluster:{round(cell_size)}:{cell[0]}:{cell[1]}"
+            xs, ys = zip(*(spatial.position(n) for n in members))
+            members.sort(key=lambda n: (-self.graph.degree(n), str(n)))
+            result["clusters"].append({
+                "id": cluster_id,
+                "x": sum(xs) / len(xs),
+                "y": sum(ys) / len(ys),
+                "count": len(members),
+                "bounds": {"x0": min(xs), "y0": min(ys), "x1": max(xs), "y1": max(ys)},
+                "sample": members[:5],
+            })
+            for node_id in members:
+                representative[node_id] = cluster_id
+        cluster_edges: Dict[Tuple[str, str], int] = {}
+        for node_id in visible:
+            for u, v in self.graph.out_edges(node_id):
+                a, b = representative[u], representative.get(v)
+                if b is None or a == b:
+                    continue
+                if a == u and b == v:
+                    result["edges"].append((u, v))
+                else:
+                    cluster_edges[(a, b)] = cluster_edges.get((a, b), 0) + 1
+        result["cluster_edges"] = [{"source": a, "target": b, "count": count}
+                                   for (a, b), count in cluster_edges.items()]
+        return result
+
+    def get_subgraph(self, selected_node_ids: List[str], depth: int, include_shadow: bool = False,
+                     edge_types: Optional[List[str]] = None, max_nodes: Optional[int] = None,
+                     max_bytes: Optional[int] = None, min_confidence: Optional[float] = None,
+                     ranking: str = "bfs") -> Dict[str, Any]:
+        """
+        The selected nodes plus everything within depth hops, as node and edge dicts.
+        With edge_types or min_confidence, only matching edges are followed and returned.
+        Also reports the size of each hop and whether a budget cut the expansion short;
+        with ranking "pagerank", the nodes kept are the most relevant ones, with their scores.
+        """
+        if not selected_node_ids:
+            return {"nodes": [], "edges": [], "hops": [], "bytes": 0, "truncated": False, "stop_reason": None}
+
+        expansion = self.expand_context(selected_node_ids, depth, max_nodes=max_nodes, max_bytes=max_bytes,
+                                        edge_types=edge_types, min_confidence=min_confidence,
+                                        include_shadow=include_shadow, ranking=ranking)
+        context_nodes = expansion["nodes"]
+        result = {
+            "nodes": [{"id": n, **self.get_node_data(n, include_content=False)} for n in context_nodes],
+            "edges": [{"source": u, "target": v, **d}
+                      for u, v, d in self._context_edges(context_nodes, edge_types, min_confidence)],
+            "hops": expansion["hops"],
+            "bytes": expansion["bytes"],
+            "truncated": expansion["truncated"],
+            "stop_reason": expansion["stop_reason"],
+        }
+        if "scores" in expansion:
+            result["scores"] = expansion["scores"]
+        return result
+
     def add_shadow_node(self, node_id: str, content: str, meta: Dict[str, Any] = None) -> str:
         meta = meta or {}
         meta["status"] = "shadow"
@@ -778,15 +1819,36 @@ class Weaver:
 
     def commit_shadow_node(self, node_id: str) -> bool:
         if self.graph.has_node(node_id):
-            self.graph.nodes[node_id]["status"] = "committed"
-            self.save_graph()
+            self._apply({"op": "update_node", "id": node_id, "attrs": {"status": "committed"}})
             return True
         return False
 
     def clear_shadow_nodes(self):
         nodes_to_remove = [n for n, d in self.graph.nodes(data=True) if d.get("status") == "shadow"]
-        for n in nodes_to_remove:
-            self.graph.remove_node(n)
-        self.save_graph()
+        self._apply(*[{"op": "remove_node", "id": n} for n in nodes_to_remove])
         return len(nodes_to_remove)
 
+
+class WeaverPool:
+    """
+    Registry of canvas-scoped Weavers, so several canvases can be read and written
+    at the same time without switching the active canvas.
+    """
+    def __init__(self, weaver: Weaver):
+        self.weaver = weaver
+        self._scoped: Dict[str, Weaver] = {}
+        self._lock = threading.Lock()
+
+    def get(self, canvas_id: str) -> Optional[Weaver]:
+        """Returns the Weaver for a canvas, or None if the canvas does not exist."""
+        with self._lock:
+            if canvas_id not in self.weaver.canvas_registry.index["canvases"]:
+                self._scoped.pop(canvas_id, None)
+                return None
+            scoped = self._scoped.get(canvas_id)
+            if scoped is None:
+                scoped = Weaver(canvas_id=canvas_id, shared=self.weaver)
+                self._scoped[canvas_id] = scoped
+                return scoped
+        scoped.load_active_canvas()
+        return scoped
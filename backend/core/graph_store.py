@@ -0,0 +1,321 @@
+import networkx as nx
+from typing import List, Dict, Any, Callable, Optional
+import logging
+import json
+import os
+
+from .sqlite_store import SQLiteGraphStore
+from .snapshot_codec import SNAPSHOT_FORMATS, encode_graph, decode_graph, is_binary_snapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILENAME = "graph.json"
+BINARY_SNAPSHOT_FILENAME = "graph.snap"
+JOURNAL_FILENAME = "graph.journal.jsonl"
+
+# Compaction is deferred until the journal outgrows the snapshot (or this floor),
+# so the amortized cost of a mutation stays proportional to the mutation itself.
+MIN_COMPACTION_BYTES = 256 * 1024
+
+
+def node_link_data(graph: nx.DiGraph) -> Dict[str, Any]:
+    """Node-link export pinned to the 'links' key used by existing graph.json files."""
+    try:
+        return nx.node_link_data(graph, edges="links")
+    except TypeError:
+        # networkx < 3.4 has no 'edges' argument and always writes 'links'
+        return nx.node_link_data(graph)
+
+
+def node_link_graph(data: Dict[str, Any]) -> nx.DiGraph:
+    """Reads node-link data written with either the 'links' or the newer 'edges' key."""
+    key = "links" if "links" in data else "edges"
+    try:
+        return nx.node_link_graph(data, edges=key)
+    except TypeError:
+        return nx.node_link_graph(data)
+
+
+def apply_op(graph: nx.DiGraph, op: Dict[str, Any]) -> None:
+    """
+    Applies a single mutation record to a graph.
+    Records are plain dicts so they can be journaled, replayed and streamed as-is.
+    """
+    kind = op.get("op")
+    if kind == "add_node":
+        graph.add_node(op["id"], **op.get("attrs", {}))
+    elif kind == "update_node":
+        if graph.has_node(op["id"]):
+            graph.nodes[op["id"]].update(op.get("attrs", {}))
+    elif kind == "remove_node":
+        if graph.has_node(op["id"]):
+            graph.remove_node(op["id"])
+    elif kind == "add_edge":
+        graph.add_edge(op["source"], op["target"], **op.get("attrs", {}))
+    elif kind == "update_edge":
+        if graph.has_edge(op["source"], op["target"]):
+            graph.edges[op["source"], op["target"]].update(op.get("attrs", {}))
+    elif kind == "remove_edge":
+        if graph.has_edge(op["source"], op["target"]):
+            graph.remove_edge(op["source"], op["target"])
+    elif kind == "batch":
+        # A transaction journaled as one record, so it is replayed all or nothing
+        for sub_op in op["ops"]:
+            apply_op(graph, sub_op)
+    else:
+        raise ValueError(f"Unknown graph operation: {kind}")
+
+
+def capture_undo(graph: nx.DiGraph, op: Dict[str, Any]) -> Callable[[], None]:
+    """
+    Returns a callable that reverts op. Must be taken before op is applied;
+    rolling back a group of ops runs their undo callables in reverse order.
+    """
+    kind = op.get("op")
+    if kind in ("add_node", "update_node", "remove_node"):
+        node_id = op["id"]
+        if not graph.has_node(node_id):
+            return lambda: graph.remove_node(node_id) if graph.has_node(node_id) else None
+        attrs = dict(graph.nodes[node_id])
+        edges = []
+        if kind == "remove_node":
+            edges = [(u, v, dict(d)) for u, v, d in graph.in_edges(node_id, data=True)]
+            edges += [(u, v, dict(d)) for u, v, d in graph.out_edges(node_id, data=True)]
+
+        def undo_node():
+            if not graph.has_node(node_id):
+                graph.add_node(node_id)
+            data = graph.nodes[node_id]
+            data.clear()
+            data.update(attrs)
+            for u, v, d in edges:
+                graph.add_edge(u, v, **d)
+        return undo_node
+
+    if kind in ("add_edge", "update_edge", "remove_edge"):
+        source, target = op["source"], op["target"]
+        created_nodes = [n for n in (source, target) if not graph.has_node(n)] if kind == "add_edge" else []
+        if not graph.has_edge(source, target):
+            def undo_new_edge():
+                if graph.has_edge(source, target):
+                    graph.remove_edge(source, target)
+                # add_edge implicitly creates missing endpoints
+                graph.remove_nodes_from([n for n in created_nodes if graph.has_node(n)])
+            return undo_new_edge
+        attrs = dict(graph.edges[source, target])
+
+        def undo_edge():
+            if not graph.has_edge(source, target):
+                graph.add_edge(source, target)
+            data = graph.edges[source, target]
+            data.clear()
+            data.update(attrs)
+        return undo_edge
+
+    raise ValueError(f"Unknown graph operation: {kind}")
+
+
+class JsonGraphStore:
+    """
+    Persists a canvas graph as a snapshot plus an append-only journal of
+    mutation records written since that snapshot.
+    The snapshot is either node-link JSON (graph.json) or, with
+    snapshot_format="binary", a compact binary snapshot (graph.snap).
+    Whichever exists is detected on load.
+    """
+    backend = "json"
+
+    def __init__(self, canvas_dir: str, snapshot_format: str = "json"):
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+        self.snapshot_format = snapshot_format
+        self.json_snapshot_file = os.path.join(canvas_dir, SNAPSHOT_FILENAME)
+        self.binary_snapshot_file = os.path.join(canvas_dir, BINARY_SNAPSHOT_FILENAME)
+        self.journal_file = os.path.join(canvas_dir, JOURNAL_FILENAME)
+        self.journal_ops = 0
+        self.journal_bytes = self._file_size(self.journal_file)
+        self.snapshot_bytes = self._file_size(self._current_snapshot() or "")
+
+    @property
+    def snapshot_file(self) -> str:
+        """The file the next compaction writes."""
+        return self.binary_snapshot_file if self.snapshot_format == "binary" else self.json_snapshot_file
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _current_snapshot(self) -> Optional[str]:
+        """Returns the snapshot on disk (the newer one if both formats are present), or None."""
+        existing = [p for p in (self.binary_snapshot_file, self.json_snapshot_file) if os.path.exists(p)]
+        if not existing:
+            return None
+        return max(existing, key=os.path.getmtime)
+
+    def exists(self) -> bool:
+        return self._current_snapshot() is not None or os.path.exists(self.journal_file)
+
+    def load(self) -> nx.DiGraph:
+        """Loads the snapshot and replays the journal on top of it."""
+        snapshot = self._current_snapshot()
+        if snapshot:
+            with open(snapshot, 'rb') as f:
+                payload = f.read()
+            if is_binary_snapshot(payload):
+                graph = decode_graph(payload)
+            else:
+                graph = node_link_graph(json.loads(payload))
+        else:
+            graph = nx.DiGraph()
+
+        self.journal_ops = 0
+        for op in self._read_journal():
+            apply_op(graph, op)
+            self.journal_ops += 1
+        self._end_journal_line()
+
+        if self.journal_ops:
+            logger.info(f"Replayed {self.journal_ops} journal records from {self.journal_file}")
+        return graph
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final record from an interrupted write; everything before it is intact.
+                    logger.warning(f"Skipping unreadable journal record at line {line_no} in {self.journal_file}")
+
+    def _end_journal_line(self):
+        """
+        Makes sure the journal ends on a line break, so the next append starts a new
+        record instead of extending an interrupted one: a torn final record is cut off,
+        a complete one that only lost its line break gets it back.
+        """
+        try:
+            with open(self.journal_file, 'rb+') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) == b"\n":
+                    return
+                f.seek(0)
+                data = f.read()
+                start = data.rfind(b"\n") + 1
+                try:
+                    json.loads(data[start:])
+                    f.write(b"\n")
+                except ValueError:
+                    f.truncate(start)
+                    logger.warning(f"Cut a torn final record off {self.journal_file}")
+        except FileNotFoundError:
+            return
+        self.journal_bytes = self._file_size(self.journal_file)
+
+    def append(self, ops: List[Dict[str, Any]]) -> int:
+        """Appends mutation records to the journal. Returns the number of bytes written."""
+        if not ops:
+            return 0
+        payload = "".join(
+            json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n" for op in ops
+        ).encode('utf-8')
+        with open(self.journal_file, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_ops += len(ops)
+        self.journal_bytes += len(payload)
+        return len(payload)
+
+    def needs_compaction(self) -> bool:
+        return self.journal_bytes > max(self.snapshot_bytes, MIN_COMPACTION_BYTES)
+
+    def compact(self, graph: nx.DiGraph) -> int:
+        """
+        Folds the journal into a fresh snapshot.
+        The snapshot is replaced atomically before the journal is truncated; replaying
+        a journal over a snapshot that already contains it is harmless.
+        Returns the number of bytes written.
+        """
+        tmp_file = self.snapshot_file + ".tmp"
+        if self.snapshot_format == "binary":
+            payload = encode_graph(graph)
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            data = node_link_data(graph)
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        # Drop the snapshot in the other format so load never picks a stale one
+        for stale in (self.json_snapshot_file, self.binary_snapshot_file):
+            if stale != self.snapshot_file and os.path.exists(stale):
+                os.remove(stale)
+        self.journal_ops = 0
+        self.journal_bytes = 0
+        self.snapshot_bytes = self._file_size(self.snapshot_file)
+        return self.snapshot_bytes
+
+    def import_graph(self, graph: nx.DiGraph) -> int:
+        """Replaces the stored graph (used when migrating a canvas to this store)."""
+        return self.compact(graph)
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "snapshot_format": self.snapshot_format,
+            "journal_ops": self.journal_ops,
+            "journal_bytes": self.journal_bytes,
+            "snapshot_bytes": self.snapshot_bytes,
+        }
+
+
+STORAGE_BACKENDS = ("json", "sqlite")
+
+
+def create_graph_store(canvas_dir: str, backend: str = "json", snapshot_format: str = "json"):
+    """
+    Instantiates the store for a backend without touching existing data.
+    snapshot_format only applies to the JSON backend.
+    """
+    if backend == "sqlite":
+        return SQLiteGraphStore(canvas_dir)
+    if backend == "json":
+        return JsonGraphStore(canvas_dir, snapshot_format)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def open_graph_store(canvas_dir: str, backend: str = "json", snapshot_format: str = "json"):
+    """
+    Returns the graph store for a canvas directory.
+    A SQLite store that does not exist yet is migrated from the canvas's JSON snapshot and journal.
+    """
+    store = create_graph_store(canvas_dir, backend, snapshot_format)
+    if backend == "sqlite" and not store.exists():
+        legacy = JsonGraphStore(canvas_dir)
+        if legacy.exists():
+            graph = legacy.load()
+            store.import_graph(graph)
+            logger.info(f"Migrated {legacy._current_snapshot() or legacy.journal_file} to {store.db_file} "
+                        f"({graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges)")
+    return store
@@ -0,0 +1,326 @@
+import networkx as nx
+from typing import Dict, Any, List, Set, Optional, Tuple, NamedTuple
+from bisect import bisect_left, insort
+from uuid import uuid4
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Parent key used for nodes that have no incoming 'contains' edge
+ROOT = "__root__"
+
+
+def contains_parents(graph: nx.DiGraph, node_id: str) -> List[str]:
+    """Returns the sources of a node's incoming 'contains' edges."""
+    return [u for u, _, d in graph.in_edges(node_id, data=True) if d.get("type") == "contains"]
+
+
+def touched_nodes(graph: nx.DiGraph, op: Dict[str, Any]) -> Set[str]:
+    """
+    Nodes whose hierarchy entry (existence, attributes or 'contains' parents) may
+    change when op is applied. Must be called before the op is applied: removing a
+    node also drops its outgoing edges, which re-roots its children.
+    """
+    kind = op.get("op")
+    if kind in ("add_node", "update_node"):
+        return {op["id"]}
+    if kind == "remove_node":
+        node_id = op["id"]
+        if graph.has_node(node_id):
+            return {node_id, *graph.successors(node_id)}
+        return {node_id}
+    if kind in ("add_edge", "update_edge", "remove_edge"):
+        # add_edge also creates missing endpoints
+        return {op["source"], op["target"]}
+    return set()
+
+
+class FolderIndex:
+    """
+    Maps (parent folder id or ROOT, label) to folder ids, so resolving a folder path
+    segment is a dict lookup instead of a scan over the graph.
+    Kept current through refresh() for every node a mutation touches.
+    """
+    def __init__(self):
+        self._by_key: Dict[Tuple[str, Any], Set[str]] = {}
+        self._keys_of: Dict[str, List[Tuple[str, Any]]] = {}
+
+    def rebuild(self, graph: nx.DiGraph):
+        self._by_key.clear()
+        self._keys_of.clear()
+        for node_id, data in graph.nodes(data=True):
+            if data.get("type") == "folder":
+                self._add(graph, node_id, data)
+
+    def refresh(self, graph: nx.DiGraph, node_ids: Set[str]):
+        for node_id in node_ids:
+            self._remove(node_id)
+            if graph.has_node(node_id) and graph.nodes[node_id].get("type") == "folder":
+                self._add(graph, node_id, graph.nodes[node_id])
+
+    def _add(self, graph: nx.DiGraph, node_id: str, data: Dict[str, Any]):
+        keys = [(parent, data.get("label")) for parent in contains_parents(graph, node_id) or [ROOT]]
+        for key in keys:
+            self._by_key.setdefault(key, set()).add(node_id)
+        self._keys_of[node_id] = keys
+
+    def _remove(self, node_id: str):
+        for key in self._keys_of.pop(node_id, []):
+            ids = self._by_key.get(key)
+            if ids is not None:
+                ids.discard(node_id)
+                if not ids:
+                    del self._by_key[key]
+
+    def lookup(self, parent_id: Optional[str], label: str) -> Optional[str]:
+        """Returns the folder named label directly under parent_id (None for root), if any."""
+        ids = self._by_key.get((parent_id or ROOT, label))
+        if not ids:
+            return None
+        # Duplicates can exist in older data; pick one deterministically
+        return min(ids)
+
+
+class TreeEntry(NamedTuple):
+    parents: Tuple[str, ...]
+    sort_key: Tuple[Any, ...]
+    label: Any
+    type: Optional[str]
+
+
+class TreeIndex:
+    """
+    The file explorer's view of the 'contains' hierarchy.
+    Nodes have an entry with their listed parents (anything but type 'system'), or
+    ROOT if they have none and are listed themselves. Every parent keeps its
+    children sorted folders first,
+    then by label. Mutations update single entries; the version only changes when
+    the tree's shape, labels or types change, so it doubles as an ETag.
+    """
+    def __init__(self):
+        self.epoch = uuid4().hex[:8]
+        self.version = 0
+        self._entries: Dict[str, TreeEntry] = {}
+        self._children: Dict[str, List[Tuple[Any, ...]]] = {}
+        self._tree: Optional[Tuple[int, List[Dict[str, Any]]]] = None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.epoch}-{self.version}"'
+
+    @staticmethod
+    def _is_listed(data: Dict[str, Any]) -> bool:
+        return data.get("type") != "system"
+
+    def _entry(self, graph: nx.DiGraph, node_id: str) -> Optional[TreeEntry]:
+        if not graph.has_node(node_id):
+            return None
+        data = graph.nodes[node_id]
+        parents = tuple(sorted(p for p in contains_parents(graph, node_id) if self._is_listed(graph.nodes[p])))
+        if not parents and not self._is_listed(data):
+            # Hidden system nodes only show up inside a listed folder
+            return None
+        label = data.get("label", data.get("title", node_id))
+        node_type = data.get("type")
+        # Node id last: a unique tie-breaker that also lets sorted entries be mapped back to nodes
+        sort_key = (node_type != "folder", str(label), str(node_id), node_id)
+        return TreeEntry(parents or (ROOT,), sort_key, label, node_type)
+
+    def rebuild(self, graph: nx.DiGraph):
+        # A new epoch keeps ETags from an earlier build (or process) from matching
+        self.epoch = uuid4().hex[:8]
+        self.version = 0
+        self._entries.clear()
+        self._children.clear()
+        self._tree = None
+        for node_id in graph.nodes():
+            entry = self._entry(graph, node_id)
+            if entry:
+                self._entries[node_id] = entry
+                for parent in entry.parents:
+                    self._children.setdefault(parent, []).append(entry.sort_key)
+        for children in self._children.values():
+            children.sort()
+
+    def refresh(self, graph: nx.DiGraph, node_ids: Set[str]):
+        queue = list(node_ids)
+        changed = False
+        while queue:
+            node_id = queue.pop()
+            old = self._entries.get(node_id)
+            new = self._entry(graph, node_id)
+            if old == new:
+                continue
+            changed = True
+            if old:
+                for parent in old.parents:
+                    self._remove_child(parent, old.sort_key)
+                del self._entries[node_id]
+            if new:
+                self._entries[node_id] = new
+                for parent in new.parents:
+                    insort(self._children.setdefault(parent, []), new.sort_key)
+            was_parent = old is not None and old.type != "system"
+            is_parent = new is not None and new.type != "system"
+            if was_parent != is_parent and graph.has_node(node_id):
+                # The node appeared or disappeared as a parent; its children move to or from the root
+                queue.extend(v for _, v, d in graph.out_edges(node_id, data=True) if d.get("type") == "contains")
+        if changed:
+            self.version += 1
+
+    def _remove_child(self, parent: str, sort_key: Tuple[Any, ...]):
+        children = self._children.get(parent)
+        if not children:
+            return
+        i = bisect_left(children, sort_key)
+        if i < len(children) and children[i] == sort_key:
+            children.pop(i)
+        if not children:
+            del self._children[parent]
+
+    def has_node(self, node_id: str) -> bool:
+        return node_id in self._entries
+
+    def child_count(self, parent: str) -> int:
+        return len(self._children.get(parent, ()))
+
+    def children(self, parent: str) -> List[str]:
+        """Direct children of a node (or of ROOT), in display order."""
+        return [key[-1] for key in self._children.get(parent, ())]
+
+    def page(self, parent: str, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        One page of a node's direct children, in display order, with their own child counts.
+        The cursor is the position after the last item returned, so pages stay consistent
+        while children are added or removed; a page costs O(log n + limit).
+        """
+        children = self._children.get(parent, [])
+        start = 0
+        if cursor:
+            after = decode_cursor(cursor)
+            start = bisect_left(children, after)
+            if start < len(children) and children[start][:3] == after:
+                start += 1
+        keys = children[start:start + limit]
+        items = []
+        for key in keys:
+            entry = self._entries[key[-1]]
+            items.append({
+                "id": key[-1],
+                "label": entry.label,
+                "type": entry.type,
+                "child_count": self.child_count(key[-1]),
+            })
+        has_more = start + limit < len(children)
+        return {
+            "items": items,
+            "total": len(children),
+            "next_cursor": encode_cursor(keys[-1]) if keys and has_more else None,
+        }
+
+    def _item(self, node_id: str, on_path: Set[str]) -> Optional[Dict[str, Any]]:
+        if node_id in on_path:
+            logger.warning(f"Cycle detected in file tree at node {node_id}")
+            return None
+        entry = self._entries[node_id]
+        on_path.add(node_id)
+        children = [item for item in (self._item(c, on_path) for c in self.children(node_id)) if item]
+        on_path.discard(node_id)
+        return {"id": node_id, "label": entry.label, "type": entry.type, "children": children}
+
+    def tree(self) -> List[Dict[str, Any]]:
+        """The nested tree from the roots down, built once per version."""
+        if self._tree is None or self._tree[0] != self.version:
+            roots = [self._item(node_id, set()) for node_id in self.children(ROOT)]
+            self._tree = (self.version, [item for item in roots if item])
+        return self._tree[1]
+
+    def subtree(self, node_id: str) -> Optional[Dict[str, Any]]:
+        if node_id not in self._entries:
+            return None
+        return self._item(node_id, set())
+
+
+def encode_cursor(sort_key: Tuple[Any, ...]) -> str:
+    """Opaque page cursor for a child's sort key (without the raw node id)."""
+    raw = json.dumps(list(sort_key[:3]), separators=(",", ":")).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ...]:
+    try:
+        is_document, label, node_key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (bool(is_document), str(label), str(node_key))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class ReachabilityIndex:
+    """
+    Ancestor sets for the 'contains' hierarchy: for every contained node, all the
+    nodes above it. "Would source -> target close a cycle?" is then one set lookup.
+    Only nodes whose 'contains' parents changed, and the nodes below them, are recomputed.
+    """
+    def __init__(self):
+        self._parents: Dict[str, Tuple[str, ...]] = {}
+        self._ancestors: Dict[str, Set[str]] = {}
+
+    def rebuild(self, graph: nx.DiGraph):
+        self._parents.clear()
+        self._ancestors.clear()
+        for node_id in graph.nodes():
+            parents = tuple(contains_parents(graph, node_id))
+            if parents:
+                self._parents[node_id] = parents
+        for node_id in self._parents:
+            self._compute(node_id)
+
+    def refresh(self, graph: nx.DiGraph, node_ids: Set[str]):
+        moved = []
+        for node_id in node_ids:
+            parents = tuple(contains_parents(graph, node_id)) if graph.has_node(node_id) else ()
+            if parents != self._parents.get(node_id, ()):
+                moved.append(node_id)
+                if parents:
+                    self._parents[node_id] = parents
+                else:
+                    self._parents.pop(node_id, None)
+        if not moved:
+            return
+
+        # Everything below a moved node has a new set of ancestors too
+        region = set()
+        stack = moved
+        while stack:
+            node_id = stack.pop()
+            if node_id in region:
+                continue
+            region.add(node_id)
+            if graph.has_node(node_id):
+                stack.extend(v for _, v, d in graph.out_edges(node_id, data=True) if d.get("type") == "contains")
+        for node_id in region:
+            self._compute(node_id)
+
+    def _compute(self, node_id: str):
+        parents = self._parents.get(node_id)
+        if not parents:
+            self._ancestors.pop(node_id, None)
+            return
+        ancestors = set()
+        stack = list(parents)
+        while stack:
+            parent = stack.pop()
+            if parent in ancestors:
+                continue
+            ancestors.add(parent)
+            stack.extend(self._parents.get(parent, ()))
+        self._ancestors[node_id] = ancestors
+
+    def is_ancestor(self, ancestor: str, node_id: str) -> bool:
+        return ancestor in self._ancestors.get(node_id, ())
+
+    def creates_cycle(self, source: str, target: str) -> bool:
+        """True if a 'contains' edge source -> target would make the hierarchy cyclic."""
+        return source == target or self.is_ancestor(target, source)
@@ -0,0 +1,231 @@
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from array import array
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# positions.bin: MAGIC, byte order ('<' or '>'), count, length of the id list,
+# the ids as a JSON list, then count (x, y) float64 pairs
+POSITIONS_MAGIC = b"NXPOS1"
+_HEADER = struct.Struct("<cII")
+
+
+class PositionStore:
+    """
+    Node positions set by dragging on the canvas, kept apart from the graph.
+
+    Positions live in one flat float64 array (x, y per slot) indexed by node id,
+    so a drag updates two floats instead of a node's attribute dict, and they are
+    persisted to their own small file (positions.bin) instead of the graph journal.
+    Writes are coalesced: the first change schedules a flush flush_interval_ms
+    later and everything moved until then goes out in that one write. Moving
+    nodes the file already lists patches their 16 bytes in place; the file is
+    only rewritten when nodes are added or dropped.
+
+    The store overrides the graph's own 'position' attribute: a node's position is
+    the stored one if present, else whatever the graph holds. Ops that set a
+    position through the graph discard the stored one so the newer value wins.
+    """
+    def __init__(self, path: str, flush_interval_ms: int = 1000):
+        self.path = path
+        self.interval = max(flush_interval_ms, 10) / 1000.0
+        self._slot: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._coords = array("d")
+        self._free: List[int] = []
+        self._lock = threading.RLock()
+        self._dirty = False
+        # Where each id sits in positions.bin as last written, and what moved since
+        self._file_index: Dict[str, int] = {}
+        self._data_offset = 0
+        self._moved: set = set()
+        self._layout_changed = True
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        self.stats = {"updates": 0, "flushes": 0, "bytes_written": 0, "failed_flushes": 0}
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def load(self, known_ids=None) -> int:
+        """Reads positions.bin, keeping only ids in known_ids when given. Returns the count."""
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            if not data.startswith(POSITIONS_MAGIC):
+                raise ValueError("not a positions file")
+            offset = len(POSITIONS_MAGIC)
+            order, count, ids_len = _HEADER.unpack_from(data, offset)
+            offset += _HEADER.size
+            ids = json.loads(data[offset:offset + ids_len].decode("utf-8"))
+            offset += ids_len
+            coords = array("d")
+            coords.frombytes(data[offset:offset + 16 * count])
+            if order.decode() != ("<" if sys.byteorder == "little" else ">"):
+                coords.byteswap()
+        except Exception as e:
+            logger.error(f"Failed to load positions from {self.path}: {e}")
+            return 0
+        with self._lock:
+            for i, node_id in enumerate(ids):
+                if known_ids is None or node_id in known_ids:
+                    self._put(node_id, coords[2 * i], coords[2 * i + 1])
+            if len(self._slot) == len(ids):
+                self._file_index = {node_id: i for i, node_id in enumerate(ids)}
+                self._data_offset = offset
+                self._layout_changed = False
+        return len(self._slot)
+
+    def _put(self, node_id: str, x: float, y: float):
+        slot = self._slot.get(node_id)
+        if node_id in self._file_index:
+            self._moved.add(node_id)
+        else:
+            self._layout_changed = True
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._ids[slot] = node_id
+            else:
+                slot = len(self._ids)
+                self._ids.append(node_id)
+                self._coords.extend((0.0, 0.0))
+            self._slot[node_id] = slot
+        self._coords[2 * slot] = x
+        self._coords[2 * slot + 1] = y
+
+    def get(self, node_id: str) -> Optional[Tuple[float, float]]:
+        slot = self._slot.get(node_id)
+        if slot is None:
+            return None
+        return self._coords[2 * slot], self._coords[2 * slot + 1]
+
+    def items(self) -> Iterator[Tuple[str, float, float]]:
+        with self._lock:
+            snapshot = [(node_id, self._coords[2 * slot], self._coords[2 * slot + 1])
+                        for node_id, slot in self._slot.items()]
+        return iter(snapshot)
+
+    def set_many(self, positions: Dict[str, Tuple[float, float]]):
+        with self._lock:
+            for node_id, (x, y) in positions.items():
+                self._put(node_id, x, y)
+            self.stats["updates"] += len(positions)
+            self._mark_dirty()
+
+    def discard(self, node_id: str) -> Optional[Tuple[float, float]]:
+        """Forgets node_id's stored position. Returns it, for undo."""
+        with self._lock:
+            slot = self._slot.pop(node_id, None)
+            if slot is None:
+                return None
+            previous = (self._coords[2 * slot], self._coords[2 * slot + 1])
+            self._ids[slot] = None
+            self._free.append(slot)
+            self._layout_changed = True
+            self._mark_dirty()
+            return previous
+
+    def restore(self, node_id: str, previous: Optional[Tuple[float, float]]):
+        """Puts back what discard() returned."""
+        if previous is not None:
+            self.set_many({node_id: previous})
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self._timer is None and not self._closed:
+            self._timer = threading.Timer(self.interval, self._flush_due)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_due(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Writes whatever changed since the last write. Returns bytes written."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            if self._layout_changed or not os.path.exists(self.path):
+                written = self._rewrite()
+            elif self._moved:
+                written = self._patch()
+            else:
+                written = 0
+            if written is None:
+                # Keep everything dirty and try again a little later
+                self._timer = None
+                self._mark_dirty()
+                return 0
+            self._dirty = False
+            if written:
+                self.stats["flushes"] += 1
+                self.stats["bytes_written"] += written
+            return written
+
+    def _rewrite(self) -> Optional[int]:
+        ids = list(self._slot)
+        coords = array("d")
+        for node_id in ids:
+            slot = self._slot[node_id]
+            coords.extend((self._coords[2 * slot], self._coords[2 * slot + 1]))
+        ids_bytes = json.dumps(ids).encode("utf-8")
+        order = b"<" if sys.byteorder == "little" else b">"
+        header = POSITIONS_MAGIC + _HEADER.pack(order, len(ids), len(ids_bytes)) + ids_bytes
+        data = header + coords.tobytes()
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.stats["failed_flushes"] += 1
+            logger.error(f"Failed to write positions to {self.path}: {e}")
+            return None
+        self._file_index = {node_id: i for i, node_id in enumerate(ids)}
+        self._data_offset = len(header)
+        self._moved.clear()
+        self._layout_changed = False
+        return len(data)
+
+    def _patch(self) -> Optional[int]:
+        written = 0
+        try:
+            with open(self.path, "r+b") as f:
+                for node_id in sorted(self._moved, key=self._file_index.__getitem__):
+                    slot = self._slot[node_id]
+                    f.seek(self._data_offset + 16 * self._file_index[node_id])
+                    written += f.write(self._coords[2 * slot:2 * slot + 2].tobytes())
+        except OSError as e:
+            self.stats["failed_flushes"] += 1
+            logger.error(f"Failed to update positions in {self.path}: {e}")
+            return None
+        self._moved.clear()
+        return written
+
+    def close(self):
+        """Cancels the pending timer and writes anything outstanding."""
+        with self._lock:
+            self._closed = True
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "positions": len(self._slot),
+                "dirty": self._dirty,
+                "flush_interval_ms": int(self.interval * 1000),
+                **self.stats,
+            }
@@ -0,0 +1,109 @@
+from typing import Any, List, Optional, Sequence, Tuple
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Rough prompt size of text: characters per token
+CHARS_PER_TOKEN = 4
+
+
+def personalized_pagerank(num_nodes: int, edges: Sequence[Tuple[int, int, float]], seeds: Sequence[int],
+                          alpha: float = 0.85, tol: float = 1e-6, max_iter: int = 100) -> List[float]:
+    """
+    PageRank restarted at the seeds, over undirected weighted edges (u, v, weight)
+    between node indexes 0..num_nodes-1. Mass reaching a node without edges
+    returns to the seeds. Returns one score per node; scores sum to 1.
+
+    With NumPy, each iteration is two gathers and a bincount over the edge arrays.
+    """
+    if num_nodes == 0 or not seeds:
+        return [0.0] * num_nodes
+    if NUMPY_AVAILABLE:
+        return _pagerank_numpy(num_nodes, edges, seeds, alpha, tol, max_iter).tolist()
+    return _pagerank_python(num_nodes, edges, seeds, alpha, tol, max_iter)
+
+
+def _pagerank_numpy(num_nodes, edges, seeds, alpha, tol, max_iter) -> "np.ndarray":
+    restart = np.zeros(num_nodes)
+    restart[np.unique(np.asarray(seeds, dtype=np.int64))] = 1.0
+    restart /= restart.sum()
+    if not edges:
+        return restart
+
+    u, v, w = (np.asarray(column) for column in zip(*edges))
+    # Context is undirected: every edge carries rank both ways
+    src = np.concatenate([u, v]).astype(np.int64)
+    dst = np.concatenate([v, u]).astype(np.int64)
+    weight = np.concatenate([w, w]).astype(np.float64)
+    out_weight = np.bincount(src, weights=weight, minlength=num_nodes)
+    share = np.divide(weight, out_weight[src], out=np.zeros_like(weight), where=out_weight[src] > 0)
+    dangling = out_weight == 0
+
+    rank = restart.copy()
+    for _ in range(max_iter):
+        spread = np.bincount(dst, weights=rank[src] * share, minlength=num_nodes)
+        updated = alpha * spread + (alpha * rank[dangling].sum() + 1 - alpha) * restart
+        if np.abs(updated - rank).sum() < tol:
+            return updated
+        rank = updated
+    return rank
+
+
+def _pagerank_python(num_nodes, edges, seeds, alpha, tol, max_iter) -> List[float]:
+    restart = [0.0] * num_nodes
+    for seed in set(seeds):
+        restart[seed] = 1.0 / len(set(seeds))
+    adjacency: List[List[Tuple[int, float]]] = [[] for _ in range(num_nodes)]
+    for u, v, w in edges:
+        adjacency[u].append((v, w))
+        adjacency[v].append((u, w))
+    out_weight = [sum(w for _, w in links) for links in adjacency]
+
+    rank = list(restart)
+    for _ in range(max_iter):
+        spread = [0.0] * num_nodes
+        dangling_mass = 0.0
+        for node, links in enumerate(adjacency):
+            if out_weight[node] == 0:
+                dangling_mass += rank[node]
+                continue
+            for neighbor, w in links:
+                spread[neighbor] += rank[node] * w / out_weight[node]
+        updated = [alpha * spread[i] + (alpha * dangling_mass + 1 - alpha) * restart[i] for i in range(num_nodes)]
+        if sum(abs(a - b) for a, b in zip(updated, rank)) < tol:
+            return updated
+        rank = updated
+    return rank
+
+
+def select_top(candidates: Sequence[Any], scores: Sequence[float], sizes: Sequence[int], seeds: Sequence[Any],
+               max_nodes: Optional[int] = None, max_bytes: Optional[int] = None) -> Tuple[List[Any], Optional[str]]:
+    """
+    Picks candidates by descending score until max_nodes is reached, skipping any
+    that would overflow max_bytes so smaller relevant nodes can still fit.
+    Seeds are always kept. Returns (selected, stop_reason or None).
+    """
+    seed_set = set(seeds)
+    selected = [c for c in candidates if c in seed_set]
+    used = sum(size for c, size in zip(candidates, sizes) if c in seed_set)
+    stop_reason = None
+    order = sorted(range(len(candidates)), key=lambda i: (-scores[i], str(candidates[i])))
+    for i in order:
+        candidate = candidates[i]
+        if candidate in seed_set:
+            continue
+        if max_nodes is not None and len(selected) >= max_nodes:
+            stop_reason = "max_nodes"
+            break
+        if max_bytes is not None and used + sizes[i] > max_bytes:
+            stop_reason = "max_bytes"
+            continue
+        selected.append(candidate)
+        used += sizes[i]
+    return selected, stop_reason
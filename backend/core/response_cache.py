@@ -0,0 +1,146 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+from collections import OrderedDict
+import gzip
+import json
+import logging
+import threading
+import zlib
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Content-Encodings we can produce, in order of preference
+ENCODINGS = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def dump_json(doc: Any) -> bytes:
+    """Compact UTF-8 JSON, via orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(doc, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(doc, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def pick_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The preferred encoding the client accepts (q=0 excluded), or None for identity."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        quality = params.strip().replace(" ", "")
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    for encoding in ENCODINGS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+class CachedResponse:
+    """One serialized response body, compressed per encoding on first request."""
+    def __init__(self, version: int, etag: str, body: bytes):
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        with self._lock:
+            data = self._encoded.get(encoding)
+            if data is None:
+                if encoding == "br":
+                    data = brotli.compress(self.body, quality=5)
+                else:
+                    data = gzip.compress(self.body, compresslevel=6, mtime=0)
+                self._encoded[encoding] = data
+            return data
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """Each encoding is its own representation, so it gets its own strong tag."""
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header names this body, in any encoding."""
+        if not if_none_match:
+            return False
+        known = {self.etag_for(encoding) for encoding in (None,) + ENCODINGS}
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") in known:
+                return True
+        return False
+
+    def nbytes(self) -> int:
+        return len(self.body) + sum(len(data) for data in self._encoded.values())
+
+
+class GraphResponseCache:
+    """
+    Serialized /graph responses for one canvas, one per field selection (variant),
+    each valid for the graph version it was built at. Repeated reads of an unchanged
+    graph are served from these bytes; the first read after a mutation rebuilds
+    the variant it asks for, and nothing is rebuilt until someone asks.
+    """
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max(max_entries, 1)
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, epoch: str, version: int, variant: Hashable,
+            build: Callable[[], Any]) -> CachedResponse:
+        """
+        The response for variant at version, calling build() for the document when
+        it is missing or stale. Concurrent requests for a stale variant wait for
+        one build instead of each serializing the graph.
+        """
+        with self._lock:
+            entry = self._entries.get(variant)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(variant)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            body = dump_json(build())
+            tag = f"{zlib.crc32(repr(variant).encode()):08x}"
+            entry = CachedResponse(version, f'"{epoch}-{version}-{tag}"', body)
+            self._entries[variant] = entry
+            self._entries.move_to_end(variant)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(entry.nbytes() for entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "encodings": list(ENCODINGS),
+            }
@@ -0,0 +1,125 @@
+import networkx as nx
+from typing import Dict, Any, List
+from contextlib import contextmanager
+import gc
+import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Binary snapshots start with MAGIC, a format version byte and a codec byte
+SNAPSHOT_MAGIC = b"NXSNAP"
+FORMAT_VERSION = 1
+CODEC_JSON = b"j"     # compact JSON body (written by orjson when available)
+CODEC_MSGPACK = b"m"
+
+SNAPSHOT_FORMATS = ("json", "binary")
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Encoding and decoding allocate millions of small containers, which keeps
+    triggering full collections over the (large, long-lived) graph. None of them
+    form cycles, so collection is paused for the duration.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def is_binary_snapshot(header: bytes) -> bool:
+    return header.startswith(SNAPSHOT_MAGIC)
+
+
+def _to_document(graph: nx.DiGraph) -> Dict[str, Any]:
+    """
+    Flattens a graph into a compact document.
+    Attribute keys are interned into one 'keys' table and stored as indexes, and
+    edges refer to nodes by position, so repeated keys and ids are written once.
+    """
+    keys: Dict[str, int] = {}
+
+    def flatten(attrs: Dict[str, Any]) -> List[Any]:
+        flat = []
+        for key, value in attrs.items():
+            index = keys.get(key)
+            if index is None:
+                index = keys[key] = len(keys)
+            flat.append(index)
+            flat.append(value)
+        return flat
+
+    positions = {}
+    nodes = []
+    for i, (node_id, data) in enumerate(graph.nodes(data=True)):
+        positions[node_id] = i
+        nodes.append([node_id, flatten(data)])
+    edges = [[positions[u], positions[v], flatten(data)] for u, v, data in graph.edges(data=True)]
+    return {"graph": dict(graph.graph), "keys": list(keys), "nodes": nodes, "edges": edges}
+
+
+def _from_document(doc: Dict[str, Any]) -> nx.DiGraph:
+    keys = doc["keys"]
+
+    def expand(flat: List[Any]) -> Dict[str, Any]:
+        return {keys[flat[i]]: flat[i + 1] for i in range(0, len(flat), 2)}
+
+    graph = nx.DiGraph()
+    graph.graph.update(doc.get("graph", {}))
+    node_ids = [node[0] for node in doc["nodes"]]
+    graph.add_nodes_from((node_id, expand(flat)) for node_id, flat in doc["nodes"])
+    graph.add_edges_from((node_ids[u], node_ids[v], expand(flat)) for u, v, flat in doc["edges"])
+    return graph
+
+
+def encode_graph(graph: nx.DiGraph) -> bytes:
+    """
+    Serializes a graph as a binary snapshot.
+    Uses msgpack when installed, otherwise compact JSON (orjson if available).
+    """
+    with _gc_paused():
+        doc = _to_document(graph)
+        if MSGPACK_AVAILABLE:
+            codec, body = CODEC_MSGPACK, msgpack.packb(doc, use_bin_type=True, default=str)
+        elif ORJSON_AVAILABLE:
+            codec, body = CODEC_JSON, orjson.dumps(doc, default=str, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            codec, body = CODEC_JSON, json.dumps(doc, ensure_ascii=False, separators=(",", ":"), default=str).encode('utf-8')
+    return SNAPSHOT_MAGIC + bytes([FORMAT_VERSION]) + codec + body
+
+
+def decode_graph(payload: bytes) -> nx.DiGraph:
+    if not is_binary_snapshot(payload):
+        raise ValueError("Not a binary graph snapshot")
+    header = len(SNAPSHOT_MAGIC)
+    version = payload[header]
+    codec = payload[header + 1:header + 2]
+    body = payload[header + 2:]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format version: {version}")
+
+    if codec == CODEC_MSGPACK and not MSGPACK_AVAILABLE:
+        raise RuntimeError("Snapshot was written with msgpack, which is not installed")
+    if codec not in (CODEC_MSGPACK, CODEC_JSON):
+        raise ValueError(f"Unknown snapshot codec: {codec!r}")
+
+    with _gc_paused():
+        if codec == CODEC_MSGPACK:
+            doc = msgpack.unpackb(body, raw=False, strict_map_key=False)
+        else:
+            doc = orjson.loads(body) if ORJSON_AVAILABLE else json.loads(body)
+        return _from_document(doc)
@@ -0,0 +1,115 @@
+import networkx as nx
+import math
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+Cell = Tuple[int, int]
+Bounds = Tuple[float, float, float, float]
+
+
+def node_position(data: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """A node's (x, y) canvas position, or None when it has no usable one."""
+    position = data.get("position")
+    if not isinstance(position, dict):
+        return None
+    try:
+        x, y = float(position["x"]), float(position["y"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (math.isfinite(x) and math.isfinite(y)):
+        return None
+    return x, y
+
+
+class GridIndex:
+    """
+    Uniform grid over node positions: each cell_size x cell_size square of the
+    canvas maps to the nodes positioned in it, so a viewport query only looks at
+    the cells it overlaps instead of every node.
+    Kept current through refresh() for every node a mutation touches.
+    """
+    def __init__(self, cell_size: float = 512.0):
+        self.cell_size = float(cell_size)
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._points: Dict[str, Tuple[float, float, Cell]] = {}
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def rebuild(self, graph: nx.DiGraph):
+        """Drops every cell and re-adds the graph's positioned nodes."""
+        self._cells.clear()
+        self._points.clear()
+        for node_id, data in graph.nodes(data=True):
+            position = node_position(data)
+            if position is not None:
+                self.move(node_id, *position)
+
+    def refresh(self, graph: nx.DiGraph, node_ids: Iterable[str]):
+        for node_id in node_ids:
+            position = node_position(graph.nodes[node_id]) if graph.has_node(node_id) else None
+            if position is None:
+                self.remove(node_id)
+            else:
+                self.move(node_id, *position)
+
+    def move(self, node_id: str, x: float, y: float):
+        cell = self._cell(x, y)
+        previous = self._points.get(node_id)
+        if previous is not None and previous[2] != cell:
+            self._discard(node_id, previous[2])
+        self._points[node_id] = (x, y, cell)
+        self._cells.setdefault(cell, set()).add(node_id)
+
+    def remove(self, node_id: str):
+        previous = self._points.pop(node_id, None)
+        if previous is not None:
+            self._discard(node_id, previous[2])
+
+    def _discard(self, node_id: str, cell: Cell):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(node_id)
+            if not members:
+                del self._cells[cell]
+
+    def position(self, node_id: str) -> Optional[Tuple[float, float]]:
+        point = self._points.get(node_id)
+        return (point[0], point[1]) if point is not None else None
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> List[str]:
+        """Nodes positioned inside the rectangle (edges inclusive)."""
+        cx0, cy0 = self._cell(x0, y0)
+        cx1, cy1 = self._cell(x1, y1)
+        span = (cx1 - cx0 + 1) * (cy1 - cy0 + 1)
+        if span > len(self._cells):
+            # Zoomed far out: walking the occupied cells is cheaper than the empty range
+            cells = [c for c in self._cells if cx0 <= c[0] <= cx1 and cy0 <= c[1] <= cy1]
+        else:
+            cells = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1) if (cx, cy) in self._cells]
+        result = []
+        for cell in cells:
+            inner = cx0 < cell[0] < cx1 and cy0 < cell[1] < cy1
+            for node_id in self._cells[cell]:
+                if inner:
+                    result.append(node_id)
+                    continue
+                x, y, _ = self._points[node_id]
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    result.append(node_id)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "cell_size": self.cell_size,
+            "cells": len(self._cells),
+            "positioned_nodes": len(self._points),
+            "max_cell": max((len(m) for m in self._cells.values()), default=0),
+        }
+
+
+def cluster_points(points: Dict[str, Tuple[float, float]], cell_size: float) -> Dict[Cell, List[str]]:
+    """Groups positioned nodes by the cell_size x cell_size square they fall in."""
+    groups: Dict[Cell, List[str]] = {}
+    for node_id, (x, y) in points.items():
+        groups.setdefault((int(math.floor(x / cell_size)), int(math.floor(y / cell_size))), []).append(node_id)
+    return groups
@@ -0,0 +1,235 @@
+import networkx as nx
+from typing import List, Dict, Any
+import logging
+import sqlite3
+import threading
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+DB_FILENAME = "graph.db"
+
+# Node attributes mirrored into indexed columns of the nodes table
+INDEXED_NODE_COLUMNS = ("type", "status", "module")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    status TEXT,
+    module TEXT,
+    attrs TEXT
+);
+CREATE TABLE IF NOT EXISTS edges (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    type TEXT,
+    attrs TEXT,
+    PRIMARY KEY (source, target)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_nodes_type ON nodes(type);
+CREATE INDEX IF NOT EXISTS idx_nodes_status ON nodes(status);
+CREATE INDEX IF NOT EXISTS idx_nodes_module ON nodes(module);
+CREATE INDEX IF NOT EXISTS idx_edges_type ON edges(type);
+CREATE INDEX IF NOT EXISTS idx_edges_target ON edges(target);
+"""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class SQLiteGraphStore:
+    """
+    Persists a canvas graph in SQLite (graph.db) with one row per node and
+    per edge, each carrying its attributes as a single JSON column. Loading
+    decodes each table as one JSON array, and a position change or attribute
+    edit is a single-row read-merge-write. Exposes the same interface as JsonGraphStore.
+    """
+    backend = "sqlite"
+
+    def __init__(self, canvas_dir: str):
+        self.db_file = os.path.join(canvas_dir, DB_FILENAME)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.rows_written = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._migrate_node_attrs(self._conn)
+        return self._conn
+
+    @staticmethod
+    def _migrate_node_attrs(conn: sqlite3.Connection):
+        """Folds the per-attribute node_attrs rows of older databases into nodes.attrs."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(nodes)")}
+        legacy = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'node_attrs'"
+        ).fetchone() is not None
+        if "attrs" in columns and not legacy:
+            return
+        with conn:
+            if "attrs" not in columns:
+                conn.execute("ALTER TABLE nodes ADD COLUMN attrs TEXT")
+            if legacy:
+                attrs: Dict[str, Dict[str, Any]] = {}
+                for node_id, key, value in conn.execute("SELECT node_id, key, value FROM node_attrs"):
+                    attrs.setdefault(node_id, {})[key] = json.loads(value)
+                conn.executemany("UPDATE nodes SET attrs = ? WHERE id = ?",
+                                 [(_dumps(a), node_id) for node_id, a in attrs.items()])
+                conn.execute("DROP TABLE node_attrs")
+        logger.info("Migrated node attributes to one JSON column per node")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_file)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def load(self) -> nx.DiGraph:
+        """Builds the graph from the node and edge tables."""
+        graph = nx.DiGraph()
+        with self._lock:
+            conn = self._connect()
+            node_keys, node_attrs = self._fetch_decoded(conn, "nodes", "id")
+            graph.add_nodes_from((node_id, attrs) for (node_id,), attrs in zip(node_keys, node_attrs))
+            edge_keys, edge_attrs = self._fetch_decoded(conn, "edges", "source, target")
+            graph.add_edges_from((source, target, attrs) for (source, target), attrs in zip(edge_keys, edge_attrs))
+        return graph
+
+    @staticmethod
+    def _fetch_decoded(conn: sqlite3.Connection, table: str, key_columns: str):
+        """
+        Returns (keys, attrs) for every row of a table. SQLite concatenates each
+        column into a single JSON array, so Python decodes two documents
+        instead of one per row.
+        """
+        keys, attrs = conn.execute(
+            f"SELECT json_group_array(json_array({key_columns})), "
+            f"'[' || group_concat(coalesce(attrs, '{{}}'), ',') || ']' FROM {table}"
+        ).fetchone()
+        return json.loads(keys), json.loads(attrs or "[]")
+
+    # --- Row-level writes -------------------------------------------------
+
+    @staticmethod
+    def _indexed_values(attrs: Dict[str, Any]) -> List[Any]:
+        return [attrs.get(c) if isinstance(attrs.get(c), str) else None for c in INDEXED_NODE_COLUMNS]
+
+    def _merge_node(self, conn: sqlite3.Connection, node_id: str,
+                    attrs: Dict[str, Any], create: bool) -> int:
+        row = conn.execute("SELECT attrs FROM nodes WHERE id = ?", (node_id,)).fetchone()
+        if row is None and not create:
+            return 0
+        merged = json.loads(row[0]) if row and row[0] else {}
+        merged.update(attrs)
+        encoded = _dumps(merged)
+        conn.execute(
+            "INSERT INTO nodes (id, type, status, module, attrs) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET type = excluded.type, status = excluded.status, "
+            "module = excluded.module, attrs = excluded.attrs",
+            (node_id, *self._indexed_values(merged), encoded)
+        )
+        self.rows_written += 1
+        return len(encoded)
+
+    def _ensure_node(self, conn: sqlite3.Connection, node_id: str):
+        conn.execute("INSERT OR IGNORE INTO nodes (id) VALUES (?)", (node_id,))
+
+    def _merge_edge(self, conn: sqlite3.Connection, source: str, target: str,
+                    attrs: Dict[str, Any], create: bool) -> int:
+        row = conn.execute("SELECT attrs FROM edges WHERE source = ? AND target = ?", (source, target)).fetchone()
+        if row is None and not create:
+            return 0
+        merged = json.loads(row[0]) if row and row[0] else {}
+        merged.update(attrs)
+        encoded = _dumps(merged)
+        conn.execute(
+            "INSERT INTO edges (source, target, type, attrs) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(source, target) DO UPDATE SET type = excluded.type, attrs = excluded.attrs",
+            (source, target, merged.get("type"), encoded)
+        )
+        self.rows_written += 1
+        return len(encoded)
+
+    def _write_op(self, conn: sqlite3.Connection, op: Dict[str, Any]) -> int:
+        kind = op.get("op")
+        if kind == "add_node":
+            return self._merge_node(conn, op["id"], op.get("attrs", {}), create=True)
+        if kind == "update_node":
+            return self._merge_node(conn, op["id"], op.get("attrs", {}), create=False)
+        if kind == "remove_node":
+            node_id = op["id"]
+            conn.execute("DELETE FROM edges WHERE source = ? OR target = ?", (node_id, node_id))
+            conn.execute("DELETE FROM nodes WHERE id = ?", (node_id,))
+            return 0
+        if kind == "add_edge":
+            self._ensure_node(conn, op["source"])
+            self._ensure_node(conn, op["target"])
+            return self._merge_edge(conn, op["source"], op["target"], op.get("attrs", {}), create=True)
+        if kind == "update_edge":
+            return self._merge_edge(conn, op["source"], op["target"], op.get("attrs", {}), create=False)
+        if kind == "remove_edge":
+            conn.execute("DELETE FROM edges WHERE source = ? AND target = ?", (op["source"], op["target"]))
+            return 0
+        if kind == "batch":
+            return sum(self._write_op(conn, sub_op) for sub_op in op["ops"])
+        raise ValueError(f"Unknown graph operation: {kind}")
+
+    def append(self, ops: List[Dict[str, Any]]) -> int:
+        """Applies mutation records as row writes in one transaction. Returns approximate bytes written."""
+        if not ops:
+            return 0
+        written = 0
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for op in ops:
+                    written += self._write_op(conn, op)
+        return written
+
+    def needs_compaction(self) -> bool:
+        # Rows are always current; there is no journal to fold.
+        return False
+
+    def compact(self, graph: nx.DiGraph) -> int:
+        """Checkpoints the WAL into the database file. Rows are already current."""
+        with self._lock:
+            self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return 0
+
+    def import_graph(self, graph: nx.DiGraph) -> int:
+        """
+        Replaces all tables with the given graph in one transaction.
+        Used when migrating a canvas to this store.
+        """
+        written = 0
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM edges")
+                conn.execute("DELETE FROM nodes")
+                node_rows = [(node_id, *self._indexed_values(attrs), _dumps(attrs))
+                             for node_id, attrs in graph.nodes(data=True)]
+                conn.executemany("INSERT INTO nodes (id, type, status, module, attrs) VALUES (?, ?, ?, ?, ?)",
+                                 node_rows)
+                written += sum(len(r[-1]) for r in node_rows)
+                edge_rows = [(u, v, d.get("type"), _dumps(d)) for u, v, d in graph.edges(data=True)]
+                conn.executemany("INSERT INTO edges (source, target, type, attrs) VALUES (?, ?, ?, ?)", edge_rows)
+                written += sum(len(r[3]) for r in edge_rows)
+        return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "db_bytes": os.path.getsize(self.db_file) if self.exists() else 0,
+            "rows_written": self.rows_written,
+        }
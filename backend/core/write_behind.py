@@ -0,0 +1,139 @@
+import threading
+import logging
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Buffers graph mutation records and hands them to a persist callback in
+    coalesced batches, either from a background thread (every interval_ms)
+    or as soon as max_ops records are pending.
+
+    Consecutive attribute updates to the same node or edge are merged into a
+    single record, so a burst of drags on one node costs one journal line.
+    """
+    def __init__(self, persist: Callable[[List[Dict[str, Any]]], int],
+                 interval_ms: int = 250, max_ops: int = 200):
+        self._persist = persist
+        self.interval = max(interval_ms, 10) / 1000.0
+        self.max_ops = max(max_ops, 1)
+
+        self._pending: List[Dict[str, Any]] = []
+        # Index of the pending update record for a node id / edge key, while it can still absorb updates
+        self._mergeable: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+        self.stats = {
+            "commits": 0,            # mutation batches submitted by the Weaver
+            "ops_submitted": 0,
+            "ops_merged": 0,         # update records folded into an earlier pending record
+            "ops_written": 0,
+            "flushes": 0,
+            "coalesced_writes": 0,   # commits that did not need a write of their own
+            "bytes_written": 0,
+            "failed_flushes": 0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name="weaver-write-behind", daemon=True)
+        self._thread.start()
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._pending)
+
+    @staticmethod
+    def _merge_key(op: Dict[str, Any]) -> Optional[Tuple]:
+        if op["op"] == "update_node":
+            return ("node", op["id"])
+        if op["op"] == "update_edge":
+            return ("edge", op["source"], op["target"])
+        return None
+
+    def _invalidate(self, op: Dict[str, Any]):
+        """Stops merging into records whose node or edge was structurally changed by op."""
+        kind = op["op"]
+        if kind == "batch":
+            # Updates after a transaction must not be folded into records written before it
+            for sub_op in op["ops"]:
+                self._invalidate(sub_op)
+                key = self._merge_key(sub_op)
+                if key is not None:
+                    self._mergeable.pop(key, None)
+        elif kind in ("add_node", "remove_node"):
+            node_id = op["id"]
+            self._mergeable.pop(("node", node_id), None)
+            if kind == "remove_node":
+                for key in [k for k in self._mergeable if k[0] == "edge" and node_id in k[1:]]:
+                    del self._mergeable[key]
+        elif kind in ("add_edge", "remove_edge"):
+            self._mergeable.pop(("edge", op["source"], op["target"]), None)
+
+    def submit(self, ops: List[Dict[str, Any]]):
+        with self._lock:
+            self.stats["commits"] += 1
+            self.stats["ops_submitted"] += len(ops)
+            for op in ops:
+                key = self._merge_key(op)
+                if key is not None and key in self._mergeable:
+                    self._pending[self._mergeable[key]]["attrs"].update(op.get("attrs", {}))
+                    self.stats["ops_merged"] += 1
+                    continue
+                if key is not None:
+                    op = {**op, "attrs": dict(op.get("attrs", {}))}
+                    self._mergeable[key] = len(self._pending)
+                else:
+                    self._invalidate(op)
+                self._pending.append(op)
+            if len(self._pending) >= self.max_ops:
+                self._wakeup.set()
+
+    def flush(self) -> int:
+        """Synchronously persists everything pending. Returns bytes written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._mergeable = {}
+                commits = self.stats["commits"]
+            if not batch:
+                return 0
+            try:
+                written = self._persist(batch)
+            except Exception as e:
+                # Put the batch back in front of anything submitted meanwhile; it is retried next tick.
+                with self._lock:
+                    self._pending = batch + self._pending
+                    self._mergeable = {}
+                    self.stats["failed_flushes"] += 1
+                logger.error(f"Write-behind flush failed: {e}")
+                return 0
+
+            with self._lock:
+                self.stats["flushes"] += 1
+                self.stats["ops_written"] += len(batch)
+                self.stats["bytes_written"] += written
+                self.stats["coalesced_writes"] = max(commits - self.stats["flushes"], 0)
+            return written
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._pending:
+                self.flush()
+
+    def close(self):
+        """Stops the background thread after a final synchronous flush."""
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending_ops"] = len(self._pending)
+        return stats
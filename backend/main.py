@@ -1,11 +1,11 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import uuid4
 import logging
-import shutil
 import os
 import json
 from datetime import datetime
@@ -20,7 +20,11 @@ import io
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-from core.graph_logic import Weaver
+from core.graph_logic import NODE_FIELD_PROFILES, Weaver, WeaverPool
+from core.ranking import CHARS_PER_TOKEN
+from core.response_cache import dump_json, pick_encoding
+from core.event_stream import (NODE_ADDED, NODE_UPDATED, NODE_REMOVED, EDGE_ADDED, EDGE_UPDATED,
+                               EDGE_REMOVED, SHADOW_COMMITTED, RESYNC)
 from core.chat_bridge import ChatBridge
 from core.api_agents import router as agent_router, AgentManager
 import core.api_agents
@@ -52,6 +56,10 @@ weaver = Weaver()
 chat_bridge = ChatBridge(weaver)
 prompt_registry = PromptRegistry()
 
+# Canvas-scoped Weavers behind /api/v2/canvases/{canvas_id}/... routes
+weaver_pool = WeaverPool(weaver)
+canvas_chat_bridges: Dict[str, ChatBridge] = {}
+
 # Initialize Managers/Routers
 core.api_agents.agent_manager = AgentManager(weaver, prompt_registry)
 core.api_prompts.prompt_registry = prompt_registry
@@ -63,7 +71,19 @@ sessions_db: Dict[str, Dict] = {}
 # --- Data Models ---
 class ContextRequest(BaseModel):
     selected_nodes: List[str]
-    depth_mode: str 
+    depth_mode: str # "F0", "F1", "F2", ... (hops around the selection)
+    # Explicit hop count; overrides depth_mode
+    depth: Optional[int] = None
+    # Only follow edges of these types (e.g. ["reference"]); all edges when omitted
+    edge_types: Optional[List[str]] = None
+    # Skip edges whose confidence is below this
+    min_confidence: Optional[float] = None
+    # Budgets: expansion stops once either would be exceeded
+    max_nodes: Optional[int] = None
+    max_bytes: Optional[int] = None
+    max_tokens: Optional[int] = None
+    # "bfs" keeps the nearest nodes, "pagerank" the most relevant ones (personalized PageRank from the selection)
+    ranking: str = "bfs"
 
 class ChatMessageRequest(BaseModel):
     session_id: str
@@ -97,6 +117,38 @@ class EdgeRequest(BaseModel):
 class CanvasCreateRequest(BaseModel):
     name: str
 
+class StorageBackendRequest(BaseModel):
+    backend: str # "json" or "sqlite"
+
+class SnapshotFormatRequest(BaseModel):
+    format: str # "json" (graph.json) or "binary" (graph.snap)
+
+class BatchRequest(BaseModel):
+    # Mutation records, e.g. {"op": "add_edge", "source": "A", "target": "B", "attrs": {"type": "reference"}}
+    operations: List[Dict[str, Any]]
+
+# --- Canvas Scoping ---
+# Graph routes are served both unscoped (/api/v2/graph, on the active canvas) and
+# canvas-scoped (/api/v2/canvases/{canvas_id}/graph). Handlers receive the right
+# Weaver / ChatBridge through these dependencies.
+
+def get_canvas_weaver(canvas_id: Optional[str] = None) -> Weaver:
+    if canvas_id is None:
+        return weaver
+    scoped = weaver_pool.get(canvas_id)
+    if scoped is None:
+        raise HTTPException(status_code=404, detail="Canvas not found")
+    return scoped
+
+def get_canvas_chat_bridge(canvas_weaver: Weaver = Depends(get_canvas_weaver)) -> ChatBridge:
+    if canvas_weaver is weaver:
+        return chat_bridge
+    bridge = canvas_chat_bridges.get(canvas_weaver.active_canvas_id)
+    if bridge is None or bridge.weaver is not canvas_weaver:
+        bridge = ChatBridge(canvas_weaver)
+        canvas_chat_bridges[canvas_weaver.active_canvas_id] = bridge
+    return bridge
+
 # --- Endpoints ---
 
 @app.get("/")
@@ -118,8 +170,7 @@ def create_canvas(payload: CanvasCreateRequest):
 def activate_canvas(canvas_id: str):
     """Switches the active canvas."""
     if weaver.switch_canvas(canvas_id):
-        # When switching canvas, we need to clear session_db to avoid context mixups
-        sessions_db.clear() 
+        # Sessions keep their own canvas_id and context snapshot, so they survive the switch
         return {"status": "success", "message": f"Switched to canvas {canvas_id}"}
     raise HTTPException(status_code=404, detail="Canvas not found")
 
@@ -130,30 +181,298 @@ def delete_canvas(canvas_id: str):
         return {"status": "success", "message": "Canvas deleted"}
     raise HTTPException(status_code=400, detail="Cannot delete default canvas or canvas not found")
 
+@app.post("/api/v2/canvases/{canvas_id}/storage")
+def set_canvas_storage(canvas_id: str, payload: StorageBackendRequest):
+    """Migrates a canvas between the JSON (snapshot + journal) and SQLite storage backends."""
+    try:
+        if weaver.set_storage_backend(canvas_id, payload.backend):
+            return {"status": "success", "message": f"Canvas {canvas_id} now uses {payload.backend} storage"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    raise HTTPException(status_code=404, detail="Canvas not found")
+
+@app.post("/api/v2/canvases/{canvas_id}/snapshot-format")
+def set_canvas_snapshot_format(canvas_id: str, payload: SnapshotFormatRequest):
+    """Switches a canvas between node-link JSON and compact binary snapshots."""
+    try:
+        if weaver.set_snapshot_format(canvas_id, payload.format):
+            return {"status": "success", "message": f"Canvas {canvas_id} now uses {payload.format} snapshots"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    raise HTTPException(status_code=404, detail="Canvas not found")
+
+def resolve_node_fields(fields: Optional[str], profile: Optional[str]) -> Optional[List[str]]:
+    """
+    The node attributes a request asks for: an explicit comma-separated fields list,
+    else a named profile from NODE_FIELD_PROFILES. None means every attribute.
+    """
+    if fields:
+        return [f.strip() for f in fields.split(",") if f.strip()]
+    if profile is None:
+        return None
+    if profile not in NODE_FIELD_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile '{profile}'. Use one of: {', '.join(NODE_FIELD_PROFILES)}")
+    selected = NODE_FIELD_PROFILES[profile]
+    return list(selected) if selected is not None else None
+
+def serialize_node(weaver: Weaver, node_id: str, include_content: bool = True,
+                   fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    return {"id": node_id, **weaver.get_node_data(node_id, include_content=include_content, fields=fields)}
+
+def serialize_edge(weaver: Weaver, source: str, target: str) -> Dict[str, Any]:
+    return {"source": source, "target": target, **weaver.graph.edges[source, target]}
+
+def serialize_graph(weaver: Weaver, include_shadow: bool = False, include_content: bool = False,
+                    fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Full snapshot of the canvas graph, tagged with the version it reflects."""
+    # Writers wait until the snapshot is built, so it matches its version exactly
+    with weaver.locked():
+        snapshot = weaver.get_graph_version()
+        nodes = []
+        for n, data in weaver.graph.nodes(data=True):
+            # Filter shadow nodes if not requested
+            if not include_shadow and data.get("status") == "shadow":
+                continue
+            nodes.append(serialize_node(weaver, n, include_content, fields))
+        edges = [serialize_edge(weaver, u, v) for u, v in weaver.graph.edges()]
+    return {**snapshot, "nodes": nodes, "edges": edges}
+
 @app.get("/api/v2/graph")
-def get_full_graph(include_shadow: bool = False):
-    """Returns the full graph for initial rendering."""
-    # We use get_subgraph with simple depth logic or just iterate nodes manually 
-    # But since we added filter logic to get_subgraph in Weaver, let's use that or replicate it.
-    # Actually, weaver.graph.nodes() is direct access.
-    
-    nodes = []
-    for n in weaver.graph.nodes():
-        node_data = dict(weaver.graph.nodes[n])
-        # Filter shadow nodes if not requested
-        if not include_shadow and node_data.get("status") == "shadow":
-            continue
-            
-        # Include position if it exists
-        if "position" in node_data:
-            nodes.append({"id": n, **node_data})
-        else:
-            nodes.append({"id": n, **node_data})
-    edges = [{"source": u, "target": v, **weaver.graph.edges[u, v]} for u, v in weaver.graph.edges()]
-    return {"nodes": nodes, "edges": edges}
+@app.get("/api/v2/canvases/{canvas_id}/graph")
+def get_full_graph(request: Request, include_shadow: bool = False, include_content: bool = False,
+                   fields: Optional[str] = None, profile: Optional[str] = None,
+                   weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Returns the full graph for initial rendering.
+    Node bodies are left out; fetch them per node from /nodes/{node_id}, or pass
+    include_content=true to hydrate every body from the blob store.
+    fields=id,title,position (or profile=render) limits each node to those attributes.
+    The response carries the graph version and epoch to pass to /graph/changes.
+
+    The serialized (and gzip/br compressed) body is cached until the graph next
+    changes. Sends an ETag; a request with a matching If-None-Match gets 304.
+    """
+    node_fields = resolve_node_fields(fields, profile)
+    variant = (include_shadow, include_content, tuple(node_fields) if node_fields is not None else None)
+    cached = weaver.get_graph_response(
+        variant, lambda: serialize_graph(weaver, include_shadow, include_content, node_fields))
+    encoding = pick_encoding(request.headers.get("accept-encoding"))
+    headers = {"ETag": cached.etag_for(encoding), "Vary": "Accept-Encoding"}
+    if cached.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=cached.encoded(encoding), media_type="application/json", headers=headers)
+
+@app.get("/api/v2/graph/viewport")
+@app.get("/api/v2/canvases/{canvas_id}/graph/viewport")
+def get_graph_viewport(x0: float, y0: float, x1: float, y1: float, zoom: float = 1.0,
+                       include_shadow: bool = False, fields: Optional[str] = None,
+                       profile: Optional[str] = "render", weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Returns only the nodes and edges inside the canvas rectangle (x0, y0)-(x1, y1),
+    so large canvases can be drawn a screen at a time. Off-screen ends of returned
+    edges come back as anchors. When zoomed out (zoom is the client's scale factor),
+    dense areas come back as clusters with counted cluster_edges instead.
+    Nodes use the render profile unless fields/profile say otherwise.
+    """
+    if not (x0 < x1 and y0 < y1):
+        raise HTTPException(status_code=400, detail="Viewport needs x0 < x1 and y0 < y1")
+    if zoom <= 0:
+        raise HTTPException(status_code=400, detail="zoom must be > 0")
+    node_fields = resolve_node_fields(fields, profile)
+    with weaver.locked():
+        snapshot = weaver.get_graph_version()
+        view = weaver.get_viewport(x0, y0, x1, y1, zoom, include_shadow)
+        return {
+            **snapshot,
+            "bounds": {"x0": x0, "y0": y0, "x1": x1, "y1": y1},
+            "zoom": zoom,
+            "clustered": view["clustered"],
+            "nodes": [serialize_node(weaver, n, include_content=False, fields=node_fields) for n in view["nodes"]],
+            "edges": [serialize_edge(weaver, u, v) for u, v in view["edges"]],
+            "anchors": [{"id": n, "position": {"x": x, "y": y}} for n, (x, y) in view["anchors"].items()],
+            "clusters": view["clusters"],
+            "cluster_edges": view["cluster_edges"],
+            "unpositioned": view["unpositioned"],
+        }
+
+@app.get("/api/v2/graph/changes")
+@app.get("/api/v2/canvases/{canvas_id}/graph/changes")
+def get_graph_changes(since: int, epoch: Optional[str] = None, include_shadow: bool = False,
+                      include_content: bool = False, fields: Optional[str] = None,
+                      profile: Optional[str] = None, weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    What changed since graph version `since` (from an earlier /graph or /graph/changes
+    response), as added/updated/removed nodes and edges with "full": false.
+    When the server no longer has that history (restart, other epoch, too old),
+    returns the full snapshot with "full": true instead.
+    """
+    if since < 0:
+        raise HTTPException(status_code=400, detail="since must be >= 0")
+    node_fields = resolve_node_fields(fields, profile)
+    with weaver.locked():
+        snapshot = weaver.get_graph_version()
+        changes = weaver.get_changes(since, epoch)
+        if changes is None:
+            return {"full": True, **serialize_graph(weaver, include_shadow, include_content, node_fields)}
+
+        nodes = {"added": [], "updated": [], "removed": list(changes["nodes"]["removed"])}
+        for state in ("added", "updated"):
+            for node_id in changes["nodes"][state]:
+                if not include_shadow and weaver.graph.nodes[node_id].get("status") == "shadow":
+                    # The client never saw it, or it just left its view
+                    nodes["removed"].append(node_id)
+                    continue
+                nodes[state].append(serialize_node(weaver, node_id, include_content, node_fields))
+        edges = {
+            state: [serialize_edge(weaver, u, v) for u, v in changes["edges"][state]]
+            for state in ("added", "updated")
+        }
+    edges["removed"] = [{"source": u, "target": v} for u, v in changes["edges"]["removed"]]
+    return {**snapshot, "full": False, "nodes": nodes, "edges": edges}
+
+# Event stream: most events sent in one message, and the idle time before a keep-alive comment
+EVENT_BATCH_MAX = 500
+EVENT_KEEPALIVE_SECONDS = 15
+
+def sse_message(event: str, data: Any, event_id: Optional[str] = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\n".encode() + b"data: " + dump_json(data) + b"\n\n"
+
+def hydrate_event(weaver: Weaver, version: int, event_type: str, payload: Dict[str, Any],
+                  node_fields: Optional[List[str]]) -> Dict[str, Any]:
+    """An event as sent to clients: added/updated nodes and edges carry their current data."""
+    event = {"type": event_type, "version": version, **payload}
+    if event_type in (NODE_ADDED, NODE_UPDATED, SHADOW_COMMITTED) and payload["id"] in weaver.graph:
+        event["node"] = serialize_node(weaver, payload["id"], include_content=False, fields=node_fields)
+    elif event_type in (EDGE_ADDED, EDGE_UPDATED) and weaver.graph.has_edge(payload["source"], payload["target"]):
+        event["edge"] = serialize_edge(weaver, payload["source"], payload["target"])
+    return event
+
+def hydrate_events(weaver: Weaver, events: List[Tuple[int, str, Dict[str, Any]]],
+                   node_fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """hydrate_event() for a batch, under the canvas lock so every event reads one graph state."""
+    with weaver.locked():
+        return [hydrate_event(weaver, version, event_type, payload, node_fields)
+                for version, event_type, payload in events]
+
+def resume_events(weaver: Weaver, since: Optional[int], epoch: Optional[str],
+                  node_fields: Optional[List[str]]) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+    """
+    The hello snapshot of an event stream and, when resuming from since, the
+    events it missed (None when the change log cannot say), read at one version.
+    """
+    with weaver.locked():
+        snapshot = weaver.get_graph_version()
+        if since is None:
+            return snapshot, []
+        changes = weaver.get_changes(since, epoch)
+        if changes is None:
+            return snapshot, None
+        version = snapshot["version"]
+        return snapshot, hydrate_events(weaver, [(version, t, p) for t, p in change_events(changes)], node_fields)
+
+def change_events(changes: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Weaver.get_changes() output as events: removals first, then nodes before their edges."""
+    nodes, edges = changes["nodes"], changes["edges"]
+    return ([(EDGE_REMOVED, {"source": u, "target": v}) for u, v in edges["removed"]]
+            + [(NODE_REMOVED, {"id": n}) for n in nodes["removed"]]
+            + [(NODE_ADDED, {"id": n}) for n in nodes["added"]]
+            + [(NODE_UPDATED, {"id": n}) for n in nodes["updated"]]
+            + [(EDGE_ADDED, {"source": u, "target": v}) for u, v in edges["added"]]
+            + [(EDGE_UPDATED, {"source": u, "target": v}) for u, v in edges["updated"]])
+
+@app.get("/api/v2/events")
+@app.get("/api/v2/canvases/{canvas_id}/events")
+async def stream_events(request: Request, since: Optional[int] = None, epoch: Optional[str] = None,
+                        fields: Optional[str] = None, profile: Optional[str] = "render",
+                        canvas_id: Optional[str] = None, weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Server-sent events for graph mutations on a canvas (the active one at connect
+    time for the unscoped route), so clients see background results such as
+    auto-linked edges without polling /graph.
+
+    Opens with "hello" {epoch, version}. Then "mutations" messages, each
+    {"version", "events": [...]} with events of type node_added, node_updated,
+    node_removed, edge_added, edge_updated, edge_removed or shadow_committed.
+    Added and updated nodes and edges carry their current data, with nodes in
+    the render profile unless fields/profile say otherwise. Shadow nodes are
+    included; filter on status.
+    Mutations arriving within events.batch_ms go out together.
+
+    Resume with since (+ epoch) or the Last-Event-ID header: the missed changes
+    are sent first. A "resync" {since} message means the stream cannot say what
+    changed: either the history is gone or the client fell events.max_pending
+    behind. Catch up from /graph/changes?since= (or /graph when since is null).
+    """
+    node_fields = resolve_node_fields(fields, profile)
+    if since is None and request.headers.get("last-event-id"):
+        last_epoch, _, last_version = request.headers["last-event-id"].partition(":")
+        if last_version.isdigit():
+            epoch, since = last_epoch, int(last_version)
+    if since is not None and since < 0:
+        raise HTTPException(status_code=400, detail="since must be >= 0")
+    if canvas_id is None:
+        # Stay on the canvas that was active at connect time
+        weaver = weaver_pool.get(weaver.active_canvas_id) or weaver
+    window = weaver.settings.get("events", {}).get("batch_ms", 50) / 1000.0
+    subscription = weaver.subscribe_events()
+
+    async def stream():
+        try:
+            # Graph reads take the canvas lock, so they run off the event loop
+            snapshot, events = await run_in_threadpool(resume_events, weaver, since, epoch, node_fields)
+            yield sse_message("hello", snapshot, f"{snapshot['epoch']}:{snapshot['version']}")
+            subscription.delivered_version = snapshot["version"]
+            covered = 0
+            if events is None:
+                yield sse_message(RESYNC, {"since": None, "reason": "history"})
+            elif since is not None:
+                covered = snapshot["version"]
+                if events:
+                    yield sse_message("mutations", {"version": covered, "events": events},
+                                      f"{snapshot['epoch']}:{covered}")
+            while not await request.is_disconnected():
+                batch = await subscription.next_batch(EVENT_KEEPALIVE_SECONDS, window, EVENT_BATCH_MAX)
+                if batch is None:
+                    break
+                if not batch:
+                    yield b": keep-alive\n\n"
+                    continue
+                resync = [payload for _, event_type, payload in batch if event_type == RESYNC]
+                if resync:
+                    # Nothing else in the batch matters once the client refetches
+                    yield sse_message(RESYNC, resync[-1])
+                    continue
+                # Events up to the resumed version were already sent from the change log
+                batch = [event for event in batch if event[0] > covered]
+                if not batch:
+                    continue
+                version = batch[-1][0]
+                events = await run_in_threadpool(hydrate_events, weaver, batch, node_fields)
+                yield sse_message("mutations", {"version": version, "events": events},
+                                  f"{snapshot['epoch']}:{version}")
+        finally:
+            subscription.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/v2/graph/analytics")
+@app.get("/api/v2/canvases/{canvas_id}/graph/analytics")
+def get_graph_analytics(top_n: int = 10, weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Centrality leaders and component sizes, from the CSR read engine when enabled.
+    "engine" names the one used; "engine_unavailable" explains a csr setting that fell back.
+    """
+    if not 1 <= top_n <= 100:
+        raise HTTPException(status_code=400, detail="top_n must be between 1 and 100")
+    return weaver.get_graph_analytics(top_n=top_n)
 
 @app.post("/api/v2/nodes/positions")
-def update_node_positions(positions: Dict[str, Dict[str, float]]):
+@app.post("/api/v2/canvases/{canvas_id}/nodes/positions")
+def update_node_positions(positions: Dict[str, Dict[str, float]], weaver: Weaver = Depends(get_canvas_weaver)):
     """
     Updates positions for multiple nodes.
     positions: { node_id: { x: float, y: float }, ... }
@@ -162,8 +481,22 @@ def update_node_positions(positions: Dict[str, Dict[str, float]]):
         return {"status": "success", "message": "Positions updated"}
     raise HTTPException(status_code=400, detail="Failed to update positions")
 
+@app.post("/api/v2/batch")
+@app.post("/api/v2/canvases/{canvas_id}/batch")
+def apply_batch(payload: BatchRequest, weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Applies a list of node and edge operations in one transaction.
+    Either every operation is applied and persisted, or none is (400 with the first error).
+    """
+    try:
+        applied = weaver.apply_batch(payload.operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "applied": applied}
+
 @app.get("/api/v2/context")
-def get_context_registry():
+@app.get("/api/v2/canvases/{canvas_id}/context")
+def get_context_registry(weaver: Weaver = Depends(get_canvas_weaver)):
     """Returns the current hierarchy (Topics/Modules)."""
     return weaver.registry.context
 
@@ -179,7 +512,8 @@ def update_settings(updates: Dict[str, Any]):
     return {"status": "success", "message": "Settings updated", "settings": weaver.settings.settings}
 
 @app.post("/api/v2/save")
-def manual_save():
+@app.post("/api/v2/canvases/{canvas_id}/save")
+def manual_save(weaver: Weaver = Depends(get_canvas_weaver)):
     """
     Manually saves all canvas data: graph, context, chat history, and settings.
     """
@@ -196,6 +530,46 @@ def manual_save():
         "save_status": save_status
     }
 
+@app.get("/api/v2/persistence/stats")
+@app.get("/api/v2/canvases/{canvas_id}/persistence/stats")
+def get_persistence_stats(weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Returns write-behind counters (flushes, coalesced writes, bytes written) for the active canvas.
+    """
+    return weaver.get_persistence_stats()
+
+@app.get("/api/v2/canvas-cache")
+def get_canvas_cache_stats():
+    """Returns hits, load times and resident size of the canvases kept in memory."""
+    return weaver.get_canvas_cache_stats()
+
+@app.get("/api/v2/context-cache")
+@app.get("/api/v2/canvases/{canvas_id}/context-cache")
+def get_context_cache_stats(weaver: Weaver = Depends(get_canvas_weaver)):
+    """Returns the graph version and hit/invalidation counts of the canvas's context cache."""
+    return weaver.get_context_cache_stats()
+
+@app.get("/api/v2/graph-cache")
+@app.get("/api/v2/canvases/{canvas_id}/graph-cache")
+def get_graph_response_cache_stats(weaver: Weaver = Depends(get_canvas_weaver)):
+    """Returns the graph version, cached bytes and hit counts of the canvas's /graph response cache."""
+    return weaver.get_graph_response_cache_stats()
+
+@app.get("/api/v2/blobs/cache")
+def get_content_cache_stats():
+    """Returns hit ratio and resident bytes of the node content cache."""
+    return weaver.get_content_cache_stats()
+
+@app.post("/api/v2/blobs/gc")
+def collect_blob_garbage():
+    """Deletes content blobs that are no longer referenced by any canvas."""
+    return {"status": "success", **weaver.collect_blob_garbage()}
+
+@app.on_event("shutdown")
+def flush_on_shutdown():
+    """Persists any buffered graph mutations before the process exits."""
+    weaver.close()
+
 @app.get("/api/v2/export")
 def export_canvas():
     """
@@ -220,20 +594,18 @@ def export_canvas():
     
     try:
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add graph.json
-            graph_file = canvas_dir / "graph.json"
-            if graph_file.exists():
-                zipf.write(graph_file, f"{canvas_id}/graph.json")
+            # Add graph.json (serialized from memory so it is current for every storage backend)
+            zipf.writestr(f"{canvas_id}/graph.json", weaver.export_graph_json())
             
             # Add context.json
             context_file = canvas_dir / "context.json"
             if context_file.exists():
                 zipf.write(context_file, f"{canvas_id}/context.json")
             
-            # Add chat.json
-            chat_file = canvas_dir / "chat.json"
+            # Add chat log
+            chat_file = canvas_dir / "chat.log.jsonl"
             if chat_file.exists():
-                zipf.write(chat_file, f"{canvas_id}/chat.json")
+                zipf.write(chat_file, f"{canvas_id}/chat.log.jsonl")
             
             # Add settings.json
             settings_file = Path(SETTINGS_FILE)
@@ -280,8 +652,57 @@ def export_canvas():
         logger.error(f"Export failed: {e}")
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
 
-async def run_auto_linking(node_id: str, final_meta: Dict[str, Any]):
-    """Background task for auto-linking."""
+# Canvas files restored by /import. Older exports carry chat.json instead of chat.log.jsonl.
+IMPORTED_CANVAS_FILES = ("context.json", "chat.log.jsonl", "chat.json")
+
+@app.post("/api/v2/import")
+async def import_canvas(file: UploadFile = File(...)):
+    """
+    Restores a ZIP written by /export as a new canvas and switches to it.
+    Accepts exports with either chat.log.jsonl or a legacy chat.json chat history;
+    the latter is converted to the append-only chat log.
+    Settings and the canvas index in the archive are left alone.
+    """
+    import zipfile
+    from pathlib import Path
+
+    from core.graph_logic import DATA_DIR
+
+    try:
+        zipf = zipfile.ZipFile(io.BytesIO(await file.read()))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Not a ZIP archive")
+
+    with zipf:
+        names = zipf.namelist()
+        graph_entry = next((n for n in names if n.count("/") == 1 and n.endswith("/graph.json")), None)
+        if graph_entry is None:
+            raise HTTPException(status_code=400, detail="Archive has no canvas graph.json")
+        prefix = graph_entry[:-len("graph.json")]
+        try:
+            graph_data = json.loads(zipf.read(graph_entry))
+            metadata = json.loads(zipf.read("metadata.json")) if "metadata.json" in names else {}
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Unreadable archive: {e}")
+
+        files = {name: zipf.read(prefix + name) for name in IMPORTED_CANVAS_FILES if prefix + name in names}
+        canvas_name = metadata.get("canvas_name") or prefix.rstrip("/")
+        new_id = await run_in_threadpool(weaver.import_canvas, canvas_name, graph_data, files)
+
+        thumbnails_dir = Path(DATA_DIR) / "thumbnails"
+        for name in names:
+            if name.startswith("thumbnails/") and not name.endswith("/"):
+                target = thumbnails_dir / os.path.basename(name)
+                if not target.exists():
+                    thumbnails_dir.mkdir(parents=True, exist_ok=True)
+                    target.write_bytes(zipf.read(name))
+
+    logger.info(f"Imported {file.filename} as canvas {new_id}")
+    return {"status": "success", "canvas_id": new_id}
+
+async def run_auto_linking(node_id: str, final_meta: Dict[str, Any], chat_bridge: ChatBridge):
+    """Background task for auto-linking, on the canvas the node was ingested into."""
+    weaver = chat_bridge.weaver
     try:
         candidates = weaver.get_node_summaries(exclude_id=node_id)
         current_node_summary = {"id": node_id, **final_meta}
@@ -296,7 +717,9 @@ async def run_auto_linking(node_id: str, final_meta: Dict[str, Any]):
         logger.error(f"Auto-linking failed for {node_id}: {e}")
 
 @app.post("/api/v2/ingest/text")
-async def ingest_text(payload: TextIngestRequest, background_tasks: BackgroundTasks):
+@app.post("/api/v2/canvases/{canvas_id}/ingest/text")
+async def ingest_text(payload: TextIngestRequest, background_tasks: BackgroundTasks,
+                      weaver: Weaver = Depends(get_canvas_weaver), chat_bridge: ChatBridge = Depends(get_canvas_chat_bridge)):
     """
     Ingests raw text or a YouTube URL.
     """
@@ -421,7 +844,7 @@ async def ingest_text(payload: TextIngestRequest, background_tasks: BackgroundTa
         weaver.add_document_node(node_id, final_content, final_meta, parent_id=parent_id)
         
         # --- AUTO-LINKING (Background) ---
-        background_tasks.add_task(run_auto_linking, node_id, final_meta)
+        background_tasks.add_task(run_auto_linking, node_id, final_meta, chat_bridge)
         # --------------------
         
         return {"status": "success", "node_id": node_id, "message": "Content ingested"}
@@ -433,12 +856,15 @@ async def ingest_text(payload: TextIngestRequest, background_tasks: BackgroundTa
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v2/ingest/upload")
+@app.post("/api/v2/canvases/{canvas_id}/ingest/upload")
 async def upload_document(
     file: UploadFile = File(...), 
     folder: Optional[str] = Form(None),
     module: str = Form("General"),
     main_topic: str = Form("Uncategorized"),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    weaver: Weaver = Depends(get_canvas_weaver),
+    chat_bridge: ChatBridge = Depends(get_canvas_chat_bridge)
 ):
     """
     Ingests a file (TXT/MD) and creates a node.
@@ -480,7 +906,7 @@ async def upload_document(
             node_id = weaver.add_document_node(filename, content_str, final_meta, parent_id=parent_id)
             
             # --- AUTO-LINKING LOGIC (Background) ---
-            background_tasks.add_task(run_auto_linking, node_id, final_meta)
+            background_tasks.add_task(run_auto_linking, node_id, final_meta, chat_bridge)
             # ----------------------------------------------
             
         except Exception as e:
@@ -499,11 +925,14 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v2/ingest/image")
+@app.post("/api/v2/canvases/{canvas_id}/ingest/image")
 async def upload_image(
     file: UploadFile = File(...), 
     folder: Optional[str] = Form(None),
     module: str = Form("General"),
-    main_topic: str = Form("Uncategorized")
+    main_topic: str = Form("Uncategorized"),
+    weaver: Weaver = Depends(get_canvas_weaver),
+    chat_bridge: ChatBridge = Depends(get_canvas_chat_bridge)
 ):
     """
     Ingests an image, analyzes it with AI (OCR + content analysis), and creates a node.
@@ -579,7 +1008,7 @@ async def upload_image(
             weaver.add_document_node(node_id, content, final_meta, parent_id=parent_id)
             
             # --- AUTO-LINKING (Background) ---
-            background_tasks.add_task(run_auto_linking, node_id, final_meta)
+            background_tasks.add_task(run_auto_linking, node_id, final_meta, chat_bridge)
             # --------------------
             
         except Exception as e:
@@ -602,7 +1031,8 @@ class FolderRequest(BaseModel):
     parent_id: Optional[str] = None
 
 @app.post("/api/v2/folders")
-def create_folder(payload: FolderRequest):
+@app.post("/api/v2/canvases/{canvas_id}/folders")
+def create_folder(payload: FolderRequest, weaver: Weaver = Depends(get_canvas_weaver)):
     """
     Creates a new folder in the dynamic graph.
     """
@@ -610,11 +1040,49 @@ def create_folder(payload: FolderRequest):
     return {"status": "success", "folder_id": folder_id}
 
 @app.get("/api/v2/file-tree")
-def get_file_tree():
+@app.get("/api/v2/canvases/{canvas_id}/file-tree")
+def get_file_tree(request: Request, weaver: Weaver = Depends(get_canvas_weaver)):
     """
     Returns the hierarchical file tree (Folders & Files).
+    Sends an ETag; a request with a matching If-None-Match gets 304 Not Modified.
+    """
+    etag = weaver.get_file_tree_etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(weaver.get_file_tree(), headers={"ETag": etag})
+
+@app.get("/api/v2/file-tree/{folder_id}/children")
+@app.get("/api/v2/canvases/{canvas_id}/file-tree/{folder_id}/children")
+def get_file_tree_children(folder_id: str, cursor: Optional[str] = None, limit: int = 100,
+                           weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Returns one page of a folder's direct children (folders first, then by label),
+    each with its child count. Use folder_id "__root__" for the top level and pass
+    next_cursor back as cursor for the following page.
+    """
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    try:
+        page = weaver.get_file_tree_children(folder_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    return page
+
+@app.get("/api/v2/file-tree/{folder_id}")
+@app.get("/api/v2/canvases/{canvas_id}/file-tree/{folder_id}")
+def get_file_subtree(folder_id: str, request: Request, weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Returns the subtree below one folder. Shares the file tree's ETag.
     """
-    return weaver.get_file_tree()
+    etag = weaver.get_file_tree_etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    subtree = weaver.get_file_subtree(folder_id)
+    if subtree is None:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    return JSONResponse(subtree, headers={"ETag": etag})
 
 @app.get("/api/v2/thumbnails/{filename}")
 async def get_thumbnail(filename: str):
@@ -631,7 +1099,8 @@ async def get_thumbnail(filename: str):
     return FileResponse(thumbnail_path)
 
 @app.post("/api/v2/ingest/edge")
-def create_edge(payload: EdgeRequest):
+@app.post("/api/v2/canvases/{canvas_id}/ingest/edge")
+def create_edge(payload: EdgeRequest, weaver: Weaver = Depends(get_canvas_weaver)):
     """
     Manually creates a justified edge between nodes.
     """
@@ -641,7 +1110,8 @@ def create_edge(payload: EdgeRequest):
     return {"status": "success", "message": "Edge created"}
 
 @app.put("/api/v2/edges")
-def update_edge(source: str, target: str, updates: Dict[str, Any]):
+@app.put("/api/v2/canvases/{canvas_id}/edges")
+def update_edge(source: str, target: str, updates: Dict[str, Any], weaver: Weaver = Depends(get_canvas_weaver)):
     """
     Updates edge attributes (e.g. justification).
     """
@@ -650,14 +1120,16 @@ def update_edge(source: str, target: str, updates: Dict[str, Any]):
     return {"status": "success", "message": "Edge updated"}
 
 @app.delete("/api/v2/edges")
-def delete_edge(source: str, target: str):
+@app.delete("/api/v2/canvases/{canvas_id}/edges")
+def delete_edge(source: str, target: str, weaver: Weaver = Depends(get_canvas_weaver)):
     if not weaver.delete_edge(source, target):
         raise HTTPException(status_code=404, detail="Edge not found")
     logger.info(f"Deleted edge: {source} -> {target}")
     return {"status": "success", "message": "Edge deleted"}
 
 @app.post("/api/v2/edges/suggest")
-async def suggest_edge_justification(payload: EdgeSuggestionRequest):
+@app.post("/api/v2/canvases/{canvas_id}/edges/suggest")
+async def suggest_edge_justification(payload: EdgeSuggestionRequest, chat_bridge: ChatBridge = Depends(get_canvas_chat_bridge)):
     """
     Generates an AI justification for a potential edge.
     """
@@ -665,7 +1137,9 @@ async def suggest_edge_justification(payload: EdgeSuggestionRequest):
     return {"status": "success", "justification": justification}
 
 @app.post("/api/v2/nodes/{node_id}/expand")
-async def expand_node(node_id: str, payload: ExpansionRequest):
+@app.post("/api/v2/canvases/{canvas_id}/nodes/{node_id}/expand")
+async def expand_node(node_id: str, payload: ExpansionRequest,
+                      weaver: Weaver = Depends(get_canvas_weaver), chat_bridge: ChatBridge = Depends(get_canvas_chat_bridge)):
     """
     Expands a node by creating AI-generated sub-nodes (MECE) or abstracting upwards.
     """
@@ -678,26 +1152,28 @@ async def expand_node(node_id: str, payload: ExpansionRequest):
         # Generate breakdown
         suggestions = await chat_bridge.generate_mece_breakdown(node_id)
         
-        for item in suggestions:
-            # Create new node
-            new_id = f"{item.get('title', 'SUB').replace(' ', '_').upper()[:15]}_{uuid4().hex[:4]}"
-            meta = {
-                "title": item.get("title"),
-                "summary": item.get("summary"),
-                "tags": item.get("tags", []),
-                "node_type": item.get("node_type", "child"),
-                # Inherit module/topic from parent usually, but AI might suggest different
-                "module": weaver.graph.nodes[node_id].get("module", "General"),
-                "main_topic": weaver.graph.nodes[node_id].get("main_topic", "Uncategorized")
-            }
+        # All sub-nodes and their edges are persisted together, or not at all
+        with weaver.batch():
+            for item in suggestions:
+                # Create new node
+                new_id = f"{item.get('title', 'SUB').replace(' ', '_').upper()[:15]}_{uuid4().hex[:4]}"
+                meta = {
+                    "title": item.get("title"),
+                    "summary": item.get("summary"),
+                    "tags": item.get("tags", []),
+                    "node_type": item.get("node_type", "child"),
+                    # Inherit module/topic from parent usually, but AI might suggest different
+                    "module": weaver.graph.nodes[node_id].get("module", "General"),
+                    "main_topic": weaver.graph.nodes[node_id].get("main_topic", "Uncategorized")
+                }
             
-            weaver.add_document_node(new_id, item.get("content", ""), meta)
+                weaver.add_document_node(new_id, item.get("content", ""), meta)
             
-            # Create Edge: New Node -> Source Node (Child points to Parent)
-            justification = item.get("justification", "Sub-component of parent")
-            weaver.add_edge(new_id, node_id, justification)
+                # Create Edge: New Node -> Source Node (Child points to Parent)
+                justification = item.get("justification", "Sub-component of parent")
+                weaver.add_edge(new_id, node_id, justification)
             
-            created_nodes.append(new_id)
+                created_nodes.append(new_id)
             
     elif payload.direction == "up":
         # Generate abstraction
@@ -712,18 +1188,20 @@ async def expand_node(node_id: str, payload: ExpansionRequest):
                 "main_topic": "Uncategorized"
             }
             
-            weaver.add_document_node(new_id, item.get("content", ""), meta)
-            
-            # Create Edge: Source Node -> New Node (Child points to Parent)
-            justification = item.get("justification", " abstracted from child")
-            weaver.add_edge(node_id, new_id, justification)
+            with weaver.batch():
+                weaver.add_document_node(new_id, item.get("content", ""), meta)
+                
+                # Create Edge: Source Node -> New Node (Child points to Parent)
+                justification = item.get("justification", " abstracted from child")
+                weaver.add_edge(node_id, new_id, justification)
             
             created_nodes.append(new_id)
             
     return {"status": "success", "created_nodes": created_nodes}
 
 @app.post("/api/v2/nodes/{node_id}/rewrite")
-async def rewrite_node(node_id: str):
+@app.post("/api/v2/canvases/{canvas_id}/nodes/{node_id}/rewrite")
+async def rewrite_node(node_id: str, weaver: Weaver = Depends(get_canvas_weaver), chat_bridge: ChatBridge = Depends(get_canvas_chat_bridge)):
     """
     Rewrites a node's description AND content based on its connections.
     """
@@ -744,10 +1222,11 @@ async def rewrite_node(node_id: str):
         
     weaver.update_node(node_id, updates)
     
-    return {"status": "success", "message": "Node rewritten", "updates": updates, "node": weaver.graph.nodes[node_id]}
+    return {"status": "success", "message": "Node rewritten", "updates": updates, "node": weaver.get_node_data(node_id)}
 
 @app.post("/api/v2/nodes/{node_id}/analyze")
-async def analyze_node(node_id: str):
+@app.post("/api/v2/canvases/{canvas_id}/nodes/{node_id}/analyze")
+async def analyze_node(node_id: str, weaver: Weaver = Depends(get_canvas_weaver), chat_bridge: ChatBridge = Depends(get_canvas_chat_bridge)):
     """
     Manually triggers AI metadata extraction for an existing node.
     """
@@ -757,9 +1236,7 @@ async def analyze_node(node_id: str):
          logger.error(f"Node not found: {node_id}")
          raise HTTPException(status_code=404, detail="Node not found")
 
-    node = weaver.graph.nodes[node_id]
-    
-    content = node.get("content", "")
+    content = weaver.get_node_content(node_id)
     if not content:
         logger.error(f"Node {node_id} has no content.")
         raise HTTPException(status_code=400, detail="Node has no content to analyze")
@@ -791,10 +1268,7 @@ async def analyze_node(node_id: str):
     # Current implementation: Just overwrite with AI's best guess for now.
     
     # Update NetworkX graph
-    for key, value in updates.items():
-        weaver.graph.nodes[node_id][key] = value
-        
-    weaver.save_graph()
+    weaver.update_node(node_id, updates)
     logger.info(f"Graph updated and saved for node {node_id}")
     
     # --- AUTO-LINKING LOGIC ---
@@ -827,21 +1301,40 @@ async def analyze_node(node_id: str):
         logger.error(f"Auto-linking failed: {e}", exc_info=True)
     # --------------------------
     
-    updated_node = {"id": node_id, **weaver.graph.nodes[node_id]}
+    updated_node = {"id": node_id, **weaver.get_node_data(node_id)}
     return {
         "status": "success", 
         "message": "Metadata updated", 
         "node": updated_node
     }
 
+@app.get("/api/v2/nodes/{node_id}")
+@app.get("/api/v2/canvases/{canvas_id}/nodes/{node_id}")
+def get_node(node_id: str, request: Request, fields: Optional[str] = None, profile: Optional[str] = None,
+             weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Returns one node with its content, for views that load bodies on demand.
+    Takes the same fields/profile selection as /graph. Sends an ETag; a request
+    with a matching If-None-Match gets 304 Not Modified.
+    """
+    if node_id not in weaver.graph:
+        raise HTTPException(status_code=404, detail="Node not found")
+    node_fields = resolve_node_fields(fields, profile)
+    etag = weaver.get_node_etag(node_id, node_fields)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(serialize_node(weaver, node_id, fields=node_fields), headers={"ETag": etag})
+
 @app.delete("/api/v2/nodes/{node_id}")
-def delete_node(node_id: str):
+@app.delete("/api/v2/canvases/{canvas_id}/nodes/{node_id}")
+def delete_node(node_id: str, weaver: Weaver = Depends(get_canvas_weaver)):
     if not weaver.delete_node(node_id):
         raise HTTPException(status_code=404, detail="Node not found")
     logger.info(f"Deleted node: {node_id}")
     return {"status": "success", "message": "Node deleted"}
 
 @app.put("/api/v2/nodes/{node_id}")
+@app.put("/api/v2/canvases/{canvas_id}/nodes/{node_id}")
 async def update_node(
     node_id: str, 
     thumbnail: UploadFile = File(None),
@@ -855,7 +1348,8 @@ async def update_node(
     node_type: Optional[str] = Form(None),
     color: Optional[str] = Form(None),
     tags: Optional[str] = Form(None),
-    content: Optional[str] = Form(None)
+    content: Optional[str] = Form(None),
+    weaver: Weaver = Depends(get_canvas_weaver)
 ):
     """
     Updates node attributes. Can optionally upload a thumbnail image.
@@ -921,29 +1415,19 @@ async def update_node(
     
     # Handle Parent ID Change (Folder Reparenting)
     if parent_id is not None:
-        # Check if parent changed
-        current_data = weaver.graph.nodes[node_id]
-        # Logic to find current parent would be complex to query every time, 
-        # but for now we just add the new edge. 
-        # Ideally we remove old 'contains' edges first.
         try:
-            # Remove old parent links
-            in_edges = list(weaver.graph.in_edges(node_id, data=True))
-            for u, v, d in in_edges:
-                if d.get("type") == "contains":
-                    weaver.graph.remove_edge(u, v)
-            
-            # Add new parent link
+            # Replace old parent links with the new one (journaled by the Weaver)
             if parent_id and parent_id.strip() != "":
+                weaver.set_parent(node_id, parent_id)
                 if weaver.graph.has_node(parent_id):
-                    weaver.graph.add_edge(parent_id, node_id, type="contains", weight=1.0)
                     updates["parent_id"] = parent_id # Store for reference
-                else:
-                    logger.warning(f"Parent node {parent_id} not found.")
             else:
                  # If empty, it's now root
+                 weaver.set_parent(node_id, None)
                  updates["parent_id"] = ""
 
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"Failed to update parent folder: {e}")
     
@@ -952,11 +1436,11 @@ async def update_node(
         if not weaver.update_node(node_id, updates):
             raise HTTPException(status_code=500, detail="Failed to update node")
         logger.info(f"Updated node: {node_id}")
-        node_data = dict(weaver.graph.nodes[node_id])
+        node_data = weaver.get_node_data(node_id)
         return {"status": "success", "message": "Node updated", "node": node_data}
     else:
         # Return current node data even if no updates
-        node_data = dict(weaver.graph.nodes[node_id])
+        node_data = weaver.get_node_data(node_id)
         return {"status": "success", "message": "No updates provided", "node": node_data}
 
 @app.delete("/api/v2/edges")
@@ -966,21 +1450,74 @@ def delete_edge(source: str, target: str):
     logger.info(f"Deleted edge: {source} -> {target}")
     return {"status": "success", "message": "Edge deleted"}
 
+MAX_CONTEXT_DEPTH = 10
+
+def resolve_context_depth(payload: ContextRequest) -> int:
+    """Hop count from payload.depth, or from depth_mode "F<n>" (unknown modes mean F0)."""
+    depth = payload.depth
+    if depth is None:
+        mode = payload.depth_mode.strip().upper()
+        depth = int(mode[1:]) if mode[:1] == "F" and mode[1:].isdigit() else 0
+    if not 0 <= depth <= MAX_CONTEXT_DEPTH:
+        raise HTTPException(status_code=400, detail=f"depth must be between 0 and {MAX_CONTEXT_DEPTH}")
+    return depth
+
+def resolve_context_bytes(payload: ContextRequest) -> Optional[int]:
+    """The byte budget: max_bytes and max_tokens (about CHARS_PER_TOKEN bytes each), whichever is tighter."""
+    budgets = [b for b in (payload.max_bytes, payload.max_tokens and payload.max_tokens * CHARS_PER_TOKEN) if b is not None]
+    return min(budgets) if budgets else None
+
+@app.post("/api/v2/chat/context/preview")
+@app.post("/api/v2/canvases/{canvas_id}/chat/context/preview")
+def preview_context(payload: ContextRequest, weaver: Weaver = Depends(get_canvas_weaver)):
+    """
+    Sizes the context a selection would produce (nodes and bytes per hop) without
+    building it or starting a session, so the UI can show it before the user commits.
+    """
+    try:
+        expansion = weaver.expand_context(payload.selected_nodes, resolve_context_depth(payload),
+                                          max_nodes=payload.max_nodes, max_bytes=resolve_context_bytes(payload),
+                                          edge_types=payload.edge_types, min_confidence=payload.min_confidence,
+                                          ranking=payload.ranking)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "node_count": len(expansion["nodes"]),
+        "bytes": expansion["bytes"],
+        "hops": expansion["hops"],
+        "truncated": expansion["truncated"],
+        "stop_reason": expansion["stop_reason"],
+    }
+
 @app.post("/api/v2/chat/context")
-def calculate_context(payload: ContextRequest):
-    depth_map = {"F0": 0, "F1": 1, "F2": 2}
-    depth = depth_map.get(payload.depth_mode, 0)
+@app.post("/api/v2/canvases/{canvas_id}/chat/context")
+def calculate_context(payload: ContextRequest, chat_bridge: ChatBridge = Depends(get_canvas_chat_bridge)):
+    depth = resolve_context_depth(payload)
     
-    context_data = chat_bridge.calculate_context(payload.selected_nodes, depth)
+    try:
+        context_data = chat_bridge.calculate_context(payload.selected_nodes, depth, edge_types=payload.edge_types,
+                                                     max_nodes=payload.max_nodes,
+                                                     max_bytes=resolve_context_bytes(payload),
+                                                     min_confidence=payload.min_confidence, ranking=payload.ranking)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     session_id = str(uuid4())
     
     new_session = {
         "session_id": session_id,
+        "canvas_id": chat_bridge.weaver.active_canvas_id,
         "created_at": datetime.now().isoformat(),
         "config": {
             "selected_nodes": payload.selected_nodes,
             "depth_mode": payload.depth_mode,
+            "depth": depth,
+            "edge_types": payload.edge_types,
+            "min_confidence": payload.min_confidence,
+            "max_nodes": payload.max_nodes,
+            "max_bytes": payload.max_bytes,
+            "max_tokens": payload.max_tokens,
+            "ranking": payload.ranking,
             "resolved_context": [n["id"] for n in context_data["context_nodes"]]
         },
         "context_data": context_data, 
@@ -1026,9 +1563,9 @@ async def send_message(payload: ChatMessageRequest):
     session["messages"].append(assistant_msg)
     
     # Autosave chat history (PERSISTENCE)
-    # We update the internal history of Weaver which writes to disk
-    weaver.chat_history.append({"session_id": payload.session_id, "messages": session["messages"]})
-    weaver.save_chat_history(weaver.chat_history)
+    # One append-only record per message; the session's earlier turns are already on disk
+    weaver.append_chat_message(payload.session_id, user_msg, canvas_id=session.get("canvas_id"))
+    weaver.append_chat_message(payload.session_id, assistant_msg, canvas_id=session.get("canvas_id"))
     
     return assistant_msg
 
@@ -1036,6 +1573,14 @@ async def send_message(payload: ChatMessageRequest):
 def get_history(session_id: str):
     session = sessions_db.get(session_id)
     if not session:
-        # Check if we can hydrate from persistent storage (optional enhancement)
-        raise HTTPException(status_code=404, detail="Session not found")
+        # Hydrate past sessions from the canvas chat log
+        messages = weaver.get_chat_messages(session_id)
+        if not messages:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return {"session_id": session_id, "messages": messages}
     return session
+
+@app.post("/api/v2/chat/compact")
+def compact_chat_logs():
+    """Rewrites legacy chat.json files (full history duplicated per turn) into append-only chat logs."""
+    return {"status": "success", "compacted": weaver.compact_chat_logs()}
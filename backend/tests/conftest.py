@@ -0,0 +1,61 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.graph_logic as graph_logic
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """A throwaway data directory in place of data/, also the working directory."""
+    monkeypatch.setattr(graph_logic, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(graph_logic, "CANVASES_DIR", str(tmp_path / "canvases"))
+    monkeypatch.setattr(graph_logic, "CANVAS_INDEX_FILE", str(tmp_path / "canvases.json"))
+    monkeypatch.setattr(graph_logic, "SETTINGS_FILE", str(tmp_path / "nexus_settings.json"))
+    monkeypatch.setattr(graph_logic, "BLOBS_DIR", str(tmp_path / "blobs"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def open_weaver(data_dir):
+    """Opens Weavers on the data directory (again, to simulate a restart); closes them afterwards."""
+    opened = []
+
+    def open_():
+        weaver = graph_logic.Weaver()
+        opened.append(weaver)
+        return weaver
+
+    yield open_
+    for weaver in opened:
+        weaver.close()
+
+
+@pytest.fixture
+def weaver(open_weaver):
+    return open_weaver()
+
+
+@pytest.fixture
+def app_module(data_dir):
+    """The FastAPI app module, with its Weaver on the data directory."""
+    stdout, stderr = sys.stdout, sys.stderr
+    try:
+        if "main" in sys.modules:
+            main = importlib.reload(sys.modules["main"])
+        else:
+            main = importlib.import_module("main")
+    finally:
+        # main rewraps stdout/stderr for Windows consoles; detach the wrappers so
+        # collecting them does not close pytest's capture files
+        for wrapper, original in ((sys.stdout, stdout), (sys.stderr, stderr)):
+            if wrapper is not original:
+                wrapper.detach()
+        sys.stdout, sys.stderr = stdout, stderr
+    yield main
+    main.weaver.close()
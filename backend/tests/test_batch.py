@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+
+class Boom(Exception):
+    pass
+
+
+def test_batch_rolls_back_everything(open_weaver):
+    weaver = open_weaver()
+    keep = weaver.add_document_node("keep.md", "k", {"title": "Keep"})
+    weaver.update_node_positions({keep: {"x": 1, "y": 1}})
+    before = sorted(weaver.graph.nodes(data=True)), sorted(weaver.graph.edges(data=True))
+    version = weaver.get_graph_version()["version"]
+
+    with pytest.raises(Boom):
+        with weaver.batch():
+            node = weaver.add_document_node("new.md", "n", {"title": "New"})
+            weaver.add_edge(node, keep, "ref")
+            weaver.update_node(keep, {"title": "Changed"})
+            weaver.update_node_positions({keep: {"x": 900, "y": 900}, node: {"x": 5, "y": 5}})
+            raise Boom()
+
+    assert (sorted(weaver.graph.nodes(data=True)), sorted(weaver.graph.edges(data=True))) == before
+    assert weaver.get_node_data(keep, include_content=False)["position"] == {"x": 1.0, "y": 1.0}
+    # Indexes follow the rollback: no stale grid cell, the tree lists only the kept node
+    assert weaver.canvas.spatial_index.query(0, 0, 1000, 1000) == [keep]
+    assert [item["id"] for item in weaver.get_file_tree()] == [keep]
+    # Clients see the rollback as a change, not as nothing happening
+    changes = weaver.get_changes(version)
+    assert keep in changes["nodes"]["updated"]
+
+    weaver.close()
+    restarted = open_weaver()
+    assert (sorted(restarted.graph.nodes(data=True)), sorted(restarted.graph.edges(data=True))) == before
+
+
+def test_concurrent_batch_is_not_joined(open_weaver):
+    weaver = open_weaver()
+    in_batch = threading.Event()
+    other_done = threading.Event()
+    errors = []
+
+    def failing():
+        try:
+            with weaver.batch():
+                weaver.add_document_node("a.md", "a", {"title": "A"})
+                in_batch.set()
+                # Gives the other thread time to try writing while this batch is open
+                other_done.wait(0.3)
+                raise Boom()
+        except Boom:
+            pass
+
+    def succeeding():
+        in_batch.wait(5)
+        try:
+            with weaver.batch():
+                weaver.add_document_node("b.md", "b", {"title": "B"})
+            weaver.add_document_node("c.md", "c", {"title": "C"})
+        except Exception as e:
+            errors.append(e)
+        other_done.set()
+
+    threads = [threading.Thread(target=failing), threading.Thread(target=succeeding)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert not errors
+    assert sorted(weaver.graph.nodes) == ["b.md", "c.md"]
+    weaver.close()
+    assert sorted(open_weaver().graph.nodes) == ["b.md", "c.md"]
+
+
+def test_save_inside_batch_does_not_snapshot_it(open_weaver):
+    weaver = open_weaver()
+    weaver.add_document_node("a.md", "a", {"title": "A"})
+    with pytest.raises(Boom):
+        with weaver.batch():
+            weaver.add_document_node("b.md", "b", {"title": "B"})
+            weaver.save_graph()
+            raise Boom()
+    weaver.close()
+    assert sorted(open_weaver().graph.nodes) == ["a.md"]
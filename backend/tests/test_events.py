@@ -0,0 +1,93 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+uvicorn = pytest.importorskip("uvicorn")
+
+
+@pytest.fixture
+def server(app_module):
+    """The app on a live local port: server-sent events need a real streaming connection."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.02)
+    yield f"http://127.0.0.1:{port}"
+    # Open streams end when the canvas's event hub closes
+    app_module.weaver.canvas.events.close()
+    server.should_exit = True
+    thread.join(10)
+
+
+def read_events(url, count, headers=None, received=None):
+    """The first count messages of an event stream, as {"event", "data", "id"} dicts."""
+    messages = []
+    with httpx.stream("GET", url, headers=headers or {}, timeout=10) as response:
+        message = {}
+        for line in response.iter_lines():
+            if line.startswith("event:"):
+                message["event"] = line[6:].strip()
+            elif line.startswith("data:"):
+                message["data"] = json.loads(line[5:])
+            elif line.startswith("id:"):
+                message["id"] = line[3:].strip()
+            elif line == "" and message:
+                messages.append(message)
+                if received is not None:
+                    received.append(message)
+                message = {}
+                if len(messages) >= count:
+                    break
+    return messages
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+
+def test_stream_resumes_from_last_event_id(server, app_module):
+    client = httpx.Client(base_url=server)
+    client.post("/api/v2/batch", json={"operations": [{"op": "add_node", "id": "A", "attrs": {"title": "a"}}]})
+
+    received = []
+    reader = threading.Thread(target=read_events, args=(f"{server}/api/v2/events", 2), kwargs={"received": received})
+    reader.start()
+    wait_for(lambda: received)
+    hello = received[0]
+    assert hello["event"] == "hello" and hello["id"] == f"{hello['data']['epoch']}:{hello['data']['version']}"
+    client.post("/api/v2/batch", json={"operations": [{"op": "add_node", "id": "B", "attrs": {"title": "b"}}]})
+    reader.join(10)
+    first = received[1]
+    assert first["event"] == "mutations"
+    assert [(e["type"], e["id"], e["node"]["title"]) for e in first["data"]["events"]] == [("node_added", "B", "b")]
+
+    # Missed while disconnected
+    client.post("/api/v2/nodes/positions", json={"A": {"x": 3, "y": 4}})
+    client.post("/api/v2/batch", json={"operations": [
+        {"op": "add_node", "id": "C", "attrs": {"title": "c"}},
+        {"op": "add_edge", "source": "A", "target": "C", "attrs": {"type": "reference"}},
+    ]})
+
+    hello, resumed = read_events(f"{server}/api/v2/events", 2, headers={"Last-Event-ID": first["id"]})
+    assert hello["event"] == "hello" and resumed["event"] == "mutations"
+    assert resumed["id"] == hello["id"]
+    events = {(e["type"], e.get("id") or (e["source"], e["target"])): e for e in resumed["data"]["events"]}
+    assert set(events) == {("node_updated", "A"), ("node_added", "C"), ("edge_added", ("A", "C"))}
+    assert events[("node_updated", "A")]["node"]["position"] == {"x": 3.0, "y": 4.0}
+
+    # An id from another epoch (e.g. before a restart) cannot be resumed
+    _, resync = read_events(f"{server}/api/v2/events", 2, headers={"Last-Event-ID": "other:1"})
+    assert resync["event"] == "resync" and resync["data"]["since"] is None
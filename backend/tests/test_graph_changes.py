@@ -0,0 +1,97 @@
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(app_module):
+    return TestClient(app_module.app)
+
+
+def index(doc):
+    return {n["id"]: n for n in doc["nodes"]}, {(e["source"], e["target"]): e for e in doc["edges"]}
+
+
+def random_ops(rng, ids, step):
+    r = rng.random()
+    if r < 0.3 or len(ids) < 3:
+        node_id = f"n{step}"
+        ids.append(node_id)
+        return [{"op": "add_node", "id": node_id, "attrs": {"title": node_id, "type": "document"}}]
+    if r < 0.5:
+        source, target = rng.sample(ids, 2)
+        return [{"op": "add_edge", "source": source, "target": target, "attrs": {"type": "reference"}}]
+    if r < 0.6:
+        node_id = rng.choice(ids)
+        ids.remove(node_id)
+        return [{"op": "remove_node", "id": node_id}]
+    if r < 0.75:
+        return [{"op": "update_node", "id": rng.choice(ids),
+                 "attrs": {"title": f"t{step}", "status": rng.choice(["shadow", "committed"])}}]
+    if r < 0.85:
+        source, target = rng.sample(ids, 2)
+        return [{"op": "remove_edge", "source": source, "target": target}]
+    # Rejected as a whole: the first op is rolled back
+    source, target = rng.sample(ids, 2)
+    return [{"op": "add_edge", "source": source, "target": target, "attrs": {"type": "reference"}},
+            {"op": "remove_node", "id": "missing"}]
+
+
+def test_changes_patch_the_client_up_to_date(client):
+    snapshot = client.get("/api/v2/graph?include_content=false").json()
+    nodes, edges = index(snapshot)
+    version, epoch = snapshot["version"], snapshot["epoch"]
+    rng = random.Random(5)
+    ids = []
+    for step in range(200):
+        client.post("/api/v2/batch", json={"operations": random_ops(rng, ids, step)})
+        if rng.random() < 0.3:
+            result = client.get(f"/api/v2/graph/changes?since={version}&epoch={epoch}").json()
+            assert not result["full"]
+            for node_id in result["nodes"]["removed"]:
+                nodes.pop(node_id, None)
+            for node in result["nodes"]["added"] + result["nodes"]["updated"]:
+                nodes[node["id"]] = node
+            for edge in result["edges"]["removed"]:
+                edges.pop((edge["source"], edge["target"]), None)
+            for edge in result["edges"]["added"] + result["edges"]["updated"]:
+                edges[(edge["source"], edge["target"])] = edge
+            version = result["version"]
+            assert (nodes, edges) == index(client.get("/api/v2/graph?include_content=false").json()), step
+
+
+def test_changes_fall_back_to_a_full_snapshot(client):
+    client.post("/api/v2/batch", json={"operations": [{"op": "add_node", "id": "a", "attrs": {"title": "a"}}]})
+    current = client.get("/api/v2/graph").json()
+
+    for query in ("since=0&epoch=other", f"since={current['version'] + 50}&epoch={current['epoch']}"):
+        result = client.get(f"/api/v2/graph/changes?{query}").json()
+        assert result["full"] and [n["id"] for n in result["nodes"]] == ["a"]
+        assert (result["epoch"], result["version"]) == (current["epoch"], current["version"])
+
+    up_to_date = client.get(f"/api/v2/graph/changes?since={current['version']}&epoch={current['epoch']}").json()
+    assert not up_to_date["full"] and up_to_date["nodes"] == {"added": [], "updated": [], "removed": []}
+    assert client.get("/api/v2/graph/changes?since=-1").status_code == 400
+
+
+@pytest.fixture
+def small_change_log(data_dir):
+    with open(data_dir / "nexus_settings.json", "w") as f:
+        json.dump({"change_log": {"max_entries": 5}}, f)
+
+
+def test_changes_older_than_the_log_need_a_full_snapshot(small_change_log, client):
+    start = client.get("/api/v2/graph").json()
+    for i in range(3):
+        client.post("/api/v2/batch", json={"operations": [{"op": "add_node", "id": f"n{i}", "attrs": {}}]})
+    recent = client.get(f"/api/v2/graph/changes?since={start['version']}&epoch={start['epoch']}").json()
+    assert not recent["full"] and len(recent["nodes"]["added"]) == 3
+
+    for i in range(3, 10):
+        client.post("/api/v2/batch", json={"operations": [{"op": "add_node", "id": f"n{i}", "attrs": {}}]})
+    stale = client.get(f"/api/v2/graph/changes?since={start['version']}&epoch={start['epoch']}").json()
+    assert stale["full"] and len(stale["nodes"]) == 10
+    latest = client.get(f"/api/v2/graph/changes?since={stale['version'] - 2}&epoch={start['epoch']}").json()
+    assert not latest["full"] and sorted(n["id"] for n in latest["nodes"]["added"]) == ["n8", "n9"]
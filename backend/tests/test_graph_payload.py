@@ -0,0 +1,20 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(app_module):
+    return TestClient(app_module.app)
+
+
+def test_graph_leaves_bodies_to_the_node_endpoint(app_module, client):
+    node_id = app_module.weaver.add_document_node("doc.md", "the body", {"title": "Doc"})
+
+    nodes = {n["id"]: n for n in client.get("/api/v2/graph").json()["nodes"]}
+    assert "content" not in nodes[node_id]
+    assert nodes[node_id]["title"] == "Doc"
+
+    hydrated = {n["id"]: n for n in client.get("/api/v2/graph?include_content=true").json()["nodes"]}
+    assert hydrated[node_id]["content"] == "the body"
+
+    assert client.get(f"/api/v2/nodes/{node_id}").json()["content"] == "the body"
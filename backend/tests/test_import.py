@@ -0,0 +1,65 @@
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(app_module):
+    return TestClient(app_module.app)
+
+
+def upload(client, payload: bytes):
+    return client.post("/api/v2/import", files={"file": ("backup.zip", payload, "application/zip")})
+
+
+def test_export_round_trips_through_import(app_module, client):
+    weaver = app_module.weaver
+    node_id = weaver.add_document_node("doc.md", "the body", {"title": "Doc"})
+    weaver.update_node_positions({node_id: {"x": 3, "y": 4}})
+    weaver.append_chat_message("s1", {"role": "user", "content": "hi"})
+
+    exported = client.get("/api/v2/export").content
+    response = upload(client, exported)
+    assert response.status_code == 200
+    new_id = response.json()["canvas_id"]
+
+    assert weaver.active_canvas_id == new_id
+    assert weaver.get_node_content(node_id) == "the body"
+    assert weaver.get_node_data(node_id, include_content=False)["position"] == {"x": 3, "y": 4}
+    assert weaver.get_chat_messages("s1") == [{"role": "user", "content": "hi"}]
+
+
+def test_legacy_chat_json_is_converted_on_import(app_module, client):
+    # Older exports stored chat.json: the whole session list again on every turn
+    first = {"role": "user", "content": "hi"}
+    second = {"role": "model", "content": "hello"}
+    legacy_chat = [
+        {"session_id": "s1", "messages": [first]},
+        {"session_id": "s1", "messages": [first, second]},
+    ]
+    graph = {"directed": True, "multigraph": False, "graph": {},
+             "nodes": [{"id": "a", "title": "A", "content": "legacy body"}], "edges": []}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zipf:
+        zipf.writestr("old/graph.json", json.dumps(graph))
+        zipf.writestr("old/chat.json", json.dumps(legacy_chat))
+        zipf.writestr("metadata.json", json.dumps({"canvas_name": "Old Canvas"}))
+
+    response = upload(client, buffer.getvalue())
+    assert response.status_code == 200
+
+    weaver = app_module.weaver
+    assert weaver.get_chat_messages("s1") == [first, second]
+    assert weaver.get_node_content("a") == "legacy body"
+    assert weaver.canvas.chat_log.has_legacy() is False
+
+
+def test_import_rejects_archives_without_a_graph(client):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zipf:
+        zipf.writestr("metadata.json", "{}")
+    assert upload(client, buffer.getvalue()).status_code == 400
+    assert upload(client, b"not a zip").status_code == 400
@@ -0,0 +1,36 @@
+from core.position_store import PositionStore
+
+
+def test_position_store_reload(tmp_path):
+    path = str(tmp_path / "positions.bin")
+    store = PositionStore(path, flush_interval_ms=10000)
+    store.set_many({"a": (1.0, 2.0), "b": (3.5, -4.25), "c": (0.0, 0.0)})
+    store.flush()
+    # Moving listed nodes patches the file in place
+    store.set_many({"a": (10.0, 20.0)})
+    store.flush()
+    # Dropping one rewrites it
+    store.discard("c")
+    store.close()
+
+    reloaded = PositionStore(path)
+    assert reloaded.load() == 2
+    assert {n: (x, y) for n, x, y in reloaded.items()} == {"a": (10.0, 20.0), "b": (3.5, -4.25)}
+    reloaded.close()
+
+    known = PositionStore(path)
+    assert known.load(known_ids={"b"}) == 1
+    assert known.get("a") is None and known.get("b") == (3.5, -4.25)
+    known.close()
+
+
+def test_dragged_positions_survive_restart(open_weaver):
+    weaver = open_weaver()
+    node = weaver.add_document_node("a.md", "a", {"title": "A"})
+    weaver.update_node_positions({node: {"x": 12.5, "y": -3}})
+    # Readers that copy node attributes see the stored position
+    assert weaver.get_subgraph([node], 1)["nodes"][0]["position"] == {"x": 12.5, "y": -3.0}
+    weaver.close()
+    restarted = open_weaver()
+    assert restarted.get_node_data(node, include_content=False)["position"] == {"x": 12.5, "y": -3.0}
+    assert restarted.canvas.spatial_index.query(0, -10, 20, 0) == [node]
@@ -0,0 +1,55 @@
+import json
+import os
+import sqlite3
+
+from core.sqlite_store import SQLiteGraphStore
+
+
+def graph_state(weaver):
+    return sorted(weaver.graph.nodes(data=True)), sorted(weaver.graph.edges(data=True))
+
+
+def test_sqlite_store_survives_restart(open_weaver):
+    weaver = open_weaver()
+    folder = weaver.ensure_folder_path("A/B")
+    node = weaver.add_document_node("doc1.md", "hello", {"title": "D"}, parent_id=folder)
+    weaver.flush()
+    assert weaver.set_storage_backend("default", "sqlite")
+
+    weaver.update_node_positions({node: {"x": 5, "y": 6}})
+    other = weaver.add_document_node("doc2.md", "x")
+    weaver.add_edge(other, node, "ref", 0.7)
+    weaver.update_node(node, {"status": "shadow"})
+    weaver.close()
+
+    restarted = open_weaver()
+    assert type(restarted.store).__name__ == "SQLiteGraphStore"
+    assert graph_state(restarted) == graph_state(weaver)
+
+
+def test_legacy_node_attrs_rows_are_migrated(tmp_path):
+    conn = sqlite3.connect(tmp_path / "graph.db")
+    conn.executescript("""
+        CREATE TABLE nodes (id TEXT PRIMARY KEY, type TEXT, status TEXT, module TEXT);
+        CREATE TABLE node_attrs (node_id TEXT, key TEXT, value TEXT, PRIMARY KEY (node_id, key));
+        CREATE TABLE edges (source TEXT, target TEXT, type TEXT, attrs TEXT, PRIMARY KEY (source, target));
+    """)
+    conn.execute("INSERT INTO nodes VALUES ('a', 'document', NULL, NULL), ('b', NULL, NULL, NULL)")
+    conn.executemany("INSERT INTO node_attrs VALUES (?, ?, ?)", [
+        ("a", "type", json.dumps("document")),
+        ("a", "position", json.dumps({"x": 1, "y": 2})),
+    ])
+    conn.execute("INSERT INTO edges VALUES ('a', 'b', 'ref', ?)", (json.dumps({"type": "ref"}),))
+    conn.commit()
+    conn.close()
+
+    store = SQLiteGraphStore(str(tmp_path))
+    graph = store.load()
+    store.close()
+    assert dict(graph.nodes(data=True)) == {"a": {"type": "document", "position": {"x": 1, "y": 2}}, "b": {}}
+    assert list(graph.edges(data=True)) == [("a", "b", {"type": "ref"})]
+
+    conn = sqlite3.connect(os.path.join(tmp_path, "graph.db"))
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert "node_attrs" not in tables
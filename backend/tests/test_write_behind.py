@@ -0,0 +1,22 @@
+import json
+
+
+def test_buffered_updates_are_coalesced_and_survive_restart(data_dir, open_weaver):
+    with open(data_dir / "nexus_settings.json", "w") as f:
+        # Long enough that nothing is flushed behind the test's back
+        json.dump({"persistence": {"write_behind": True, "flush_interval_ms": 60000, "flush_max_ops": 1000}}, f)
+    weaver = open_weaver()
+    node = weaver.add_document_node("a.md", "a", {"title": "A"})
+    for i in range(50):
+        weaver.update_node(node, {"summary": f"draft {i}"})
+
+    stats = weaver.get_persistence_stats()
+    assert stats["write_behind"] and stats["pending_ops"] > 0 and stats["ops_merged"] >= 49
+    assert weaver.flush() > 0
+    stats = weaver.get_persistence_stats()
+    assert stats["pending_ops"] == 0 and stats["flushes"] == 1 and stats["ops_written"] < 10
+
+    weaver.update_node(node, {"summary": "final"})
+    # Closing flushes whatever is still buffered
+    weaver.close()
+    assert open_weaver().graph.nodes[node]["summary"] == "final"
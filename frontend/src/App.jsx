@@ -255,8 +255,11 @@ function App() {
   }, [selectedNodeIds, documentViewNode, handleContextCalculation, isChatMaximized, chatWidth]);
 
   const handleOpenDocumentView = useCallback(async (node) => {
-    // Open document in chat section
+    // Open document in chat section; the graph node has no body, so load the full node
     setDocumentViewNode(node);
+    getNode(node.id)
+      .then(fullNode => setDocumentViewNode(current => (current && current.id === node.id ? fullNode : current)))
+      .catch(error => console.error("Failed to load document:", error));
     setSelectedEdge(null);
     setIsLoading(true);
     try {
@@ -384,11 +387,8 @@ function App() {
     const updatedData = await getGraph();
     setGraphData(updatedData);
     // Reload the current document if it's open
-    if (documentViewNode) {
-      const updatedNode = updatedData.nodes.find(n => n.id === documentViewNode.id);
-      if (updatedNode) {
-        setDocumentViewNode(updatedNode);
-      }
+    if (documentViewNode && updatedData.nodes.some(n => n.id === documentViewNode.id)) {
+      setDocumentViewNode(await getNode(documentViewNode.id));
     }
   };
 
@@ -29,6 +29,12 @@ export const getGraph = async () => {
     return response.data;
 };
 
+// The graph omits node bodies; fetch a node with its content for document views
+export const getNode = async (nodeId) => {
+    const response = await axios.get(`${API_BASE_URL}/nodes/${nodeId}`);
+    return response.data;
+};
+
 export const getContext = async () => {
     const response = await axios.get(`${API_BASE_URL}/context`);
     return response.data;